@@ -1,12 +1,13 @@
 
-import pickle
+import json
 import os
 
-model_path = 'models/waterlogging_advanced_v2.pkl'
+model_path = 'models/waterlogging_advanced_v2'
 
-if os.path.exists(model_path):
-    with open(model_path, 'rb') as f:
-        data = pickle.load(f)
+manifest_path = os.path.join(model_path, 'manifest.json')
+if os.path.exists(manifest_path):
+    with open(manifest_path) as f:
+        data = json.load(f)
         print("Keys:", data.keys())
         if 'metrics' in data:
             print("Metrics:", data['metrics'])
@@ -2,6 +2,7 @@ const API_BASE = window.location.hostname === 'localhost' ? 'http://localhost:30
 
 let map = null;
 let markersLayer = null;
+let riskTileLayer = null;
 let currentPredictions = [];
 
 // Initialize page
@@ -87,6 +88,7 @@ async function loadPredictions() {
         updateStatistics(data);
         displayHotspotsOnMap(data.hotspots);
         displayHotspotsList(data.hotspots);
+        await showRiskTiles(dateInput, data.model_version);
 
         // If no predictions exist, try to fetch rainfall data
         if (currentPredictions.length === 0) {
@@ -101,6 +103,40 @@ async function loadPredictions() {
     }
 }
 
+async function showRiskTiles(date, modelVersion) {
+    // Full-grid risk surface rendered by the predictor, served from /tiles
+    if (riskTileLayer) {
+        map.removeLayer(riskTileLayer);
+        riskTileLayer = null;
+    }
+    if (!modelVersion) return;
+
+    try {
+        // Same path segment sanitising as scripts/risk_tiles.py
+        const version = String(modelVersion).replace(/[^A-Za-z0-9._-]/g, '_');
+        const base = `${API_BASE}/tiles/${date}/${version}`;
+        const response = await fetch(`${base}/meta.json`, { cache: 'no-cache' });
+        if (!response.ok) return;
+        const meta = await response.json();
+
+        // Tiles are redrawn in place when a date is re-predicted; the result
+        // key keeps browsers from showing a cached older surface
+        const revision = meta.key ? `?k=${encodeURIComponent(String(meta.key).slice(0, 16))}` : '';
+        riskTileLayer = L.tileLayer(`${base}/{z}/{x}/{y}.png${revision}`, {
+            minZoom: 0,
+            maxZoom: 18,
+            minNativeZoom: meta.min_zoom,
+            maxNativeZoom: meta.max_zoom,
+            bounds: meta.bounds,
+            opacity: 0.7,
+            zIndex: 2,  // above the base map, below the hotspot markers
+            errorTileUrl: 'data:image/gif;base64,R0lGODlhAQABAAAAACH5BAEKAAEALAAAAAABAAEAAAICTAEAOw=='
+        }).addTo(map);
+    } catch (error) {
+        console.error('Error loading risk tiles:', error);
+    }
+}
+
 async function fetchRainfallData(date) {
     try {
         const response = await fetch(`${API_BASE}/api/rainfall/date/${date}`);
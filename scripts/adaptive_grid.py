@@ -0,0 +1,97 @@
+"""
+Adaptive Grid Refinement
+Coarse-to-fine evaluation of the model over the prediction grid. The grid
+is tiled into stride x stride blocks (a quadtree over the raster) and the
+model is evaluated at each block's centre cell:
+
+    block sample + margin <= block ceiling   keep: every cell takes the sample
+    otherwise                                split into four and repeat
+
+Blocks bordering a split block are split as well (the ensemble is made of
+trees, so its surface steps rather than slopes between samples).
+
+A cell's ceiling is the largest model probability it can have and still
+stay at or below the hotspot threshold after physics (threshold / physics
+factor), so a kept block can never produce a high-risk cell. Blocks are
+split down to single cells, where the value is exact. The margin is the
+tolerance: a kept block can only hide a hotspot cell if the model rises
+more than `margin` above the block's sample inside it while no
+neighbouring block looked close to the threshold.
+"""
+
+import numpy as np
+
+
+def ceiling_pyramid(ceiling, stride):
+    """{block size: per-block minimum ceiling} for sizes 1, 2, 4 ... stride"""
+    n_rows, n_cols = ceiling.shape
+    rows, cols = -(-n_rows // stride) * stride, -(-n_cols // stride) * stride
+    padded = np.full((rows, cols), np.inf)
+    padded[:n_rows, :n_cols] = ceiling
+
+    pyramid = {1: padded}
+    size = 1
+    while size < stride:
+        finer = pyramid[size]
+        size *= 2
+        pyramid[size] = finer.reshape(rows // size, 2, cols // size, 2).min(axis=(1, 3))
+    return pyramid
+
+
+def refine(shape, evaluate, ceiling, stride, margin):
+    """
+    Model probability for every cell of a (rows, cols) raster, evaluating
+    only where it matters. evaluate(flat_indices) returns the model
+    probability of those cells; ceiling is the (rows, cols) raster described
+    above. Returns (flat probability, number of cells evaluated).
+    """
+    from scipy import ndimage
+
+    if stride < 1 or stride & (stride - 1):
+        raise ValueError(f"stride must be a power of two, not {stride}")
+    n_rows, n_cols = shape
+    pyramid = ceiling_pyramid(ceiling, stride)
+
+    prob = np.full(n_rows * n_cols, np.nan)
+    out = np.empty((n_rows, n_cols))
+    block_rows, block_cols = np.meshgrid(
+        np.arange(-(-n_rows // stride)), np.arange(-(-n_cols // stride)), indexing='ij'
+    )
+    block_rows, block_cols = block_rows.ravel(), block_cols.ravel()
+    evaluated = 0
+
+    size = stride
+    while len(block_rows):
+        # Each block's centre (clipped into the grid for edge blocks)
+        centre = (np.minimum(block_rows * size + size // 2, n_rows - 1) * n_cols +
+                  np.minimum(block_cols * size + size // 2, n_cols - 1))
+        todo = centre[np.isnan(prob[centre])]
+        prob[todo] = evaluate(todo)
+        evaluated += len(todo)
+        sample = prob[centre]
+
+        if size == 1:
+            split = np.zeros(len(centre), dtype=bool)
+        else:
+            split = sample + margin > pyramid[size][block_rows, block_cols]
+            # Tree models jump at split thresholds, so a block next to one
+            # that may hold hotspots is split too
+            raster = np.zeros(pyramid[size].shape, dtype=bool)
+            raster[block_rows[split], block_cols[split]] = True
+            raster = ndimage.binary_dilation(raster, structure=np.ones((3, 3), dtype=bool))
+            split = raster[block_rows, block_cols]
+
+        # Kept blocks are filled with their sample
+        kept = np.full(pyramid[size].shape, np.nan)
+        kept[block_rows[~split], block_cols[~split]] = sample[~split]
+        kept = np.repeat(np.repeat(kept, size, axis=0), size, axis=1)[:n_rows, :n_cols]
+        np.copyto(out, kept, where=~np.isnan(kept))
+
+        # Split blocks become their (in-grid) quadrants
+        size //= 2
+        block_rows = ((2 * block_rows[split])[:, None] + [0, 0, 1, 1]).ravel()
+        block_cols = ((2 * block_cols[split])[:, None] + [0, 1, 0, 1]).ravel()
+        inside = (block_rows * size < n_rows) & (block_cols * size < n_cols)
+        block_rows, block_cols = block_rows[inside], block_cols[inside]
+
+    return out.ravel(), evaluated
@@ -0,0 +1,351 @@
+"""
+Streaming Band Pipeline
+Predicts over grids too large to hold in memory: 25-50 m cells across the
+whole NCR bounding box are tens of millions of cells, where the regular
+pipeline materializes every static layer and the full risk surface. Here
+the grid is generated in bands of whole rows, and each band flows through
+generator stages:
+
+    static layers -> rainfall field -> inference -> physics -> threshold
+
+Only the cells above the hotspot threshold leave a band. They are appended,
+in grid order, to a spill file of (cell, risk, rainfall_mm) records:
+
+    cache/spill/<date>.<pid>.spill
+
+and clustered afterwards over that sparse result (grid_clustering.label_cells),
+so memory is bounded by the band size and the number of high-risk cells,
+never by the grid's area. Raster and graph clustering both use raster
+labels here (the graph mode's neighbour graph is grid-wide); dbscan
+clusters the jittered points as usual. Streamed runs render no map tiles
+and are not stored in the result cache (there is no full risk surface).
+
+Hotspots are only written to the database with --save, and only for the
+app's own grid (GRID_BOUNDS at GRID_SIZE): predicted_hotspots has no column
+for bounds or resolution, and a save replaces every row for the date.
+
+Usage:
+    python scripts/band_pipeline.py 2024-07-28 --bounds ncr --grid-size 0.00025
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+import run_telemetry
+from static_grid import GRID_BOUNDS, StaticGrid, grid_axes, load_verified_coords, static_layers
+
+SPILL_DIR = os.path.join(os.path.dirname(__file__), '..', 'cache', 'spill')
+
+# Approximate National Capital Region bounding box (lat_min, lat_max, lng_min, lng_max)
+NCR_BOUNDS = (27.6, 29.5, 75.9, 78.3)
+
+# Default streamed resolution: 0.0004 deg ≈ 45m
+STREAM_GRID_SIZE = 0.0004
+
+# Grid rows per band (BAND_ROWS); every stage holds at most this many rows of cells
+BAND_ROWS = 64
+
+# One spilled high-risk cell (flat grid index); rainfall_mm is NaN without a rainfall field
+SPILL_DTYPE = np.dtype([('cell', '<i8'), ('risk', '<f8'), ('rainfall_mm', '<f8')])
+
+
+def band_rows():
+    """Grid rows per band (BAND_ROWS)"""
+    return max(1, int(os.getenv('BAND_ROWS', BAND_ROWS)))
+
+
+def parse_bounds(text):
+    """'ncr', 'delhi' or 'lat_min,lat_max,lng_min,lng_max'"""
+    named = {'ncr': NCR_BOUNDS, 'delhi': GRID_BOUNDS}
+    if text in named:
+        return named[text]
+    bounds = tuple(float(v) for v in text.split(','))
+    if len(bounds) != 4 or bounds[0] >= bounds[1] or bounds[2] >= bounds[3]:
+        raise ValueError(f"bounds must be lat_min,lat_max,lng_min,lng_max, not {text!r}")
+    return bounds
+
+
+class Spill:
+    """Append-only file of SPILL_DTYPE records, read back memory-mapped"""
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.file = open(path, 'wb')
+
+    def write(self, records):
+        self.file.write(records.tobytes())
+        self.count += len(records)
+
+    def records(self):
+        """Every record written so far"""
+        self.file.flush()
+        if self.count == 0:
+            return np.empty(0, dtype=SPILL_DTYPE)
+        return np.memmap(self.path, dtype=SPILL_DTYPE, mode='r', shape=(self.count,))
+
+    def size_mb(self):
+        return self.count * SPILL_DTYPE.itemsize / (1024 * 1024)
+
+    def remove(self):
+        self.file.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+class BandPipeline:
+    """A predictor's pipeline run over a bounding box one band of grid rows at a time"""
+
+    def __init__(self, predictor, bounds=NCR_BOUNDS, rows_per_band=None):
+        from predict_for_date import VERIFIED_HOTSPOTS_FILE
+
+        self.predictor = predictor
+        self.bounds = tuple(bounds)
+        self.rows_per_band = rows_per_band or band_rows()
+        # The adaptive grid scores each band with a stride of rows on either
+        # side, in whole blocks, so refinement sees across band edges as on
+        # the full grid
+        self.halo = predictor.adaptive_stride if predictor.grid_mode == 'adaptive' else 0
+        if self.halo:
+            self.rows_per_band = -(-self.rows_per_band // self.halo) * self.halo
+        self.lats, self.lngs = grid_axes(self.bounds, predictor.grid_size)
+        self.shape = (len(self.lats), len(self.lngs))
+        self.verified_coords = load_verified_coords(VERIFIED_HOTSPOTS_FILE)
+        self.scored_cells = 0
+
+    def __len__(self):
+        return self.shape[0] * self.shape[1]
+
+    def n_bands(self):
+        return -(-self.shape[0] // self.rows_per_band)
+
+    def run_fields(self):
+        """Grid description attached to run telemetry"""
+        return {
+            'model_version': self.predictor.model_data['model_version'],
+            'grid_size': self.predictor.grid_size,
+            'grid_bounds': list(self.bounds),
+            'cells': len(self),
+            'band_rows': self.rows_per_band,
+            'threads': self.predictor.threads,
+            'grid_mode': self.predictor.grid_mode,
+            'clustering': self.predictor.clustering
+        }
+
+    # --- Stages (each a generator over bands) ---
+
+    def bands(self):
+        """
+        Yield (first row, band, keep): each band's static layers (plus any
+        halo rows) as a StaticGrid of its own, and the slice of its cells
+        that are the band's own rows
+        """
+        n_rows, n_cols = self.shape
+        for row0 in range(0, n_rows, self.rows_per_band):
+            row1 = min(row0 + self.rows_per_band, n_rows)
+            top, bottom = max(row0 - self.halo, 0), min(row1 + self.halo, n_rows)
+            lats = self.lats[top:bottom]
+            with run_telemetry.span('static_layers'):
+                layers = static_layers(
+                    lats, self.lngs, self.predictor.known_locations, self.verified_coords
+                )
+            manifest = {
+                'key': f'band_{row0}',
+                'shape': [len(lats), n_cols],
+                'grid_size': self.predictor.grid_size
+            }
+            keep = slice((row0 - top) * n_cols, (row1 - top) * n_cols)
+            yield row0, StaticGrid(None, manifest, layers), keep
+
+    def with_rainfall(self, bands, rainfall_data, stations=None):
+        """
+        Yield (first row, band, keep, rainfall data) where a date with a
+        station set carries the band's own slice of the interpolated field
+        """
+        for row0, band, keep in bands:
+            if stations is None:
+                yield row0, band, keep, rainfall_data
+                continue
+            from rainfall_field import RainfallField
+
+            stations_set, readings = stations
+            with run_telemetry.span('rainfall_field'):
+                field = RainfallField(stations_set, band['lat'], band['lng']).apply(readings)
+            yield row0, band, keep, {**rainfall_data, 'field': field}
+
+    def scored(self, target_date, bands):
+        """Yield (first row, risk, rainfall field or None) of the band's own rows"""
+        predictor = self.predictor
+        for row0, band, keep, rainfall_data in bands:
+            if predictor.grid_mode == 'adaptive':
+                prob, scored = predictor.adaptive_grid_proba(target_date, rainfall_data, band)
+            else:
+                prob = predictor.grid_proba(target_date, rainfall_data, grid=band)
+                scored = len(prob)
+            self.scored_cells += scored
+            with run_telemetry.span('physics'):
+                risk = predictor.apply_physics(prob, rainfall_data, band)
+            field = rainfall_data.get('field')
+            yield row0, risk[keep], field[keep] if field is not None else None
+
+    def high_risk(self, scored):
+        """Yield SPILL_DTYPE records of each band's cells above the hotspot threshold"""
+        from predict_for_date import HIGH_RISK_THRESHOLD
+
+        for row0, risk, field in scored:
+            hit = np.flatnonzero(risk > HIGH_RISK_THRESHOLD)
+            records = np.empty(len(hit), dtype=SPILL_DTYPE)
+            records['cell'] = row0 * self.shape[1] + hit
+            records['risk'] = risk[hit]
+            records['rainfall_mm'] = field[hit] if field is not None else np.nan
+            yield records
+
+    # --- Running it ---
+
+    def station_readings(self, target_date, rainfall_data):
+        """(station set, readings) when the date can have a rainfall field, else None"""
+        from predict_for_date import RAINFALL_FIELD_MIN_STATIONS
+        from rainfall_field import RainfallField, station_set
+
+        predictor = self.predictor
+        if not predictor.use_rainfall_field:
+            return None
+        stations = predictor.rainfall_store.stations(target_date)
+        if len(stations) < RAINFALL_FIELD_MIN_STATIONS:
+            return None
+        # A field over no cells: just the set's key and reading order
+        empty = RainfallField(station_set(stations), np.empty(0), np.empty(0))
+        readings = empty.readings(stations)
+        rainfall_data['stations'] = {'set': empty.key, 'mm': readings.tolist()}
+        print(f"   🌦️  Rainfall field from {len(readings)} stations (interpolated per band)")
+        return empty.stations, readings
+
+    def spill_high_risk(self, target_date, rainfall_data, stations, spill):
+        """Stream every band through the stages into the spill"""
+        n_bands = self.n_bands()
+        report_every = max(1, n_bands // 10)
+        started = time.perf_counter()
+
+        stages = self.high_risk(self.scored(
+            target_date, self.with_rainfall(self.bands(), rainfall_data, stations)
+        ))
+        for i, records in enumerate(stages, 1):
+            spill.write(records)
+            if i % report_every == 0 or i == n_bands:
+                elapsed = time.perf_counter() - started
+                rows = min(i * self.rows_per_band, self.shape[0])
+                print(f"   Band {i}/{n_bands} (rows {rows}/{self.shape[0]}): "
+                      f"{spill.count} high-risk cells, "
+                      f"{rows * self.shape[1] / max(elapsed, 1e-3):,.0f} cells/s")
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        run_telemetry.add('bands', n_bands)
+        run_telemetry.add('inference_cells', self.scored_cells)
+        run_telemetry.add('grid_cells', len(self))
+        run_telemetry.add('inference_ms', round(elapsed_ms, 1))
+
+    def cluster_spill(self, records, rainfall_data, seed=None):
+        """Unnamed hotspots from the spilled high-risk cells"""
+        import pandas as pd
+        import grid_clustering
+        from predict_for_date import CLUSTER_EPS, CLUSTER_MIN_SAMPLES
+
+        cells = np.asarray(records['cell'])
+        rows, cols = np.divmod(cells, self.shape[1])
+        df_high_risk = pd.DataFrame({
+            'lat': self.lats[rows],
+            'lng': self.lngs[cols],
+            'risk_score': np.asarray(records['risk'])
+        })
+        if 'stations' in rainfall_data:
+            df_high_risk['rainfall_mm'] = np.asarray(records['rainfall_mm'])
+        print(f"   High-risk points: {len(df_high_risk)}")
+        run_telemetry.add('high_risk_points', len(df_high_risk))
+
+        return self.predictor.cluster_points(
+            df_high_risk,
+            rainfall_data,
+            lambda: grid_clustering.label_cells(
+                cells, self.shape, self.predictor.grid_size, CLUSTER_EPS, CLUSTER_MIN_SAMPLES
+            ),
+            seed
+        )
+
+    def predict(self, target_date):
+        """Hotspots for a date over the whole bounding box"""
+        predictor = self.predictor
+        print(f"\n🎯 Streaming predictions for: {target_date}")
+        print(f"   Grid {self.shape[0]} x {self.shape[1]} = {len(self):,} cells "
+              f"({predictor.grid_size} deg) in {self.n_bands()} bands of {self.rows_per_band} rows")
+        run_telemetry.set_fields(**self.run_fields())
+
+        with run_telemetry.span('rainfall'):
+            rainfall_data = predictor.get_rainfall_for_date(target_date)
+            stations = self.station_readings(target_date, rainfall_data)
+        print(f"   Rainfall: {rainfall_data['rainfall_24h']:.1f} mm")
+        key, _ = predictor.result_key(target_date, rainfall_data, source='bands', bounds=self.bounds)
+
+        spill = Spill(os.path.join(SPILL_DIR, f'{target_date}.{os.getpid()}.spill'))
+        try:
+            self.spill_high_risk(target_date, rainfall_data, stations, spill)
+            run_telemetry.add('spill_mb', round(spill.size_mb(), 2))
+            with run_telemetry.span('clustering'):
+                hotspots = self.cluster_spill(spill.records(), rainfall_data, seed=key)
+        finally:
+            spill.remove()
+
+        with run_telemetry.span('geocoding'):
+            predictor.name_hotspots(hotspots)
+        run_telemetry.add('hotspots', len(hotspots))
+        print(f"   ✅ Generated {len(hotspots)} hotspots")
+        return hotspots
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream a date's prediction over a large grid in row bands")
+    parser.add_argument('date', help="Target date (YYYY-MM-DD)")
+    parser.add_argument('--bounds', default='ncr',
+                        help="'ncr' (default), 'delhi' or lat_min,lat_max,lng_min,lng_max")
+    parser.add_argument('--grid-size', type=float, default=STREAM_GRID_SIZE,
+                        help=f"Cell size in degrees (default {STREAM_GRID_SIZE})")
+    parser.add_argument('--band-rows', type=int, help=f"Grid rows per band (default {BAND_ROWS})")
+    parser.add_argument('--save', action='store_true',
+                        help="Replace the date's stored predictions (only with --bounds delhi at the app's grid size)")
+    parser.add_argument('--run-id', help="ID to tag this run's telemetry record with")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    load_dotenv()
+    from predict_for_date import DateBasedPredictor, GRID_SIZE
+
+    try:
+        bounds = parse_bounds(args.bounds)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.save and (bounds != GRID_BOUNDS or args.grid_size != GRID_SIZE):
+        parser.error(f"--save only stores the app's grid ({GRID_BOUNDS} at {GRID_SIZE} deg); "
+                     f"this run covers {bounds} at {args.grid_size} deg")
+
+    with run_telemetry.run(args.run_id, op='predict_stream', dates=[args.date]) as run:
+        predictor = DateBasedPredictor(grid_size=args.grid_size)
+        pipeline = BandPipeline(predictor, bounds, args.band_rows)
+        hotspots = pipeline.predict(args.date)
+        if args.save:
+            predictor.save_predictions_to_db(args.date, hotspots)
+
+    peak_mb = run.record['peak_rss_mb']
+    peak = f"{peak_mb:.0f} MB" if peak_mb is not None else "n/a"
+    print(f"   📊 Run {run.run_id}: {run.record['wall_ms']:.0f} ms, peak RSS {peak}")
+    if 'db' in sys.modules:
+        sys.modules['db'].report()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,438 @@
+"""
+Pipeline Benchmark
+Times and memory-profiles each DateBasedPredictor stage at several grid
+resolutions. Uses a small stand-in model trained locally (cached under
+cache/bench/) and the IMD record for rainfall, so nothing touches the
+network; the database write is only measured with --database-url.
+
+    python scripts/bench_pipeline.py --output results.json
+    python scripts/bench_pipeline.py --save-baseline
+    python scripts/bench_pipeline.py --compare            # against the saved baseline
+    python scripts/bench_pipeline.py --compare old.json --grid-sizes 0.002
+
+Stage times are medians over --repeat runs. Peak memory (Python and NumPy
+allocations) is measured in a separate tracemalloc pass, so tracing never
+slows the timed runs: per stage, and for the whole run (arrays that outlive
+a stage, like the probability surface during inference, only show up there).
+Inference streams the grid in the predictor's chunks, so the feature,
+XGBoost and forest stages are summed over chunks; their combined rate is
+reported as inference cells/s.
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import platform
+import tempfile
+import statistics
+import tracemalloc
+from contextlib import contextmanager, redirect_stdout
+
+import numpy as np
+
+BASE_DIR = os.path.join(os.path.dirname(__file__), '..')
+BENCH_DIR = os.path.join(BASE_DIR, 'cache', 'bench')
+BASELINE_FILE = os.path.join(BENCH_DIR, 'pipeline_baseline.json')
+
+GRID_SIZES = (0.01, 0.005, 0.002, 0.001, 0.0005)
+DATES = ('2023-07-08', '2023-07-09')
+
+# Prediction date the DB write benchmark uses (and deletes afterwards)
+BENCH_PREDICTION_DATE = '1900-01-01'
+
+# Stand-in ensemble: same shape as the real one, small enough to train in seconds
+STANDIN = {
+    'samples': 6000,
+    'training_dates': 60,
+    'xgb_estimators': 50,
+    'xgb_depth': 5,
+    'rf_estimators': 30,
+    'rf_depth': 8,
+    'seed': 0
+}
+
+STAGES = (
+    'model_load', 'rainfall_lookup', 'grid_build', 'grid_load', 'features',
+    'xgb_inference', 'rf_inference', 'physics', 'clustering', 'geocoding', 'db_write'
+)
+
+# Compare mode: a stage regresses when it is this much slower (fraction) and
+# the difference is above the noise floor
+REGRESSION_THRESHOLD = 0.20
+MIN_REGRESSION_MS = 5.0
+MIN_REGRESSION_MB = 5.0
+
+
+def library_versions():
+    import pandas
+    import sklearn
+    import xgboost
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pandas.__version__,
+        'sklearn': sklearn.__version__,
+        'xgboost': xgboost.__version__
+    }
+
+
+def train_standin_model(config=STANDIN):
+    """Model dict like train_advanced_model's, fit on synthetic labelled cells"""
+    import pandas as pd
+    import xgboost as xgb
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.preprocessing import StandardScaler
+    from feature_engine import FEATURE_NAMES, build_feature_frame
+    from static_grid import GRID_BOUNDS
+
+    rng = np.random.default_rng(config['seed'])
+    lat_min, lat_max, lng_min, lng_max = GRID_BOUNDS
+    per_date = config['samples'] // config['training_dates']
+    days = rng.integers(0, 365 * 10, config['training_dates'])
+
+    frames = []
+    for day in days:
+        target_date = str(np.datetime64('2010-01-01') + day)
+        rain = np.where(rng.random(per_date) < 0.3, 0.0, rng.exponential(40, per_date))
+        frames.append(build_feature_frame(
+            rng.uniform(lat_min, lat_max, per_date), rng.uniform(lng_min, lng_max, per_date),
+            target_date, rain, FEATURE_NAMES
+        ))
+    X = pd.concat(frames, ignore_index=True)
+    y = (((X['rainfall_24h'] > 30) & (X['min_dist_to_risk_zone_km'] < 15))
+         | (rng.random(len(X)) < 0.05)).astype(int)
+
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X)
+    xgb_model = xgb.XGBClassifier(
+        n_estimators=config['xgb_estimators'], max_depth=config['xgb_depth'],
+        random_state=config['seed'], n_jobs=1
+    ).fit(X_scaled, y)
+    rf_model = RandomForestClassifier(
+        n_estimators=config['rf_estimators'], max_depth=config['rf_depth'],
+        random_state=config['seed'], n_jobs=1
+    ).fit(X_scaled, y)
+
+    return {
+        'xgb_model': xgb_model,
+        'rf_model': rf_model,
+        'scaler': scaler,
+        'feature_names': list(FEATURE_NAMES),
+        'model_version': 'bench-standin',
+        'trained_at': None,
+        'metrics': {}
+    }
+
+
+def standin_model_dir(config=STANDIN, bench_dir=BENCH_DIR):
+    """Bundle directory of the stand-in model, trained on first use"""
+    from model_artifacts import export_bundle
+
+    payload = json.dumps({'config': config, 'versions': library_versions()}, sort_keys=True)
+    key = hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+    path = os.path.join(bench_dir, f'standin_model_{key}')
+    if not os.path.exists(os.path.join(path, 'manifest.json')):
+        print(f"🏋️  Training stand-in model ({config['samples']} samples)...")
+        os.makedirs(bench_dir, exist_ok=True)
+        export_bundle(train_standin_model(config), path)
+    return path
+
+
+class StageRecorder:
+    """Per-stage wall times, and tracemalloc peaks when memory=True"""
+
+    def __init__(self, memory=False):
+        self.memory = memory
+        self.times = {}
+        self.peaks = {}
+        # Highest traced total seen by any stage, above the level at start
+        self.start_traced = tracemalloc.get_traced_memory()[0] if memory else 0
+        self.run_peak = 0.0
+
+    @contextmanager
+    def stage(self, name):
+        if self.memory:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        yield
+        self.times.setdefault(name, []).append((time.perf_counter() - started) * 1000)
+        if self.memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            self.peaks[name] = max(self.peaks.get(name, 0.0), (peak - baseline) / 1e6)
+            self.run_peak = max(self.run_peak, (peak - self.start_traced) / 1e6)
+
+
+def run_pipeline(recorder, model_dir, grid_size, dates, grid_cache, save=False, clustering=None):
+    """One pass over every stage; returns counts describing the workload"""
+    from predict_for_date import DateBasedPredictor, VERIFIED_HOTSPOTS_FILE
+    from location_index import get_index as get_location_index
+    from rainfall_store import RainfallStore
+    from static_grid import GRID_BOUNDS, load_static_grid
+
+    with recorder.stage('model_load'):
+        predictor = DateBasedPredictor(model_dir=model_dir, grid_size=grid_size)
+        for part in ('scaler', 'xgb_model', 'rf_model'):
+            predictor.model_data[part]
+    predictor.render_tiles = False
+    if clustering:
+        predictor.clustering = clustering
+    predictor.verified_hotspots
+    model = predictor.model_data
+
+    with recorder.stage('rainfall_lookup'):
+        store = RainfallStore()
+        rainfall = [store.imd(d) for d in dates]
+    missing = [d for d, r in zip(dates, rainfall) if r is None]
+    if missing:
+        raise ValueError(f"No IMD rainfall for {missing}; benchmark dates must be in the record")
+
+    with tempfile.TemporaryDirectory(dir=grid_cache) as cold_cache:
+        with recorder.stage('grid_build'):
+            load_static_grid(GRID_BOUNDS, grid_size, predictor.known_locations,
+                             VERIFIED_HOTSPOTS_FILE, cache_dir=cold_cache)
+    with recorder.stage('grid_load'):
+        predictor.static_grid = load_static_grid(
+            GRID_BOUNDS, grid_size, predictor.known_locations, VERIFIED_HOTSPOTS_FILE, cache_dir=grid_cache
+        )
+
+    index = get_location_index()
+    counts = {'cells': len(predictor.static_grid), 'high_risk_points': 0, 'hotspots': 0}
+
+    n_cells, chunk_rows = counts['cells'], predictor.chunk_rows
+    booster = model['xgb_model'].get_booster()
+    X = np.empty((min(chunk_rows, n_cells), len(model['feature_names'])), dtype=np.float32)
+    for target_date, rain in zip(dates, rainfall):
+        rainfall_data = {'rainfall_24h': rain, 'temperature': 30.0, 'humidity': 70}
+
+        # The predictor's grid_proba, one stage per step of each chunk
+        risk = np.empty(n_cells)
+        for start in range(0, n_cells, chunk_rows):
+            stop = min(start + chunk_rows, n_cells)
+            with recorder.stage('features'):
+                chunk = predictor.feature_matrix(target_date, rainfall_data, out=X[:stop - start],
+                                                 rows=slice(start, stop))
+            with recorder.stage('xgb_inference'):
+                prob_xgb = booster.inplace_predict(chunk)
+            with recorder.stage('rf_inference'):
+                prob_rf = model['rf_model'].predict_proba(chunk)[:, 1]
+            with recorder.stage('physics'):
+                blend = risk[start:stop]
+                blend[:] = prob_rf
+                blend *= 0.4
+                blend += 0.6 * prob_xgb
+        with recorder.stage('physics'):
+            risk = predictor.apply_physics(risk, rainfall_data)
+        with recorder.stage('clustering'):
+            points, hotspots = predictor.cluster_risk(risk, rainfall_data, target_date)
+        index.memo.clear()
+        with recorder.stage('geocoding'):
+            predictor.name_hotspots(hotspots)
+        if save:
+            with recorder.stage('db_write'):
+                predictor.save_predictions_to_db(BENCH_PREDICTION_DATE, hotspots)
+
+        counts['high_risk_points'] += len(points)
+        counts['hotspots'] += len(hotspots)
+        del prob_xgb, prob_rf, risk, points
+
+    return counts
+
+
+def bench_grid_size(model_dir, grid_size, dates, repeat, memory, save, clustering=None):
+    """Stage summary for one resolution"""
+    grid_cache = os.path.join(BENCH_DIR, 'grids')
+    os.makedirs(grid_cache, exist_ok=True)
+    timed = StageRecorder()
+    log = io.StringIO()
+
+    with redirect_stdout(log):
+        # Untimed pass: builds the cached grid that grid_load measures
+        run_pipeline(StageRecorder(), model_dir, grid_size, dates[:1], grid_cache)
+        for _ in range(repeat):
+            counts = run_pipeline(timed, model_dir, grid_size, dates, grid_cache, save, clustering)
+
+    peaks, run_peak = {}, None
+    if memory:
+        traced = StageRecorder(memory=True)
+        tracemalloc.start()
+        try:
+            with redirect_stdout(log):
+                run_pipeline(traced, model_dir, grid_size, dates, grid_cache, save, clustering)
+        finally:
+            tracemalloc.stop()
+        peaks, run_peak = traced.peaks, traced.run_peak
+
+    stages = {}
+    for name in STAGES:
+        if name not in timed.times:
+            continue
+        runs = timed.times[name]
+        # Per-date stages ran once per date in each repeat; report per-run totals
+        n = len(runs) // repeat
+        per_run = [sum(runs[i * n:(i + 1) * n]) for i in range(repeat)]
+        stages[name] = {
+            'median_ms': round(statistics.median(per_run), 2),
+            'min_ms': round(min(per_run), 2)
+        }
+        if name in peaks:
+            stages[name]['peak_mb'] = round(peaks[name], 2)
+
+    inference_ms = sum(stages[name]['median_ms'] for name in ('features', 'xgb_inference', 'rf_inference'))
+    result = {
+        'grid_size': grid_size,
+        **counts,
+        'stages': stages,
+        'total_ms': round(sum(s['median_ms'] for s in stages.values()), 2),
+        'inference_cells_per_s': round(counts['cells'] * len(dates) / max(inference_ms, 1e-3) * 1000)
+    }
+    if run_peak is not None:
+        result['peak_mb'] = round(run_peak, 2)
+        result['peak_bytes_per_cell'] = round(run_peak * 1e6 / counts['cells'], 1)
+    return result
+
+
+def print_result(result):
+    print(f"\n📐 Grid {result['grid_size']}°: {result['cells']} cells, "
+          f"{result['high_risk_points']} high-risk points, {result['hotspots']} hotspots")
+    print(f"   {'stage':<16}{'median ms':>12}{'min ms':>12}{'peak MB':>10}")
+    for name, s in result['stages'].items():
+        peak = f"{s['peak_mb']:>10.1f}" if 'peak_mb' in s else f"{'-':>10}"
+        print(f"   {name:<16}{s['median_ms']:>12.1f}{s['min_ms']:>12.1f}{peak}")
+    print(f"   {'total':<16}{result['total_ms']:>12.1f}")
+    print(f"   Inference: {result['inference_cells_per_s']:,} cells/s")
+    if 'peak_mb' in result:
+        print(f"   Run peak (traced): {result['peak_mb']:.1f} MB, "
+              f"{result['peak_bytes_per_cell']:.0f} bytes/cell")
+
+
+def compare_results(current, baseline, threshold=REGRESSION_THRESHOLD,
+                    min_ms=MIN_REGRESSION_MS, min_mb=MIN_REGRESSION_MB):
+    """(grid_size, stage, metric, baseline, current) for every regression"""
+    regressions = []
+    for key, result in current['results'].items():
+        base = baseline['results'].get(key)
+        if base is None:
+            continue
+        if 'peak_mb' in result and 'peak_mb' in base:
+            before, after = base['peak_mb'], result['peak_mb']
+            if after > before * (1 + threshold) and after - before > min_mb:
+                regressions.append((key, 'run', 'peak_mb', before, after))
+        for name, s in result['stages'].items():
+            b = base['stages'].get(name)
+            if b is None:
+                continue
+            checks = [('median_ms', min_ms)]
+            if 'peak_mb' in s and 'peak_mb' in b:
+                checks.append(('peak_mb', min_mb))
+            for metric, floor in checks:
+                if s[metric] > b[metric] * (1 + threshold) and s[metric] - b[metric] > floor:
+                    regressions.append((key, name, metric, b[metric], s[metric]))
+    return regressions
+
+
+def peak_rss_mb():
+    """Process peak resident set size, or None where resource is unavailable (Windows)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1e6 if sys.platform == 'darwin' else 1e3), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stage-level benchmark of the prediction pipeline")
+    parser.add_argument('--grid-sizes', type=float, nargs='+', default=list(GRID_SIZES),
+                        help="Grid resolutions in degrees")
+    parser.add_argument('--dates', nargs='+', default=list(DATES), help="Dates from the IMD record")
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per grid size")
+    parser.add_argument('--no-memory', action='store_true', help="Skip the tracemalloc pass")
+    parser.add_argument('--clustering', choices=('raster', 'graph', 'dbscan'),
+                        help="Hotspot clustering mode (default: HOTSPOT_CLUSTERING or raster)")
+    parser.add_argument('--threads', type=int,
+                        help="Inference thread budget (default: INFERENCE_THREADS or every core)")
+    parser.add_argument('--chunk-rows', type=int,
+                        help="Grid cells per inference chunk (default: INFERENCE_CHUNK_ROWS or 65536)")
+    parser.add_argument('--database-url',
+                        help="Also time the prediction write against this (scratch) database")
+    parser.add_argument('--output', help="Write results JSON here")
+    parser.add_argument('--save-baseline', action='store_true', help=f"Store results as {BASELINE_FILE}")
+    parser.add_argument('--compare', nargs='?', const=BASELINE_FILE, metavar='BASELINE',
+                        help="Flag regressions against a results file (default: the saved baseline)")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help="Slowdown fraction that counts as a regression")
+    args = parser.parse_args()
+
+    save = args.database_url is not None
+    if save:
+        # db reads the URL when first imported
+        os.environ['DATABASE_URL'] = args.database_url
+
+    # The predictor reads its inference settings from the environment
+    if args.threads:
+        os.environ['INFERENCE_THREADS'] = str(args.threads)
+    if args.chunk_rows:
+        os.environ['INFERENCE_CHUNK_ROWS'] = str(args.chunk_rows)
+    from predict_for_date import inference_chunk_rows, inference_threads
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    model_dir = standin_model_dir()
+    results = {
+        'meta': {
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'machine': platform.machine(),
+            'cpu_count': os.cpu_count(),
+            'versions': library_versions(),
+            'standin_model': STANDIN,
+            'dates': args.dates,
+            'repeat': args.repeat,
+            'clustering': args.clustering or os.getenv('HOTSPOT_CLUSTERING', 'raster'),
+            'threads': inference_threads(),
+            'chunk_rows': inference_chunk_rows()
+        },
+        'results': {}
+    }
+
+    print(f"⏱️  Benchmarking {len(args.grid_sizes)} grid sizes x {len(args.dates)} dates, {args.repeat} runs each")
+    try:
+        for grid_size in args.grid_sizes:
+            result = bench_grid_size(model_dir, grid_size, args.dates, args.repeat, not args.no_memory, save,
+                                     args.clustering)
+            results['results'][str(grid_size)] = result
+            print_result(result)
+    finally:
+        if save:
+            import db
+            db.execute("DELETE FROM predicted_hotspots WHERE prediction_date = %s", (BENCH_PREDICTION_DATE,))
+
+    results['meta']['peak_rss_mb'] = peak_rss_mb()
+
+    for path in filter(None, [args.output, BASELINE_FILE if args.save_baseline else None]):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results written to {path}")
+
+    if baseline is not None:
+        regressions = compare_results(results, baseline, args.threshold)
+        print(f"\n🔍 Compared with {args.compare} (threshold +{args.threshold:.0%})")
+        for key, name, metric, before, after in regressions:
+            change = f"{after / before - 1:+.0%}" if before else "from 0"
+            print(f"   ❌ {key}° {name} {metric}: {before} -> {after} ({change})")
+        if regressions:
+            sys.exit(1)
+        print("   ✅ No regressions")
+
+
+if __name__ == "__main__":
+    main()
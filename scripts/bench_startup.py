@@ -0,0 +1,132 @@
+"""
+Startup Benchmark
+Measures how long the prediction entry points take before doing any work:
+fresh-interpreter import of each module (with a `-X importtime` breakdown
+of the slowest imports), `predict_for_date.py --help`, and constructing
+DateBasedPredictor.
+
+    python scripts/bench_startup.py [--repeat 5] [--top 15] [--json out.json]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import statistics
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Modules the Node server and CLI entry points import first
+ENTRY_MODULES = ('predict_for_date', 'prediction_worker', 'risk_tiles', 'risk_cube')
+
+
+def run_python(args, env=None):
+    """Run a fresh interpreter in scripts/; returns (wall seconds, stderr)"""
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable] + args, cwd=SCRIPTS_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+    )
+    elapsed = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(f"{' '.join(args)} failed:\n{result.stderr}")
+    return elapsed, result.stderr
+
+
+def time_command(args, repeat):
+    runs = [run_python(args)[0] for _ in range(repeat)]
+    return {'median_ms': round(statistics.median(runs) * 1000, 1),
+            'min_ms': round(min(runs) * 1000, 1)}
+
+
+def parse_importtime(stderr):
+    """[(module, self_us, cumulative_us)] from `-X importtime` output"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def startup_modules():
+    """Modules the interpreter imports before running any code (site, .pth hooks)"""
+    _, stderr = run_python(['-X', 'importtime', '-c', 'pass'])
+    return {name for name, _, _ in parse_importtime(stderr)}
+
+
+def import_profile(module, top, baseline=frozenset()):
+    """Slowest imports (by cumulative time) when importing `module` fresh"""
+    _, stderr = run_python(['-X', 'importtime', '-c', f'import {module}'])
+    rows = [row for row in parse_importtime(stderr) if row[0] not in baseline]
+    total = next((cum for name, _, cum in rows if name == module), 0)
+    # Report whole packages (pandas, sklearn, ...) rather than their submodules
+    first_level = {}
+    for name, _, cumulative_us in rows:
+        root = name.split('.')[0]
+        if root == name and name != module:
+            first_level[root] = max(first_level.get(root, 0), cumulative_us)
+    slowest = sorted(first_level.items(), key=lambda kv: kv[1], reverse=True)[:top]
+    return {
+        'total_ms': round(total / 1000, 1),
+        'modules_imported': len(rows),
+        'slowest': [{'module': name, 'cumulative_ms': round(us / 1000, 1)} for name, us in slowest]
+    }
+
+
+def time_predictor_init(repeat):
+    """DateBasedPredictor() in a fresh interpreter, import excluded"""
+    code = (
+        "import time, predict_for_date as p\n"
+        "t = time.perf_counter(); p.DateBasedPredictor()\n"
+        "import sys; print(time.perf_counter() - t, file=sys.stderr)"
+    )
+    runs = [float(run_python(['-c', code])[1].strip().splitlines()[-1]) for _ in range(repeat)]
+    return {'median_ms': round(statistics.median(runs) * 1000, 1),
+            'min_ms': round(min(runs) * 1000, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark prediction script startup")
+    parser.add_argument('--repeat', type=int, default=5, help="Fresh interpreters per measurement")
+    parser.add_argument('--top', type=int, default=15, help="Slowest imports to list per module")
+    parser.add_argument('--json', help="Also write the results to this file")
+    args = parser.parse_args()
+
+    results = {'python': sys.version.split()[0], 'repeat': args.repeat}
+
+    print("⏱️  Interpreter baseline")
+    results['bare_interpreter'] = time_command(['-c', 'pass'], args.repeat)
+    print(f"   python -c pass: {results['bare_interpreter']['median_ms']} ms")
+
+    baseline = startup_modules()
+    results['imports'] = {}
+    for module in ENTRY_MODULES:
+        profile = import_profile(module, args.top, baseline)
+        profile['wall'] = time_command(['-c', f'import {module}'], args.repeat)
+        results['imports'][module] = profile
+        print(f"\n📦 import {module}: {profile['wall']['median_ms']} ms wall, "
+              f"{profile['total_ms']} ms in imports ({profile['modules_imported']} modules)")
+        for entry in profile['slowest']:
+            print(f"   {entry['cumulative_ms']:>8.1f} ms  {entry['module']}")
+
+    print("\n🚀 Entry points")
+    results['predict_for_date_help'] = time_command(['predict_for_date.py', '--help'], args.repeat)
+    print(f"   predict_for_date.py --help: {results['predict_for_date_help']['median_ms']} ms")
+    try:
+        results['predictor_init'] = time_predictor_init(args.repeat)
+        print(f"   DateBasedPredictor(): {results['predictor_init']['median_ms']} ms")
+    except RuntimeError as e:
+        print(f"   ⚠️  DateBasedPredictor() not measured: {str(e).splitlines()[-1]}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+Pipeline Parity Check
+Compares the vectorized prediction path (static grid + feature engine +
+chunked inference + array physics) against a row-by-row reference kept
+here as the original implementation had it: a DataFrame grid, features
+built with DataFrame.apply, DataFrame inference, and per-row drainage and
+vulnerability physics. For each date with a fixed rainfall it reports the
+largest feature and risk differences and whether the same cells pass the
+hotspot threshold; exits 1 if any date does not match.
+
+Hotspot clustering is not compared (grid clustering replaced DBSCAN on
+jittered points by design), only the risk surface it starts from.
+
+    python scripts/check_parity.py [--cases 2023-07-09:64.85 2023-01-15:0] [--grid-size 0.004]
+"""
+
+import sys
+import time
+import argparse
+
+import numpy as np
+
+# (date, rainfall mm): dry, light, heavy and very heavy days, a leap day
+CASES = (
+    ('2023-07-09', 64.85),
+    ('2023-01-15', 0.0),
+    ('2023-08-01', 150.0),
+    ('2023-06-20', 30.0),
+    ('2024-02-29', 12.0)
+)
+
+# Largest allowed |difference|: features are float64 in both paths (ulp-level
+# differences from vectorized arithmetic); risk goes through float32 model input
+FEATURE_TOLERANCE = 1e-9
+RISK_TOLERANCE = 1e-6
+
+
+def parse_case(text):
+    """'YYYY-MM-DD:rainfall_mm'"""
+    target_date, rainfall = text.split(':')
+    return target_date, float(rainfall)
+
+
+# --- Row-by-row reference ---
+
+def reference_grid(bounds, grid_size, target_date, rainfall_24h):
+    """Grid DataFrame with the original features (create_prediction_grid + create_features)"""
+    import pandas as pd
+
+    lat_min, lat_max, lng_min, lng_max = bounds
+    lats = np.arange(lat_min, lat_max, grid_size)
+    lngs = np.arange(lng_min, lng_max, grid_size)
+    df = pd.DataFrame([{'lat': lat, 'lng': lng} for lat in lats for lng in lngs])
+    df['date'] = pd.to_datetime(target_date)
+    df['rainfall_24h'] = rainfall_24h
+
+    # Temporal features
+    df['day_of_year'] = df['date'].dt.dayofyear
+    df['month'] = df['date'].dt.month
+    df['is_monsoon'] = ((df['month'] >= 6) & (df['month'] <= 9)).astype(int)
+    df['day_sin'] = np.sin(2 * np.pi * df['day_of_year'] / 365)
+    df['day_cos'] = np.cos(2 * np.pi * df['day_of_year'] / 365)
+    df['month_sin'] = np.sin(2 * np.pi * df['month'] / 12)
+    df['month_cos'] = np.cos(2 * np.pi * df['month'] / 12)
+
+    # Spatial features
+    high_risk_zones = [
+        (28.6330, 77.2285), (28.6304, 77.2425),
+        (28.5910, 77.1610), (28.6139, 76.9830)
+    ]
+
+    def min_distance_to_risk_zone(row):
+        lat, lng = row['lat'], row['lng']
+        distances = [
+            np.sqrt((lat - risk_lat)**2 + (lng - risk_lng)**2) * 111
+            for risk_lat, risk_lng in high_risk_zones
+        ]
+        return min(distances)
+
+    df['min_dist_to_risk_zone_km'] = df.apply(min_distance_to_risk_zone, axis=1)
+    df['elevation_proxy'] = 28.7 - df['lat']
+
+    # Rainfall features
+    df['rainfall_squared'] = df['rainfall_24h'] ** 2
+    df['rainfall_log'] = np.log1p(df['rainfall_24h'])
+    df['rainfall_intensity_num'] = pd.cut(
+        df['rainfall_24h'],
+        bins=[0, 15, 35, 65, 115, 1000],
+        labels=[1, 2, 3, 4, 5]
+    ).astype(float)
+    return df
+
+
+def reference_risk(predictor, df, rainfall_24h):
+    """Ensemble probability with the original per-row drainage and vulnerability physics"""
+    model_data = predictor.model_data
+    X_scaled = model_data['scaler'].transform(df[model_data['feature_names']])
+    prob_xgb = model_data['xgb_model'].predict_proba(X_scaled)[:, 1]
+    prob_rf = model_data['rf_model'].predict_proba(X_scaled)[:, 1]
+    df = df.assign(risk_score=0.6 * prob_xgb + 0.4 * prob_rf)
+
+    def drainage_capacity(lat, lng):
+        min_dist = float('inf')
+        capacity = 50.0
+        for known_lat, known_lng, name, cap in predictor.known_locations:
+            dist = np.sqrt((lat - known_lat)**2 + (lng - known_lng)**2)
+            if dist < min_dist:
+                min_dist = dist
+                capacity = cap
+        return capacity
+
+    def apply_drainage_physics(row):
+        if rainfall_24h < drainage_capacity(row['lat'], row['lng']):
+            return row['risk_score'] * 0.2
+        return row['risk_score']
+
+    df['risk_score'] = df.apply(apply_drainage_physics, axis=1)
+
+    if predictor.verified_hotspots:
+        verified_coords = np.array([[h['lat'], h['lng']] for h in predictor.verified_hotspots])
+
+        def apply_vulnerability_multiplier(row):
+            risk = row['risk_score']
+            distances = np.sqrt((verified_coords[:, 0] - row['lat'])**2 + (verified_coords[:, 1] - row['lng'])**2)
+            if np.min(distances) < 0.0045:
+                risk = risk * 2.5
+            return min(risk, 1.0)
+
+        df['risk_score'] = df.apply(apply_vulnerability_multiplier, axis=1)
+    return df['risk_score'].to_numpy()
+
+
+# --- Comparison ---
+
+def check_case(predictor, target_date, rainfall_24h):
+    """Compare both paths for one date; returns a result dict"""
+    from feature_engine import build_feature_frame
+    from predict_for_date import HIGH_RISK_THRESHOLD
+    from static_grid import GRID_BOUNDS
+
+    grid = predictor.get_static_grid()
+    rainfall_data = {'rainfall_24h': rainfall_24h, 'temperature': 30.0, 'humidity': 70}
+    feature_names = predictor.model_data['feature_names']
+
+    started = time.perf_counter()
+    reference = reference_grid(GRID_BOUNDS, predictor.grid_size, target_date, rainfall_24h)
+    reference_surface = reference_risk(predictor, reference, rainfall_24h)
+    reference_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    features = build_feature_frame(
+        grid['lat'], grid['lng'], target_date, rainfall_24h, feature_names,
+        spatial=grid.spatial_features()
+    )
+    risk = predictor.apply_physics(predictor.grid_proba(target_date, rainfall_data), rainfall_data)
+    vectorized_s = time.perf_counter() - started
+
+    feature_diff = {
+        name: float(np.max(np.abs(features[name].to_numpy(dtype=np.float64)
+                                  - reference[name].to_numpy(dtype=np.float64))))
+        for name in feature_names
+    }
+    worst_feature = max(feature_diff, key=feature_diff.get)
+    risk_diff = float(np.max(np.abs(risk - reference_surface)))
+    mask = risk > HIGH_RISK_THRESHOLD
+    reference_mask = reference_surface > HIGH_RISK_THRESHOLD
+    return {
+        'date': target_date,
+        'rainfall_24h': rainfall_24h,
+        'cells': len(risk),
+        'worst_feature': worst_feature,
+        'feature_diff': feature_diff[worst_feature],
+        'risk_diff': risk_diff,
+        'high_risk': int(mask.sum()),
+        'mask_mismatches': int(np.count_nonzero(mask != reference_mask)),
+        'reference_s': reference_s,
+        'vectorized_s': vectorized_s,
+        'ok': (feature_diff[worst_feature] <= FEATURE_TOLERANCE and risk_diff <= RISK_TOLERANCE
+               and np.array_equal(mask, reference_mask))
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the vectorized pipeline against the row-by-row reference")
+    parser.add_argument('--cases', nargs='+', type=parse_case, default=list(CASES), metavar='DATE:MM',
+                        help="Dates and the rainfall (mm) to assume for each")
+    parser.add_argument('--grid-size', type=float, help="Cell size in degrees (default: the predictor's)")
+    args = parser.parse_args()
+
+    from predict_for_date import DateBasedPredictor, GRID_SIZE
+
+    predictor = DateBasedPredictor(grid_size=args.grid_size or GRID_SIZE)
+    print(f"\n🔍 Parity check: {len(args.cases)} dates at {predictor.grid_size} deg")
+
+    failed = 0
+    for target_date, rainfall_24h in args.cases:
+        result = check_case(predictor, target_date, rainfall_24h)
+        failed += not result['ok']
+        print(f"   {'✅' if result['ok'] else '❌'} {target_date} ({rainfall_24h:g} mm): "
+              f"{result['cells']} cells, {result['high_risk']} high-risk, "
+              f"max |Δrisk| {result['risk_diff']:.2e}, max |Δfeature| {result['feature_diff']:.2e} "
+              f"({result['worst_feature']}), {result['mask_mismatches']} threshold mismatches "
+              f"[reference {result['reference_s']:.1f}s, vectorized {result['vectorized_s']:.2f}s]")
+
+    if failed:
+        print(f"\n❌ {failed} of {len(args.cases)} dates differ from the reference")
+        sys.exit(1)
+    print(f"\n✅ All {len(args.cases)} dates match the reference")
+
+
+if __name__ == "__main__":
+    main()
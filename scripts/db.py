@@ -0,0 +1,209 @@
+"""
+Shared PostgreSQL Access
+Python counterpart of server/db.js: one connection pool per process,
+server-side prepared statements for the hot queries, and per-query timing.
+
+Prepared statements are skipped automatically behind the Supabase
+transaction pooler (port 6543), where a PREPARE and its EXECUTE can land on
+different server connections. DB_PREPARED_STATEMENTS=1/0 forces either way.
+"""
+
+import io
+import os
+import time
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+import psycopg2
+import psycopg2.errors
+import psycopg2.extensions
+from psycopg2.pool import ThreadedConnectionPool
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DATABASE_URL = os.getenv('DATABASE_URL')
+POOL_MIN = int(os.getenv('DB_POOL_MIN', '1'))
+POOL_MAX = int(os.getenv('DB_POOL_MAX', '8'))
+
+# name -> (parameter types, SQL with $n placeholders)
+PREPARED_QUERIES = {
+    'rainfall_range': (
+        ('date', 'date'),
+        """
+        SELECT record_date, rainfall_24h, temperature_c, humidity_percent, station_name, lat, lng
+        FROM historical_rainfall
+        WHERE record_date BETWEEN $1 AND $2
+        ORDER BY record_date, id
+        """
+    ),
+}
+
+
+class PooledConnection(psycopg2.extensions.connection):
+    """Connection that remembers which statements it has prepared"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+
+
+class QueryStats:
+    """Call count and latency per query name"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.queries = {}
+
+    def record(self, name, elapsed_ms):
+        with self.lock:
+            entry = self.queries.setdefault(name, {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            entry['count'] += 1
+            entry['total_ms'] += elapsed_ms
+            entry['max_ms'] = max(entry['max_ms'], elapsed_ms)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                name: {
+                    'count': e['count'],
+                    'total_ms': round(e['total_ms'], 2),
+                    'avg_ms': round(e['total_ms'] / e['count'], 2),
+                    'max_ms': round(e['max_ms'], 2)
+                }
+                for name, e in self.queries.items()
+            }
+
+
+stats = QueryStats()
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def report():
+    """Print the query timings collected so far"""
+    for name, s in sorted(stats.snapshot().items()):
+        print(f"   🗄️  {name}: {s['count']} calls, avg {s['avg_ms']} ms, max {s['max_ms']} ms")
+
+
+def use_prepared_statements(database_url=None):
+    setting = os.getenv('DB_PREPARED_STATEMENTS')
+    if setting is not None:
+        return setting == '1'
+    return urlparse(database_url or DATABASE_URL or '').port != 6543
+
+
+def get_pool():
+    """Process-wide connection pool (created on first use)"""
+    global _pool, _pool_pid
+    with _pool_lock:
+        # A forked child (batch process pool) must not share the parent's sockets
+        if _pool is None or _pool_pid != os.getpid():
+            if not DATABASE_URL:
+                raise RuntimeError("DATABASE_URL is not set")
+            _pool = ThreadedConnectionPool(
+                POOL_MIN, POOL_MAX, DATABASE_URL, connection_factory=PooledConnection
+            )
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
+
+@contextmanager
+def connection():
+    """Borrow a pooled connection; commits on success, rolls back on error"""
+    pool = get_pool()
+    conn = pool.getconn()
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        if not conn.closed:
+            conn.rollback()
+        raise
+    finally:
+        pool.putconn(conn, close=bool(conn.closed))
+
+
+@contextmanager
+def timed(name):
+    """Record the wall time of a block under a query name"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.record(name, (time.perf_counter() - started) * 1000)
+
+
+def execute(sql, params=None, name=None, fetch=False, conn=None):
+    """
+    Run one statement, timed under `name` (defaults to the first SQL words).
+    Returns all rows when fetch=True, else the affected row count.
+    """
+    name = name or ' '.join(sql.split()[:3])
+
+    def run(c):
+        with timed(name), c.cursor() as cur:
+            cur.execute(sql, params)
+            return cur.fetchall() if fetch else cur.rowcount
+
+    if conn is not None:
+        return run(conn)
+    with connection() as c:
+        return run(c)
+
+
+def _copy_field(value):
+    if value is None:
+        return '\\N'
+    return (str(value).replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+
+def copy_rows(cur, table, columns, rows):
+    """Stream rows into a table with COPY (text format); returns the row count"""
+    buf = io.StringIO()
+    for row in rows:
+        buf.write('\t'.join(_copy_field(v) for v in row))
+        buf.write('\n')
+    buf.seek(0)
+    cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buf)
+    return cur.rowcount
+
+
+def fetch_all(sql, params=None, name=None, conn=None):
+    return execute(sql, params, name=name, fetch=True, conn=conn)
+
+
+def execute_prepared(name, params, conn=None):
+    """Run one of PREPARED_QUERIES and return its rows"""
+    arg_types, sql = PREPARED_QUERIES[name]
+
+    def run(c):
+        if not use_prepared_statements():
+            plain = sql
+            for i in range(len(arg_types), 0, -1):
+                plain = plain.replace(f'${i}', '%s')
+            return fetch_all(plain, params, name=name, conn=c)
+
+        with timed(name), c.cursor() as cur:
+            if name not in c.prepared:
+                cur.execute(f"PREPARE {name} ({', '.join(arg_types)}) AS {sql}")
+                c.prepared.add(name)
+            placeholders = ', '.join(['%s'] * len(arg_types))
+            cur.execute(f"EXECUTE {name} ({placeholders})", params)
+            return cur.fetchall()
+
+    if conn is not None:
+        return run(conn)
+    with connection() as c:
+        return run(c)
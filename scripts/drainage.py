@@ -0,0 +1,89 @@
+"""
+Drainage Capacity Raster
+Nearest-neighbour (Voronoi) drainage capacity map rasterized onto the prediction grid
+"""
+
+import json
+import hashlib
+import numpy as np
+
+# Default capacity is ~50mm. VVIP areas ~70-80mm. Critical points ~20-30mm.
+DEFAULT_DRAINAGE_CAPACITY = 50.0
+
+# (lat, lng, name, drainage_capacity_mm)
+DRAINAGE_LOCATIONS = [
+    (28.6330, 77.2285, "Minto Bridge", 25),     # Critical Sump
+    (28.6304, 77.2425, "ITO Crossing", 35),     # High Traffic, Low Drainage
+    (28.5910, 77.1610, "Dhaula Kuan", 45),      # Slope runoff
+    (28.6139, 76.9830, "Najafgarh", 25),        # Rural/Drainage issues
+    (28.6675, 77.2282, "Kashmere Gate", 40),    # Old City
+    (28.5244, 77.2618, "Okhla", 30),            # Industrial
+    (28.6436, 77.1565, "Shadipur", 35),
+    (28.5355, 77.1420, "Munirka", 45),
+    (28.7041, 77.1025, "Pitampura", 55),        # Planned
+    (28.5494, 77.2117, "Green Park", 60),       # Planned
+    (28.6219, 77.0878, "Janakpuri", 55),
+    (28.5550, 77.2562, "Kalkaji", 45),
+    (28.5273, 77.2177, "Saket", 60),
+    (28.6406, 77.3060, "Preet Vihar", 50),
+    (28.6505, 77.1711, "Pushta Road", 20),      # Low lying
+    (28.6288, 77.2847, "Laxmi Nagar", 30),      # Congested
+    (28.5700, 77.3200, "Noida Sec-18 Area", 40),
+    (28.4595, 77.0266, "Gurgaon Cyber City Area", 45),
+    (28.7000, 77.2800, "Shahdara", 30),
+    (28.6900, 77.1900, "Model Town", 55),
+    (28.6000, 77.2300, "Lodhi Road", 75),       # VVIP
+    (28.5800, 77.2300, "Jangpura", 50),
+    (28.5500, 77.2000, "Hauz Khas", 65),
+    (28.5200, 77.2300, "Khanpur", 35),
+    (28.4900, 77.3000, "Badarpur", 35),
+    (28.6400, 77.1200, "Kirti Nagar", 50),
+    (28.6700, 77.1200, "Punjabi Bagh", 55),
+    (28.7300, 77.1100, "Rohini", 55),
+    (28.6100, 77.0400, "Dwarka", 60),           # Planned
+    (28.5900, 77.0700, "Palam", 40),
+    (28.6300, 77.3400, "Vaishali", 45),
+    (28.6500, 77.3700, "Indirapuram", 45),
+    (28.7500, 77.2000, "Burari", 25),           # Low lying
+    (28.6600, 77.2100, "Civil Lines", 65),
+    (28.6400, 77.2100, "Paharganj", 30),
+    (28.6200, 77.2000, "Connaught Place", 80),  # Top tier
+    (28.5900, 77.1900, "Chanakyapuri", 85),     # Diplomatic
+    (28.5700, 77.1700, "RK Puram", 60),
+    (28.5400, 77.1600, "Vasant Vihar", 70),
+    (28.5300, 77.1200, "Mahipalpur", 35),
+    (28.6800, 77.0600, "Nangloi", 30),
+    (28.6600, 77.0300, "Peeragarhi", 35),
+    (28.6200, 77.1000, "Mayapuri", 40),
+    (28.4800, 77.1800, "Chattarpur", 35)
+]
+
+
+def locations_fingerprint(locations):
+    """Content hash of a drainage location table"""
+    payload = json.dumps([list(loc) for loc in locations], sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def nearest_capacity(lat, lng, locations):
+    """Capacity of the nearest known location for each point (first wins on ties)"""
+    lat = np.asarray(lat, dtype=np.float64)
+    lng = np.asarray(lng, dtype=np.float64)
+
+    if not locations:
+        return np.full(lat.shape, DEFAULT_DRAINAGE_CAPACITY)
+
+    table = np.array([(loc[0], loc[1], loc[3]) for loc in locations], dtype=np.float64)
+    dist = np.sqrt(
+        (lat[..., None] - table[:, 0])**2 + (lng[..., None] - table[:, 1])**2
+    )
+    return table[np.argmin(dist, axis=-1), 2]
+
+
+def build_capacity_raster(lats, lngs, locations):
+    """Rasterize nearest-location capacity onto a (len(lats), len(lngs)) grid"""
+    raster = np.empty((len(lats), len(lngs)), dtype=np.float64)
+    # One grid row at a time keeps the distance matrix at len(lngs) x len(locations)
+    for i, lat in enumerate(lats):
+        raster[i] = nearest_capacity(np.full(len(lngs), lat), lngs, locations)
+    return raster
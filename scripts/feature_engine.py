@@ -0,0 +1,165 @@
+"""
+Columnar Feature Engine
+Builds model features for a whole prediction grid with array operations:
+a DataFrame for training, or a compact float32 matrix for inference.
+Training rows carry a date each, so every builder also takes an array of
+per-row dates in place of the single target date.
+"""
+
+import numpy as np
+
+# Known high-risk zones (Minto Bridge, ITO, Dhaula Kuan, Najafgarh)
+HIGH_RISK_ZONES = np.array([
+    (28.6330, 77.2285),
+    (28.6304, 77.2425),
+    (28.5910, 77.1610),
+    (28.6139, 76.9830)
+])
+
+# IMD intensity classes: (0,15] Very Light ... (115,1000] Very Heavy
+RAINFALL_INTENSITY_BINS = np.array([0, 15, 35, 65, 115, 1000])
+
+# Features the ensemble is trained (train_advanced_model.py) and scored on, in order
+FEATURE_NAMES = [
+    'rainfall_24h', 'rainfall_squared', 'rainfall_log', 'rainfall_intensity_num',
+    'lat', 'lng', 'elevation_proxy', 'min_dist_to_risk_zone_km',
+    'day_of_year', 'month', 'is_monsoon',
+    'day_sin', 'day_cos', 'month_sin', 'month_cos'
+]
+
+
+def temporal_features(target_date):
+    """
+    Temporal features for a single date, as scalars to broadcast over the
+    grid, or for an array of per-row dates, as arrays
+    """
+    import pandas as pd
+
+    if np.ndim(target_date) == 0:
+        ts = pd.Timestamp(target_date)
+        day_of_year = ts.dayofyear
+        month = ts.month
+        is_monsoon = int(6 <= month <= 9)
+    else:
+        ts = pd.DatetimeIndex(pd.to_datetime(np.asarray(target_date)))
+        day_of_year = ts.dayofyear.to_numpy(dtype=np.int64)
+        month = ts.month.to_numpy(dtype=np.int64)
+        is_monsoon = ((month >= 6) & (month <= 9)).astype(np.int64)
+
+    return {
+        'day_of_year': day_of_year,
+        'month': month,
+        'is_monsoon': is_monsoon,
+        'day_sin': np.sin(2 * np.pi * day_of_year / 365),
+        'day_cos': np.cos(2 * np.pi * day_of_year / 365),
+        'month_sin': np.sin(2 * np.pi * month / 12),
+        'month_cos': np.cos(2 * np.pi * month / 12)
+    }
+
+
+def min_dist_to_risk_zone_km(lat, lng):
+    """Distance (km, flat-earth approximation) to the nearest high-risk zone"""
+    lat = np.asarray(lat, dtype=np.float64)
+    lng = np.asarray(lng, dtype=np.float64)
+
+    min_dist = np.full(lat.shape, np.inf)
+    for risk_lat, risk_lng in HIGH_RISK_ZONES:
+        dist = np.sqrt((lat - risk_lat)**2 + (lng - risk_lng)**2) * 111
+        np.minimum(min_dist, dist, out=min_dist)
+
+    return min_dist
+
+
+def elevation_proxy(lat):
+    """Lower latitude generally means lower elevation in Delhi"""
+    return 28.7 - np.asarray(lat, dtype=np.float64)
+
+
+def rainfall_intensity_num(rainfall_24h):
+    """IMD intensity class 1-5; NaN outside (0, 1000] like pd.cut"""
+    rainfall_24h = np.asarray(rainfall_24h, dtype=np.float64)
+    idx = np.searchsorted(RAINFALL_INTENSITY_BINS, rainfall_24h, side='left')
+    valid = (idx >= 1) & (idx < len(RAINFALL_INTENSITY_BINS))
+    return np.where(valid, idx, np.nan).astype(np.float64)
+
+
+def rainfall_features(rainfall_24h):
+    """Rainfall features; accepts a scalar or a per-cell array"""
+    rainfall_24h = np.asarray(rainfall_24h, dtype=np.float64)
+    return {
+        'rainfall_24h': rainfall_24h,
+        'rainfall_squared': rainfall_24h ** 2,
+        'rainfall_log': np.log1p(rainfall_24h),
+        'rainfall_intensity_num': rainfall_intensity_num(rainfall_24h)
+    }
+
+
+def spatial_features(lat, lng):
+    """Date-independent per-cell features"""
+    return {
+        'lat': np.asarray(lat, dtype=np.float64),
+        'lng': np.asarray(lng, dtype=np.float64),
+        'elevation_proxy': elevation_proxy(lat),
+        'min_dist_to_risk_zone_km': min_dist_to_risk_zone_km(lat, lng)
+    }
+
+
+def feature_columns(lat, lng, target_date, rainfall_24h, feature_names, spatial=None):
+    """Every requested feature as an array or a scalar to broadcast, in order"""
+    columns = {}
+    columns.update(spatial if spatial is not None else spatial_features(lat, lng))
+    columns.update(temporal_features(target_date))
+    columns.update(rainfall_features(rainfall_24h))
+
+    missing = [name for name in feature_names if name not in columns]
+    if missing:
+        raise KeyError(f"Feature engine cannot produce: {missing}")
+    return [columns[name] for name in feature_names]
+
+
+def build_feature_frame(lat, lng, target_date, rainfall_24h, feature_names=None, spatial=None):
+    """
+    Build the feature frame for a grid of cells on one date (or for rows
+    with a date each, e.g. training samples).
+
+    Temporal and scalar rainfall features are computed once and broadcast;
+    spatial features are whole-array operations. `spatial` may carry
+    precomputed spatial columns. Columns come out in `feature_names` order.
+    """
+    import pandas as pd
+
+    feature_names = list(feature_names or FEATURE_NAMES)
+    n = len(lat)
+    columns = feature_columns(lat, lng, target_date, rainfall_24h, feature_names, spatial)
+
+    return pd.DataFrame({
+        name: np.broadcast_to(column, (n,)) for name, column in zip(feature_names, columns)
+    })
+
+
+def build_feature_matrix(lat, lng, target_date, rainfall_24h, feature_names=None, spatial=None,
+                         mean=None, scale=None, out=None):
+    """
+    Model input for a grid of cells on one date as a C-contiguous
+    (n_cells, n_features) float32 matrix, written into `out` if given.
+
+    With `mean`/`scale` (the fitted StandardScaler) each column is
+    standardized in float64 before the float32 store, so the matrix holds
+    exactly what scaling a float64 frame and handing it to the models would.
+    Only one float64 column is alive at a time.
+    """
+    feature_names = list(feature_names or FEATURE_NAMES)
+    n = len(lat)
+    columns = feature_columns(lat, lng, target_date, rainfall_24h, feature_names, spatial)
+
+    if out is None:
+        out = np.empty((n, len(feature_names)), dtype=np.float32)
+    elif out.shape != (n, len(feature_names)) or out.dtype != np.float32:
+        raise ValueError(f"out must be a float32 array of shape {(n, len(feature_names))}")
+
+    for j, column in enumerate(columns):
+        column = np.asarray(column, dtype=np.float64)
+        if mean is not None:
+            column = (column - mean[j]) / scale[j]
+        out[:, j] = column
+    return out
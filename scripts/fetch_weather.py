@@ -2,8 +2,10 @@ import requests
 import json
 from datetime import datetime
 
+from weather_client import FORECAST_URL, HOURLY_TTL, get_client as get_weather_client
+
 # Open-Meteo API Endpoint
-API_URL = "https://api.open-meteo.com/v1/forecast"
+API_URL = FORECAST_URL
 
 # Delhi Coordinates (Center)
 LAT = 28.6139
@@ -22,9 +24,7 @@ def fetch_weather_forecast():
     }
 
     try:
-        response = requests.get(API_URL, params=params)
-        response.raise_for_status()
-        data = response.json()
+        data = get_weather_client().get_json(API_URL, params, ttl=HOURLY_TTL)
         
         hourly = data.get("hourly", {})
         times = hourly.get("time", [])
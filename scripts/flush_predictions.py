@@ -1,24 +1,10 @@
 
-import os
-import psycopg2
-from dotenv import load_dotenv
-
-load_dotenv()
-
-DATABASE_URL = os.getenv('DATABASE_URL')
+import db
 
 def flush_db():
     try:
-        conn = psycopg2.connect(DATABASE_URL)
-        cur = conn.cursor()
-        
         print("🧹 Flushing stale predictions from database...")
-        cur.execute("DELETE FROM predicted_hotspots;")
-        rows_deleted = cur.rowcount
-        
-        conn.commit()
-        cur.close()
-        conn.close()
+        rows_deleted = db.execute("DELETE FROM predicted_hotspots;")
         
         print(f"✅ Successfully removed {rows_deleted} stale prediction records.")
         print("   The system is now forced to regenerate authentic forecasts for all dates.")
@@ -0,0 +1,366 @@
+"""
+Grid Clustering
+DBSCAN semantics evaluated directly on the prediction grid. High-risk cells
+sit on a regular lattice, so every cell's eps-neighbourhood is the same
+fixed footprint of (row, col) offsets and no neighbour search is needed:
+
+    raster  connected components of the boolean risk raster (linear time)
+    graph   sklearn DBSCAN on a sparse neighbour graph built from the footprint
+
+Both treat a cell as core when at least min_samples high-risk cells
+(itself included) lie within eps, link core cells within eps of each
+other, and attach border cells to a neighbouring core cell's cluster.
+Noise is labelled -1, as in sklearn. Border cells reachable from two
+clusters go to the higher label (raster) or the first cluster to reach
+them (graph), so the two modes can differ only in those cells.
+
+label_cells gives the raster labels for a grid too large to rasterize,
+from the sorted flat indices of its high-risk cells alone: the footprint
+is a run of columns in each row, so every neighbourhood query is a pair
+of binary searches over the cell indices.
+
+cluster_summary and top_clusters reduce labelled points to per-cluster
+statistics with grouped (bincount / reduceat) operations, whatever
+produced the labels.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+# Distances within this fraction of eps count as inside (lattice offsets
+# that are exact multiples of eps land on it up to float error)
+EPS_TOLERANCE = 1e-9
+
+# label_cells answers neighbourhood queries this many cells at a time, so
+# its temporaries stay the same size however many cells there are
+QUERY_CHUNK = 1 << 18
+
+
+@lru_cache(maxsize=16)
+def footprint(grid_size, eps):
+    """Boolean (2r+1, 2r+1) mask of the offsets within eps of a cell"""
+    radius = int(np.floor(eps / grid_size * (1 + EPS_TOLERANCE)))
+    steps = np.arange(-radius, radius + 1)
+    dist = np.hypot(steps[:, None], steps[None, :]) * grid_size
+    mask = dist <= eps * (1 + EPS_TOLERANCE)
+    mask.setflags(write=False)
+    return mask
+
+
+def footprint_offsets(grid_size, eps, half=False):
+    """(d_row, d_col, distance) for every non-zero offset (one of each +/- pair if half)"""
+    mask = footprint(grid_size, eps)
+    radius = mask.shape[0] // 2
+    offsets = []
+    for d_row, d_col in zip(*np.nonzero(mask)):
+        d_row, d_col = int(d_row) - radius, int(d_col) - radius
+        if (d_row, d_col) == (0, 0) or (half and (d_row, d_col) < (0, 0)):
+            continue
+        offsets.append((d_row, d_col, float(np.hypot(d_row, d_col) * grid_size)))
+    return offsets
+
+
+def footprint_spans(grid_size, eps):
+    """(d_row, half_width) for each row of the footprint: columns -w..w of that row are inside"""
+    mask = footprint(grid_size, eps)
+    radius = mask.shape[0] // 2
+    return [(i - radius, int(row.sum()) // 2) for i, row in enumerate(mask)]
+
+
+def _shifted(shape, d_row, d_col):
+    """Slices (src, dst) pairing each cell with the cell at +(d_row, d_col)"""
+    def axis(d, n):
+        if abs(d) >= n:
+            # The offset leaves the grid: no pairs
+            return slice(0, 0), slice(0, 0)
+        return (slice(0, n - d), slice(d, n)) if d >= 0 else (slice(-d, n), slice(0, n + d))
+    (src_r, dst_r), (src_c, dst_c) = axis(d_row, shape[0]), axis(d_col, shape[1])
+    return (src_r, src_c), (dst_r, dst_c)
+
+
+def neighbour_counts(mask, grid_size, eps):
+    """High-risk cells (self included) within eps of every cell"""
+    from scipy import ndimage
+
+    kernel = footprint(grid_size, eps)
+    return ndimage.correlate(mask.astype(np.int32), kernel.astype(np.int32), mode='constant')
+
+
+def label_raster(mask, grid_size, eps, min_samples):
+    """
+    DBSCAN labels for every cell of a boolean (rows, cols) raster, as an
+    int32 raster: -1 for noise and for cells outside the mask.
+    """
+    from scipy import ndimage
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+
+    kernel = footprint(grid_size, eps)
+    radius = kernel.shape[0] // 2
+    core = mask & (neighbour_counts(mask, grid_size, eps) >= min_samples)
+
+    # Components over the offsets inside the 3x3 box, in one pass...
+    structure = np.zeros((3, 3), dtype=bool)
+    inner = kernel[max(radius - 1, 0):radius + 2, max(radius - 1, 0):radius + 2]
+    structure[(3 - inner.shape[0]) // 2:(3 + inner.shape[0]) // 2,
+              (3 - inner.shape[1]) // 2:(3 + inner.shape[1]) // 2] = inner
+    labels, n_labels = ndimage.label(core, structure=structure)
+
+    # ...then merge components linked by the longer offsets still within eps
+    pairs = []
+    for d_row, d_col, _ in footprint_offsets(grid_size, eps, half=True):
+        if abs(d_row) <= 1 and abs(d_col) <= 1:
+            continue
+        src, dst = _shifted(mask.shape, d_row, d_col)
+        a, b = labels[src], labels[dst]
+        linked = (a > 0) & (b > 0) & (a != b)
+        if linked.any():
+            pairs.append(np.unique(np.stack([a[linked], b[linked]], axis=1), axis=0))
+    if pairs:
+        pairs = np.unique(np.concatenate(pairs), axis=0)
+        graph = coo_matrix(
+            (np.ones(len(pairs), dtype=np.int8), (pairs[:, 0], pairs[:, 1])),
+            shape=(n_labels + 1, n_labels + 1)
+        )
+        _, component = connected_components(graph, directed=False)
+        # Components are numbered by their smallest label, i.e. by first core
+        # cell in raster order, like ndimage.label: the background (label 0,
+        # no links) stays 0 and clusters stay dense, 1..n
+        labels = component.astype(np.int32)[labels]
+
+    # Border cells take the largest core label within eps
+    border_labels = ndimage.maximum_filter(labels, footprint=kernel, mode='constant', cval=0)
+    result = np.where(core, labels, np.where(mask & (border_labels > 0), border_labels, 0))
+    return (result - 1).astype(np.int32)
+
+
+def _query_chunks(n):
+    """Slices of QUERY_CHUNK queries covering range(n)"""
+    for start in range(0, n, QUERY_CHUNK):
+        yield slice(start, min(start + QUERY_CHUNK, n))
+
+
+def _span_bounds(keys, cells, shape, d_row, half_width):
+    """
+    [lo, hi) positions in sorted flat `keys` of the cells within
+    half_width columns of each of `cells`, d_row rows down
+    """
+    n_rows, n_cols = shape
+    rows, cols = np.divmod(cells, n_cols)
+    target = rows + d_row
+    base = target * n_cols
+    lo = np.searchsorted(keys, base + np.maximum(cols - half_width, 0), side='left')
+    hi = np.searchsorted(keys, base + np.minimum(cols + half_width, n_cols - 1), side='right')
+    outside = (target < 0) | (target >= n_rows)
+    hi[outside] = lo[outside]
+    return lo, hi
+
+
+def _sparse_table(values, longest):
+    """[values, max of each 2 consecutive values, of each 4, ...] up to windows of `longest`"""
+    table = [values]
+    while 2 ** len(table) <= longest:
+        step = 2 ** (len(table) - 1)
+        prev = table[-1]
+        table.append(np.maximum(prev[:-step], prev[step:]) if len(prev) > step else prev[:0])
+    return table
+
+
+def _range_max(table, lo, hi):
+    """max(values[lo:hi]) for each non-empty range, from two overlapping table windows"""
+    level = np.log2(hi - lo).astype(np.int64)
+    result = np.empty(len(lo), dtype=table[0].dtype)
+    for j, window in enumerate(table):
+        at = level == j
+        if at.any():
+            result[at] = np.maximum(window[lo[at]], window[hi[at] - 2 ** j])
+    return result
+
+
+def label_cells(cells, shape, grid_size, eps, min_samples):
+    """
+    label_raster(mask)[mask] for a (rows, cols) mask given only as the
+    sorted flat indices of its cells: int32 labels in that order, -1 for
+    noise (numbered from 0 by each cluster's first core cell, in the same
+    order as label_raster's). Memory is linear in the number of cells,
+    whatever the grid area.
+    """
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+
+    cells = np.ascontiguousarray(cells, dtype=np.int64)
+    labels = np.full(len(cells), -1, dtype=np.int32)
+    spans = footprint_spans(grid_size, eps)
+    radius = len(spans) // 2
+
+    # Cells within eps (self included): one run of cells per footprint row
+    counts = np.zeros(len(cells), dtype=np.int32)
+    for chunk in _query_chunks(len(cells)):
+        for d_row, half_width in spans:
+            lo, hi = _span_bounds(cells, cells[chunk], shape, d_row, half_width)
+            counts[chunk] += hi - lo
+    is_core = counts >= min_samples
+    del counts
+    core_cells = cells[is_core]
+    if len(core_cells) == 0:
+        return labels
+
+    # Core cells at most r columns apart in a row are within eps, so each
+    # row's chains of them are connected outright...
+    new_chain = np.ones(len(core_cells), dtype=bool)
+    new_chain[1:] = (np.diff(core_cells) > radius) | (np.diff(core_cells // shape[1]) != 0)
+    component = np.cumsum(new_chain) - 1
+    del new_chain
+
+    # ...and chains are merged through the rows below. A core cell is
+    # within eps of every core cell of the run its footprint covers in a
+    # row; that run spans at most 2r+1 columns, so it falls into at most
+    # two chains, each holding one of the run's ends. Linking a cell to
+    # both ends joins exactly what the full neighbour graph would.
+    for d_row, half_width in spans:
+        if d_row <= 0:
+            continue
+        pairs = []
+        for chunk in _query_chunks(len(core_cells)):
+            lo, hi = _span_bounds(core_cells, core_cells[chunk], shape, d_row, half_width)
+            found = np.flatnonzero(hi > lo)
+            own = component[chunk][found]
+            for end in (lo[found], hi[found] - 1):
+                other = component[end]
+                linked = own != other
+                if linked.any():
+                    pairs.append(np.unique(np.stack([own[linked], other[linked]], axis=1), axis=0))
+        if pairs:
+            pairs = np.unique(np.concatenate(pairs), axis=0)
+            n_components = int(component.max()) + 1
+            graph = coo_matrix(
+                (np.ones(len(pairs), dtype=np.int8), (pairs[:, 0], pairs[:, 1])),
+                shape=(n_components, n_components)
+            )
+            _, merged = connected_components(graph, directed=False)
+            component = merged[component]
+
+    # Numbered by each cluster's first cell in grid order
+    _, first, inverse = np.unique(component, return_index=True, return_inverse=True)
+    del component
+    rank = np.empty(len(first), dtype=np.int32)
+    rank[np.argsort(first, kind='stable')] = np.arange(len(first), dtype=np.int32)
+    core_labels = rank[inverse]
+    del inverse
+    labels[is_core] = core_labels
+
+    # Border cells take the largest core label within eps
+    border = np.flatnonzero(~is_core)
+    if len(border):
+        table = _sparse_table(core_labels, 2 * radius + 1)
+        best = np.full(len(border), -1, dtype=np.int32)
+        for chunk in _query_chunks(len(border)):
+            queries = cells[border[chunk]]
+            chunk_best = best[chunk]
+            for d_row, half_width in spans:
+                lo, hi = _span_bounds(core_cells, queries, shape, d_row, half_width)
+                found = hi > lo
+                if found.any():
+                    chunk_best[found] = np.maximum(
+                        chunk_best[found], _range_max(table, lo[found], hi[found])
+                    )
+        labels[border] = best
+    return labels
+
+
+def neighbour_graph(mask, grid_size, eps):
+    """
+    Sparse (n, n) eps-neighbour distance graph over the mask's cells, in
+    flat (row-major) order, built from the fixed footprint offsets. Each
+    row holds the cell itself (distance 0) and then its neighbours by
+    increasing distance, the layout sklearn would otherwise re-sort into.
+    """
+    from scipy.sparse import csr_matrix
+
+    n = int(mask.sum())
+    position = np.full(mask.shape, -1, dtype=np.int64)
+    position[mask] = np.arange(n)
+
+    rows, cols, dists = [np.arange(n)], [np.arange(n)], [np.zeros(n)]
+    offsets = sorted(footprint_offsets(grid_size, eps, half=True), key=lambda o: o[2])
+    for d_row, d_col, dist in offsets:
+        src, dst = _shifted(mask.shape, d_row, d_col)
+        a, b = position[src], position[dst]
+        both = (a >= 0) & (b >= 0)
+        a, b = a[both], b[both]
+        rows += [a, b]
+        cols += [b, a]
+        # Offsets on the eps boundary (up to float error) must stay neighbours
+        dists.append(np.full(2 * len(a), min(dist, eps)))
+
+    # A stable sort by row keeps each row's entries in distance order
+    # (COO -> CSR conversion would re-sort them by column)
+    rows = np.concatenate(rows)
+    order = np.argsort(rows, kind='stable')
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+    return csr_matrix(
+        (np.concatenate(dists)[order], np.concatenate(cols)[order], indptr), shape=(n, n)
+    )
+
+
+def dbscan_graph(mask, grid_size, eps, min_samples):
+    """sklearn DBSCAN labels (flat order of the mask's cells) from the precomputed grid graph"""
+    from sklearn.cluster import DBSCAN
+
+    if not mask.any():
+        return np.empty(0, dtype=np.int64)
+    graph = neighbour_graph(mask, grid_size, eps)
+    return DBSCAN(eps=eps, min_samples=min_samples, metric='precomputed').fit(graph).labels_
+
+
+def cluster_summary(labels, lat, lng, risk, rainfall=None):
+    """
+    Per-cluster statistics of labelled points, noise (-1) dropped, in one
+    pass of grouped reductions. Returns arrays indexed by cluster:
+    size, lat/lng centroid, risk_mean, risk_max, radius_deg (largest
+    point distance from the centroid) and first (index of the cluster's
+    first point, for first-seen ordering), plus rainfall_mean if the
+    points carry per-point rainfall.
+    """
+    labels = np.asarray(labels)
+    keep = np.flatnonzero(labels >= 0)
+    _, first, inverse = np.unique(labels[keep], return_index=True, return_inverse=True)
+    lat, lng, risk = lat[keep], lng[keep], risk[keep]
+
+    size = np.bincount(inverse)
+    center_lat = np.bincount(inverse, weights=lat) / size
+    center_lng = np.bincount(inverse, weights=lng) / size
+    distance = np.sqrt((lat - center_lat[inverse])**2 + (lng - center_lng[inverse])**2)
+
+    # Max reductions over each cluster's contiguous run of points
+    order = np.argsort(inverse, kind='stable')
+    starts = np.concatenate([[0], np.cumsum(size)[:-1]])
+    summary = {
+        'size': size,
+        'lat': center_lat,
+        'lng': center_lng,
+        'risk_mean': np.bincount(inverse, weights=risk) / size,
+        'risk_max': np.maximum.reduceat(risk[order], starts) if len(size) else np.empty(0),
+        'radius_deg': np.maximum.reduceat(distance[order], starts) if len(size) else np.empty(0),
+        'first': keep[first]
+    }
+    if rainfall is not None:
+        summary['rainfall_mean'] = np.bincount(inverse, weights=rainfall[keep]) / size
+    return summary
+
+
+def top_clusters(score, first, k):
+    """
+    Indices of the k highest-scoring clusters, best first; equal scores
+    keep first-seen order. Only clusters at or above the k-th score are sorted.
+    """
+    n = len(score)
+    if n > k:
+        kth = np.partition(score, n - k)[n - k]
+        candidates = np.flatnonzero(score >= kth)
+    else:
+        candidates = np.arange(n)
+    order = np.lexsort((first[candidates], -score[candidates]))
+    return candidates[order][:k]
@@ -0,0 +1,106 @@
+"""
+Location Name Index
+Reverse geocoding for hotspot centroids: a KD-tree over the drainage
+locations and the historical hotspot lists, built once per process and
+queried for every cluster centre in one call.
+"""
+
+import os
+import numpy as np
+
+from drainage import DRAINAGE_LOCATIONS
+
+BASE_DIR = os.path.join(os.path.dirname(__file__), '..')
+SPOTS_FILE = os.path.join(BASE_DIR, 'data', 'historical', 'delhi_waterlogging_spots_database.csv')
+MANUAL_FILE = os.path.join(BASE_DIR, 'delhi_hotspots_manual.csv')
+
+# Farther than this (degrees, ~3km) from every known place -> "Zone near X"
+NEAR_THRESHOLD = 0.03
+
+# Memo key resolution (degrees, ~11m); lookups are answered for the snapped point
+QUANTUM = 1e-4
+
+
+def load_places(locations=DRAINAGE_LOCATIONS, spots_file=SPOTS_FILE, manual_file=MANUAL_FILE):
+    """
+    (names, coords) for every known place. Drainage locations come first so
+    their names win when a CSV lists the same place again.
+    """
+    import pandas as pd
+
+    names = [name for _, _, name, _ in locations]
+    coords = [(lat, lng) for lat, lng, _, _ in locations]
+
+    sources = [
+        (spots_file, {}),
+        # Name, Lat, Lng, Description (no header row)
+        (manual_file, {'header': None, 'names': ['name', 'lat', 'lng', 'description']}),
+    ]
+    for path, read_kwargs in sources:
+        if not os.path.exists(path):
+            continue
+        df = pd.read_csv(path, **read_kwargs).dropna(subset=['name', 'lat', 'lng'])
+        names.extend(df['name'].astype(str).str.strip())
+        coords.extend(zip(df['lat'].astype(float), df['lng'].astype(float)))
+
+    seen = set()
+    keep = []
+    for i, name in enumerate(names):
+        if name not in seen:
+            seen.add(name)
+            keep.append(i)
+
+    return np.array(names, dtype=object)[keep], np.array(coords, dtype=np.float64)[keep]
+
+
+class LocationIndex:
+    """Nearest known place for batches of coordinates, memoized per ~11m cell"""
+
+    def __init__(self, names, coords, near_threshold=NEAR_THRESHOLD, quantum=QUANTUM):
+        from sklearn.neighbors import KDTree
+
+        self.names = names
+        self.tree = KDTree(coords)
+        self.near_threshold = near_threshold
+        self.quantum = quantum
+        self.memo = {}  # (lat_q, lng_q) -> display name
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, lats, lngs):
+        """Display names for each (lat, lng), as a list"""
+        keys = np.column_stack([
+            np.rint(np.asarray(lats, dtype=np.float64) / self.quantum),
+            np.rint(np.asarray(lngs, dtype=np.float64) / self.quantum)
+        ]).astype(np.int64)
+        if len(keys) == 0:
+            return []
+
+        unique_keys, inverse = np.unique(keys, axis=0, return_inverse=True)
+        key_tuples = [tuple(k) for k in unique_keys.tolist()]
+        missing = [i for i, k in enumerate(key_tuples) if k not in self.memo]
+        self.hits += len(key_tuples) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            points = unique_keys[missing] * self.quantum
+            dist, idx = self.tree.query(points, k=1)
+            for i, d, j in zip(missing, dist[:, 0], idx[:, 0]):
+                name = self.names[j]
+                self.memo[key_tuples[i]] = f"Zone near {name}" if d > self.near_threshold else name
+
+        resolved = [self.memo[k] for k in key_tuples]
+        return [resolved[i] for i in inverse.ravel()]
+
+    def name_for(self, lat, lng):
+        return self.lookup([lat], [lng])[0]
+
+
+_index = None
+
+def get_index():
+    """Process-wide LocationIndex over the default place lists"""
+    global _index
+    if _index is None:
+        _index = LocationIndex(*load_places())
+    return _index
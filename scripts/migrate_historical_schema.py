@@ -3,20 +3,13 @@ Database Migration Script for Historical Prediction System
 Creates new tables for historical incidents, rainfall data, and predictions
 """
 
-import os
-from dotenv import load_dotenv
-import psycopg2
-from psycopg2 import sql
-
-load_dotenv()
-
-# Database connection
-DATABASE_URL = os.getenv('DATABASE_URL')
+import db
 
 def run_migration():
     """Execute database migration for historical prediction system"""
     
-    conn = psycopg2.connect(DATABASE_URL)
+    pool = db.get_pool()
+    conn = pool.getconn()
     cur = conn.cursor()
     
     try:
@@ -183,7 +176,7 @@ def run_migration():
     
     finally:
         cur.close()
-        conn.close()
+        pool.putconn(conn)
 
 if __name__ == "__main__":
     run_migration()
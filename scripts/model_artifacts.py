@@ -0,0 +1,339 @@
+"""
+Model Artifact Bundle
+Pickle-free storage for the XGBoost + Random Forest ensemble:
+
+    models/waterlogging_advanced_v2/
+        manifest.json     model version, features, metrics, scaler, forest shape
+        xgb.ubj           XGBoost native binary model
+        rf_*.npy          forest as flat node arrays (memory-mapped on load)
+
+load_bundle() returns a read-only mapping with the same keys as the old
+pickle ('xgb_model', 'rf_model', 'scaler', 'model_version', ...). Metadata
+comes from the manifest alone; the trees are only read on first access.
+Both models are pinned to the bundle's thread budget when loaded.
+"""
+
+import os
+import sys
+import json
+import shutil
+import argparse
+from collections.abc import Mapping
+
+import numpy as np
+
+MODELS_DIR = os.path.join(os.path.dirname(__file__), '..', 'models')
+BUNDLE_DIR = os.path.join(MODELS_DIR, 'waterlogging_advanced_v2')
+LEGACY_PICKLE = os.path.join(MODELS_DIR, 'waterlogging_advanced_v2.pkl')
+
+BUNDLE_FORMAT_VERSION = 1
+
+# Flat forest arrays: every tree's nodes back to back, sklearn node semantics
+# (children are tree-local, -1 marks a leaf); node_offsets[t] is tree t's first node
+RF_ARRAYS = (
+    'node_offsets', 'depth', 'children_left', 'children_right',
+    'feature', 'threshold', 'missing_go_to_left', 'value'
+)
+
+# Keys whose values are loaded from disk on first access
+LAZY_KEYS = ('xgb_model', 'rf_model', 'scaler')
+
+
+class FlatScaler:
+    """StandardScaler.transform from stored mean/scale"""
+
+    def __init__(self, mean, scale):
+        self.mean_ = np.asarray(mean, dtype=np.float64)
+        self.scale_ = np.asarray(scale, dtype=np.float64)
+
+    def transform(self, X):
+        X = np.array(X, dtype=np.float64)
+        X -= self.mean_
+        X /= self.scale_
+        return X
+
+
+def build_sklearn_trees(arrays, n_features, n_classes):
+    """
+    Rebuild sklearn's compiled Tree objects from the node arrays, so
+    inference runs at native speed. Raises ImportError/ValueError if this
+    sklearn cannot take them.
+    """
+    from sklearn.tree._tree import Tree, NODE_DTYPE
+
+    offsets = arrays['node_offsets']
+    trees = []
+    for t in range(len(offsets) - 1):
+        start, end = int(offsets[t]), int(offsets[t + 1])
+        nodes = np.zeros(end - start, dtype=NODE_DTYPE)
+        nodes['left_child'] = arrays['children_left'][start:end]
+        nodes['right_child'] = arrays['children_right'][start:end]
+        nodes['feature'] = arrays['feature'][start:end]
+        nodes['threshold'] = arrays['threshold'][start:end]
+        if 'missing_go_to_left' in NODE_DTYPE.names:
+            nodes['missing_go_to_left'] = arrays['missing_go_to_left'][start:end]
+
+        tree = Tree(n_features, np.array([n_classes], dtype=np.intp), 1)
+        tree.__setstate__({
+            'max_depth': int(arrays['depth'][t]),
+            'node_count': end - start,
+            'nodes': nodes,
+            'values': np.ascontiguousarray(arrays['value'][start:end], dtype=np.float64)[:, None, :]
+        })
+        trees.append(tree)
+    return trees
+
+
+class FlatForest:
+    """
+    RandomForestClassifier.predict_proba over the flat node arrays. Uses
+    sklearn's compiled trees when they can be rebuilt; otherwise every sample
+    walks the arrays in NumPy (leaves point at themselves, so max_depth steps
+    land every walk on its leaf).
+    """
+
+    def __init__(self, arrays, classes, n_features, threads=None):
+        self.arrays = arrays
+        self.classes_ = np.asarray(classes)
+        self.n_features_in_ = n_features
+        self.threads = threads or os.cpu_count() or 1
+        try:
+            self.trees = build_sklearn_trees(arrays, n_features, len(self.classes_))
+        except (ImportError, ValueError, TypeError) as e:
+            print(f"   ⚠️  Using NumPy forest traversal: {e}")
+            self.trees = None
+            self._init_walk()
+
+    @property
+    def n_estimators(self):
+        return len(self.arrays['node_offsets']) - 1
+
+    def _init_walk(self):
+        a = self.arrays
+        offsets = a['node_offsets']
+        n_nodes = int(offsets[-1])
+        base = np.repeat(offsets[:-1], np.diff(offsets))
+        is_leaf = a['children_left'] < 0
+        node_ids = np.arange(n_nodes)
+
+        self.roots = offsets[:-1].astype(np.intp)
+        self.max_depth = int(a['depth'].max())
+        self.feature = np.where(is_leaf, 0, a['feature']).astype(np.intp)
+        self.threshold = np.where(is_leaf, 0.0, a['threshold'])
+        self.missing_left = np.asarray(a['missing_go_to_left'], dtype=bool)
+        self.left = np.where(is_leaf, node_ids, a['children_left'] + base).astype(np.intp)
+        self.right = np.where(is_leaf, node_ids, a['children_right'] + base).astype(np.intp)
+
+    def _walk(self, X, chunk_size=8192):
+        """Leaf node index (global) of every (sample, tree)"""
+        leaves = np.empty((len(X), len(self.roots)), dtype=np.intp)
+        for start in range(0, len(X), chunk_size):
+            chunk = X[start:start + chunk_size]
+            rows = np.arange(len(chunk))[:, None]
+            node = np.broadcast_to(self.roots, (len(chunk), len(self.roots)))
+            for _ in range(self.max_depth):
+                value = chunk[rows, self.feature[node]]
+                go_left = value <= self.threshold[node]
+                go_left |= np.isnan(value) & self.missing_left[node]
+                node = np.where(go_left, self.left[node], self.right[node])
+            leaves[start:start + len(chunk)] = node
+        return leaves
+
+    def predict_proba(self, X):
+        # sklearn compares float32 features against float64 thresholds
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_classes = len(self.classes_)
+
+        if self.trees is None:
+            value = np.asarray(self.arrays['value'])
+            proba = np.zeros((len(X), n_classes))
+            for leaf in self._walk(X).T:
+                proba += value[leaf]
+        else:
+            from concurrent.futures import ThreadPoolExecutor
+
+            def tree_sum(trees):
+                total = np.zeros((len(X), n_classes))
+                for tree in trees:
+                    total += tree.predict(X).reshape(len(X), n_classes)
+                return total
+
+            # Tree.predict releases the GIL, so threads split the forest
+            groups = [self.trees[i::self.threads] for i in range(self.threads)]
+            with ThreadPoolExecutor(max_workers=self.threads) as pool:
+                proba = sum(pool.map(tree_sum, [g for g in groups if g]))
+
+        proba /= self.n_estimators
+        return proba
+
+
+def flatten_forest(rf_model):
+    """Flat node arrays for a fitted RandomForestClassifier"""
+    trees = [est.tree_ for est in rf_model.estimators_]
+    parts = {name: [] for name in RF_ARRAYS if name not in ('node_offsets', 'depth')}
+    for tree in trees:
+        parts['children_left'].append(tree.children_left.astype(np.int32))
+        parts['children_right'].append(tree.children_right.astype(np.int32))
+        parts['feature'].append(tree.feature.astype(np.int32))
+        parts['threshold'].append(tree.threshold)
+
+        missing = getattr(tree, 'missing_go_to_left', None)
+        parts['missing_go_to_left'].append(
+            np.zeros(tree.node_count, dtype=np.uint8) if missing is None else missing.astype(np.uint8)
+        )
+
+        # Per-node class probabilities (older sklearn stores raw counts)
+        value = tree.value[:, 0, :]
+        parts['value'].append(value / value.sum(axis=1, keepdims=True))
+
+    arrays = {name: np.concatenate(chunks) for name, chunks in parts.items()}
+    arrays['node_offsets'] = np.cumsum([0] + [t.node_count for t in trees]).astype(np.int64)
+    arrays['depth'] = np.array([t.max_depth for t in trees], dtype=np.int32)
+    return arrays
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Not JSON serializable: {type(value).__name__}")
+
+
+def export_bundle(model_data, path=BUNDLE_DIR):
+    """Write a trained model dict (as produced by the trainer) as a bundle directory"""
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    model_data['xgb_model'].save_model(os.path.join(tmp_path, 'xgb.ubj'))
+
+    rf_model = model_data['rf_model']
+    arrays = flatten_forest(rf_model)
+    for name in RF_ARRAYS:
+        np.save(os.path.join(tmp_path, f'rf_{name}.npy'), np.ascontiguousarray(arrays[name]))
+
+    scaler = model_data['scaler']
+    manifest = {
+        'format_version': BUNDLE_FORMAT_VERSION,
+        'model_version': model_data['model_version'],
+        'trained_at': model_data.get('trained_at'),
+        'feature_names': list(model_data['feature_names']),
+        'metrics': model_data.get('metrics', {}),
+        'scaler': {'mean': scaler.mean_, 'scale': scaler.scale_},
+        'xgb': {'file': 'xgb.ubj'},
+        'rf': {
+            'classes': rf_model.classes_,
+            'n_estimators': len(rf_model.estimators_),
+            'n_features': int(rf_model.n_features_in_),
+            'n_nodes': int(len(arrays['feature']))
+        }
+    }
+    with open(os.path.join(tmp_path, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2, default=_json_default)
+
+    # Swap in the new bundle; a reader sees either the old directory or the new one
+    old_path = f'{path}.{os.getpid()}.old'
+    if os.path.exists(path):
+        os.rename(path, old_path)
+    os.rename(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+    return path
+
+
+class ModelBundle(Mapping):
+    """Read-only, lazily loaded view of a bundle directory"""
+
+    def __init__(self, path=BUNDLE_DIR, threads=None):
+        self.path = path
+        self.threads = threads or os.cpu_count() or 1
+        with open(os.path.join(path, 'manifest.json')) as f:
+            self.manifest = json.load(f)
+        if self.manifest.get('format_version') != BUNDLE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported model bundle format: {self.manifest.get('format_version')}")
+        self.loaded = {}
+
+    def _load(self, key):
+        if key == 'xgb_model':
+            import xgboost as xgb
+            model = xgb.XGBClassifier(n_jobs=self.threads)
+            model.load_model(os.path.join(self.path, self.manifest['xgb']['file']))
+            # load_model restores the saved thread setting; inplace_predict reads the booster's
+            model.set_params(n_jobs=self.threads)
+            model.get_booster().set_param({'nthread': self.threads})
+            return model
+        if key == 'rf_model':
+            rf = self.manifest['rf']
+            arrays = {
+                name: np.load(os.path.join(self.path, f'rf_{name}.npy'), mmap_mode='r')
+                for name in RF_ARRAYS
+            }
+            return FlatForest(arrays, rf['classes'], rf['n_features'], threads=self.threads)
+        if key == 'scaler':
+            return FlatScaler(self.manifest['scaler']['mean'], self.manifest['scaler']['scale'])
+        raise KeyError(key)
+
+    def __getitem__(self, key):
+        if key in LAZY_KEYS:
+            if key not in self.loaded:
+                self.loaded[key] = self._load(key)
+            return self.loaded[key]
+        if key in ('model_version', 'trained_at', 'feature_names', 'metrics'):
+            return self.manifest[key]
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(LAZY_KEYS + ('feature_names', 'model_version', 'metrics', 'trained_at'))
+
+    def __len__(self):
+        return 7
+
+
+def load_bundle(path=BUNDLE_DIR, legacy_pickle=LEGACY_PICKLE, threads=None):
+    """
+    Open the bundle, converting the legacy pickle once if only that exists.
+    Raises FileNotFoundError if neither is present.
+    """
+    if not os.path.exists(os.path.join(path, 'manifest.json')):
+        if not os.path.exists(legacy_pickle):
+            raise FileNotFoundError(f"Model bundle not found: {path}")
+        print(f"   Converting {os.path.basename(legacy_pickle)} to a model bundle (one-time)...")
+        export_bundle(load_pickle(legacy_pickle), path)
+    return ModelBundle(path, threads=threads)
+
+
+def load_pickle(path=LEGACY_PICKLE):
+    import pickle
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def read_manifest(path=BUNDLE_DIR):
+    """Metadata only (version, metrics, features); never touches the trees"""
+    with open(os.path.join(path, 'manifest.json')) as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or inspect the model artifact bundle")
+    sub = parser.add_subparsers(dest='command', required=True)
+    export = sub.add_parser('export', help="Convert a trained .pkl into a bundle directory")
+    export.add_argument('--pkl', default=LEGACY_PICKLE)
+    export.add_argument('--out', default=BUNDLE_DIR)
+    info = sub.add_parser('info', help="Print the bundle manifest")
+    info.add_argument('--path', default=BUNDLE_DIR)
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        if not os.path.exists(args.pkl):
+            print(f"❌ Model file not found: {args.pkl}")
+            sys.exit(1)
+        path = export_bundle(load_pickle(args.pkl), args.out)
+        size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+        print(f"✅ Wrote model bundle to {path} ({size / 1e6:.1f} MB)")
+    else:
+        print(json.dumps(read_manifest(args.path), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -5,196 +5,230 @@ Generates predictions for specific dates using the trained ensemble model
 
 import os
 import sys
-import pandas as pd
+import time
+import zlib
+import hashlib
+import argparse
 import numpy as np
 from datetime import datetime, timedelta
-import pickle
 import json
-import psycopg2
-from dotenv import load_dotenv
-from sklearn.cluster import DBSCAN
-import requests
 
-load_dotenv()
+import run_telemetry
+# Heavier dependencies (pandas, sklearn, psycopg2, requests) are imported by
+# the stage that needs them, so a run handed to the worker starts quickly
+from drainage import DRAINAGE_LOCATIONS
+from model_artifacts import load_bundle
+from location_index import get_index as get_location_index
+from static_grid import GRID_BOUNDS, grid_axes, load_static_grid, static_grid_key
+from rainfall_store import RainfallStore
+from result_cache import fingerprint, result_cache_from_env
+from rainfall_field import station_set
 
 # Directories
 MODELS_DIR = os.path.join(os.path.dirname(__file__), '..', 'models')
-DATABASE_URL = os.getenv('DATABASE_URL')
+VERIFIED_HOTSPOTS_FILE = os.path.join(os.path.dirname(__file__), '..', 'data', 'historical', 'delhi_waterlogging_spots_database.csv')
+
+# High resolution grid: 0.002 deg ≈ 220m
+GRID_SIZE = 0.002
+
+# Hotspot clustering: cells above the threshold, grouped DBSCAN-style
+# (eps ~400m, min_samples points within it for a core point)
+HIGH_RISK_THRESHOLD = 0.15
+CLUSTER_EPS = 0.004
+CLUSTER_MIN_SAMPLES = 5
+CLUSTERING_MODES = ('raster', 'graph', 'dbscan')
+
+# Organic jitter (degrees) applied to hotspot points after clustering
+JITTER_DEG = 0.0005
+
+# Hotspots kept per date (highest confidence first)
+MAX_HOTSPOTS = 100
+
+# Grid cells scored per inference chunk (INFERENCE_CHUNK_ROWS); bounds the
+# float32 feature block and model scratch alive at once, whatever the grid size
+INFERENCE_CHUNK_ROWS = 65536
+
+# Consecutive dates per process-pool task in batch mode (--workers > 1)
+POOL_TASK_DATES = 8
+
+# Adaptive grid (PREDICTION_GRID=adaptive): blocks of ADAPTIVE_STRIDE cells a
+# side (0.016 deg at 0.002) are sampled first and split only where a hotspot
+# is possible; ADAPTIVE_MARGIN is the probability headroom that decides it
+GRID_MODES = ('full', 'adaptive')
+ADAPTIVE_STRIDE = 8
+ADAPTIVE_MARGIN = 0.1
+
+# Station readings needed on a date before rainfall is interpolated per cell
+RAINFALL_FIELD_MIN_STATIONS = 2
+
+# Station sets whose interpolation weights are kept in memory
+RAINFALL_FIELD_CACHE_SIZE = 8
+
+
+def risk_tiles_enabled():
+    """Render each date's full risk surface to public/tiles/ (RISK_TILES=0 to disable)"""
+    return os.getenv('RISK_TILES', '1') != '0'
+
+
+def inference_threads():
+    """Cores XGBoost and the forest may use (INFERENCE_THREADS, default all)"""
+    return int(os.getenv('INFERENCE_THREADS', '0')) or os.cpu_count() or 1
+
+
+def inference_chunk_rows():
+    """Grid cells per inference chunk (INFERENCE_CHUNK_ROWS)"""
+    return max(1, int(os.getenv('INFERENCE_CHUNK_ROWS', INFERENCE_CHUNK_ROWS)))
+
+
+def grid_mode():
+    """
+    Which cells the model scores (PREDICTION_GRID):
+    full     - every grid cell (default)
+    adaptive - coarse-to-fine refinement around possible hotspots
+    """
+    mode = os.getenv('PREDICTION_GRID', 'full')
+    if mode not in GRID_MODES:
+        raise ValueError(f"PREDICTION_GRID must be one of {GRID_MODES}, not {mode!r}")
+    return mode
+
+
+def rainfall_field_enabled():
+    """Interpolate station readings to per-cell rainfall (RAINFALL_FIELD=0 for one city-wide value)"""
+    return os.getenv('RAINFALL_FIELD', '1') != '0'
+
+
+def clustering_mode():
+    """
+    How high-risk cells are grouped (HOTSPOT_CLUSTERING):
+    raster - connected components on the risk raster (default)
+    graph  - DBSCAN over the grid's precomputed neighbour graph
+    dbscan - DBSCAN on jittered points (the original behaviour)
+    """
+    mode = os.getenv('HOTSPOT_CLUSTERING', 'raster')
+    if mode not in CLUSTERING_MODES:
+        raise ValueError(f"HOTSPOT_CLUSTERING must be one of {CLUSTERING_MODES}, not {mode!r}")
+    return mode
 
 class DateBasedPredictor:
     """Predict waterlogging hotspots for a specific date"""
     
-    def __init__(self):
+    def __init__(self, model_dir=None, grid_size=GRID_SIZE, threads=None):
+        self.model_dir = model_dir or os.path.join(MODELS_DIR, 'waterlogging_advanced_v2')
+        self.grid_size = grid_size
         self.model_data = None
-        self.verified_hotspots = []
+        self._verified_hotspots = None  # Loaded on first use
         self.known_locations = [] # Will be populated
+        self.rainfall_store = RainfallStore()
+        self.render_tiles = risk_tiles_enabled()
+        self.clustering = clustering_mode()
+        self.use_rainfall_field = rainfall_field_enabled()
+        self.threads = threads or inference_threads()
+        self.chunk_rows = inference_chunk_rows()
+        self.grid_mode = grid_mode()
+        self.adaptive_stride = int(os.getenv('ADAPTIVE_STRIDE', ADAPTIVE_STRIDE))
+        self.adaptive_margin = float(os.getenv('ADAPTIVE_MARGIN', ADAPTIVE_MARGIN))
+        self.result_cache = result_cache_from_env()
         self.load_model()
-        self.load_verified_hotspots()
         self.init_drainage_map()
 
     def init_drainage_map(self):
         """Initialize drainage capacity map"""
         # (lat, lng, name, drainage_capacity_mm)
-        self.known_locations = [
-            (28.6330, 77.2285, "Minto Bridge", 25),     
-            (28.6304, 77.2425, "ITO Crossing", 35),     
-            (28.5910, 77.1610, "Dhaula Kuan", 45),      
-            (28.6139, 76.9830, "Najafgarh", 25),        
-            (28.6675, 77.2282, "Kashmere Gate", 40),    
-            (28.5244, 77.2618, "Okhla", 30),            
-            (28.6436, 77.1565, "Shadipur", 35),
-            (28.5355, 77.1420, "Munirka", 45),
-            (28.7041, 77.1025, "Pitampura", 55),        
-            (28.5494, 77.2117, "Green Park", 60),       
-            (28.6219, 77.0878, "Janakpuri", 55),
-            (28.5550, 77.2562, "Kalkaji", 45),
-            (28.5273, 77.2177, "Saket", 60),
-            (28.6406, 77.3060, "Preet Vihar", 50),
-            (28.6505, 77.1711, "Pushta Road", 20),      
-            (28.6288, 77.2847, "Laxmi Nagar", 30),      
-            (28.5700, 77.3200, "Noida Sec-18 Area", 40),
-            (28.4595, 77.0266, "Gurgaon Cyber City Area", 45),
-            (28.7000, 77.2800, "Shahdara", 30),
-            (28.6900, 77.1900, "Model Town", 55),
-            (28.6000, 77.2300, "Lodhi Road", 75),       
-            (28.5800, 77.2300, "Jangpura", 50),
-            (28.5500, 77.2000, "Hauz Khas", 65),
-            (28.5200, 77.2300, "Khanpur", 35),
-            (28.4900, 77.3000, "Badarpur", 35),
-            (28.6400, 77.1200, "Kirti Nagar", 50),
-            (28.6700, 77.1200, "Punjabi Bagh", 55),
-            (28.7300, 77.1100, "Rohini", 55),
-            (28.6100, 77.0400, "Dwarka", 60),           
-            (28.5900, 77.0700, "Palam", 40),
-            (28.6300, 77.3400, "Vaishali", 45),
-            (28.6500, 77.3700, "Indirapuram", 45),
-            (28.7500, 77.2000, "Burari", 25),           
-            (28.6600, 77.2100, "Civil Lines", 65),
-            (28.6400, 77.2100, "Paharganj", 30),
-            (28.6200, 77.2000, "Connaught Place", 80),  
-            (28.5900, 77.1900, "Chanakyapuri", 85),     
-            (28.5700, 77.1700, "RK Puram", 60),
-            (28.5400, 77.1600, "Vasant Vihar", 70),
-            (28.5300, 77.1200, "Mahipalpur", 35),
-            (28.6800, 77.0600, "Nangloi", 30),
-            (28.6600, 77.0300, "Peeragarhi", 35),
-            (28.6200, 77.1000, "Mayapuri", 40),
-            (28.4800, 77.1800, "Chattarpur", 35)
-        ]
+        self.known_locations = list(DRAINAGE_LOCATIONS)
+        self.static_grid = None
+        self.risk_cube = None
+        self.rainfall_fields = {}  # station set -> RainfallField
     
     def load_model(self):
-        """Load trained model"""
-        model_file = os.path.join(MODELS_DIR, 'waterlogging_advanced_v2.pkl')
-        
-        if not os.path.exists(model_file):
-            raise FileNotFoundError(f"Model file not found: {model_file}")
-        
-        with open(model_file, 'rb') as f:
-            self.model_data = pickle.load(f)
+        """Load trained model (trees are read lazily on first inference)"""
+        self.model_data = load_bundle(self.model_dir, threads=self.threads)
         
         print(f"✅ Loaded model version: {self.model_data['model_version']}")
     
         print(f"✅ Loaded model version: {self.model_data['model_version']}")
 
+    @property
+    def verified_hotspots(self):
+        if self._verified_hotspots is None:
+            self.load_verified_hotspots()
+        return self._verified_hotspots
+
     def load_verified_hotspots(self):
         """Load official verified hotspots list"""
-        hotspots_file = os.path.join(os.path.dirname(__file__), '..', 'data', 'historical', 'delhi_waterlogging_spots_database.csv')
+        import pandas as pd
+        
+        self._verified_hotspots = []
+        hotspots_file = VERIFIED_HOTSPOTS_FILE
         if os.path.exists(hotspots_file):
             try:
                 df = pd.read_csv(hotspots_file)
-                self.verified_hotspots = df[['lat', 'lng']].to_dict('records')
+                self._verified_hotspots = df[['lat', 'lng']].to_dict('records')
                 print(f"✅ Loaded {len(self.verified_hotspots)} verified historical hotspots for Vulnerability Index")
             except Exception as e:
                 print(f"⚠️ Failed to load verified hotspots: {e}")
         else:
             print(f"⚠️ Verified hotspots file not found: {hotspots_file}")
 
+    def preload(self):
+        """Import and load everything a prediction needs (for long-lived processes)"""
+        import pandas, feature_engine, scipy.ndimage, scipy.sparse.csgraph, scipy.sparse  # noqa: F401
+        if self.clustering != 'raster':
+            import sklearn.cluster  # noqa: F401
+        
+        for part in ('scaler', 'xgb_model', 'rf_model'):
+            self.model_data[part]
+        self.get_static_grid()
+        self.verified_hotspots
+        get_location_index()
+    
+    def run_fields(self):
+        """Model and grid description attached to run telemetry"""
+        return {
+            'model_version': self.model_data['model_version'],
+            'grid_size': self.grid_size,
+            'cells': len(self.get_static_grid()),
+            'threads': self.threads,
+            'grid_mode': self.grid_mode,
+            'clustering': self.clustering
+        }
+    
     def get_rainfall_for_date(self, target_date):
         """Get rainfall data for a specific date"""
-        # PRIORITY 1: Check CSV (Ground Truth)
+        # PRIORITY 1: IMD record (Ground Truth)
         try:
-            csv_path = os.path.join(os.path.dirname(__file__), '..', 'imd_delhi_rainfall_historical.csv')
-            if os.path.exists(csv_path):
-                df_imd = pd.read_csv(csv_path)
-                # Ensure date format matches
-                start_match = df_imd[df_imd['date'] == target_date]
-                if not start_match.empty:
-                    rain_val = float(start_match.iloc[0]['rainfall_mm'])
-                    print(f"   ✅ Found Verified IMD Data: {rain_val} mm")
-                    return {
-                        'rainfall_24h': rain_val,
-                        'temperature': 30.0,
-                        'humidity': 70
-                    }
-        except Exception as e:
-            print(f"   ⚠️  CSV scan failed: {e}")
-
-        # PRIORITY 2: Database
-        try:
-            conn = psycopg2.connect(DATABASE_URL)
-            cur = conn.cursor()
-            
-            cur.execute("""
-                SELECT rainfall_24h, temperature_c, humidity_percent
-                FROM historical_rainfall
-                WHERE record_date = %s
-                LIMIT 1
-            """, (target_date,))
-            
-            result = cur.fetchone()
-            cur.close()
-            conn.close()
-            
-            if result:
+            rain_val = self.rainfall_store.imd(target_date)
+            if rain_val is not None:
+                print(f"   ✅ Found Verified IMD Data: {rain_val} mm")
+                run_telemetry.record_rainfall(target_date, 'csv', rain_val)
                 return {
-                    'rainfall_24h': float(result[0]),
-                    'temperature': float(result[1]) if result[1] else 30.0,
-                    'humidity': int(result[2]) if result[2] else 70
+                    'rainfall_24h': rain_val,
+                    'temperature': 30.0,
+                    'humidity': 70
                 }
         except Exception as e:
-            print(f"   ⚠️  Could not fetch from database: {e}")
+            print(f"   ⚠️  CSV scan failed: {e}")
+
+        # PRIORITY 2: Database (prefetched by batch runs)
+        result = self.rainfall_store.db(target_date)
+        if result:
+            run_telemetry.record_rainfall(target_date, 'db', result['rainfall_24h'])
+            return dict(result)
         
         # If not in database, use Open-Meteo API for historical/forecast data
         try:
-            date_obj = datetime.strptime(target_date, '%Y-%m-%d')
-            
             # Delhi coordinates
             lat, lng = 28.6139, 77.2090
             
-            # Determine if historical or forecast
-            today = datetime.now().date()
-            target_date_obj = date_obj.date()
-            
-            if target_date_obj <= today:
-                # Historical data
-                url = f"https://archive-api.open-meteo.com/v1/archive"
-                params = {
-                    'latitude': lat,
-                    'longitude': lng,
-                    'start_date': target_date,
-                    'end_date': target_date,
-                    'daily': 'precipitation_sum,temperature_2m_max,relative_humidity_2m_max'
-                }
-            else:
-                # Forecast data
-                url = f"https://api.open-meteo.com/v1/forecast"
-                params = {
-                    'latitude': lat,
-                    'longitude': lng,
-                    'daily': 'precipitation_sum,temperature_2m_max,relative_humidity_2m_max',
-                    'forecast_days': 16
-                }
-            
-            response = requests.get(url, params=params, timeout=10)
-            data = response.json()
+            # One 16-day forecast fetch is cached per date for the whole window
+            from weather_client import get_client as get_weather_client
+            daily = get_weather_client().daily(lat, lng, target_date)
             
-            if 'daily' in data:
-                idx = 0 if target_date_obj <= today else (target_date_obj - today).days
-                
+            if daily is not None:
+                run_telemetry.record_rainfall(target_date, 'api', daily['precipitation_sum'] or 0.0)
                 return {
-                    'rainfall_24h': data['daily']['precipitation_sum'][idx] or 0.0,
-                    'temperature': data['daily']['temperature_2m_max'][idx] or 30.0,
-                    'humidity': data['daily']['relative_humidity_2m_max'][idx] or 70
+                    'rainfall_24h': daily['precipitation_sum'] or 0.0,
+                    'temperature': daily['temperature_2m_max'] or 30.0,
+                    'humidity': daily['relative_humidity_2m_max'] or 70
                 }
         except Exception as e:
             print(f"   ⚠️  Could not fetch from API: {e}")
@@ -226,8 +260,9 @@ class DateBasedPredictor:
              # Uses the date string as a seed to ensure consistent results for the same date request,
              # while providing realistic variability across different dates.
              
+             # A local generator keeps concurrent predictions (worker mode) independent.
              seed_val = int(target_date.replace('-', ''))
-             np.random.seed(seed_val)
+             rng = np.random.RandomState(seed_val)
              
              avg_monthly = monthly_normals.get(month, 0)
              
@@ -238,18 +273,19 @@ class DateBasedPredictor:
              if month in [7, 8]: rain_prob = 0.92 # Peak Monsoon: Almost guaranteed rain
              elif month in [6, 9]: rain_prob = max(rain_prob, 0.5)
              
-             if np.random.random() < rain_prob:
+             if rng.random_sample() < rain_prob:
                  # It rains!
                  # Intensity modeled by exponential distribution
                  # Average intensity on rainy day ~ 15-20mm
                  intensity_scale = 20.0
                  if month in [7, 8]: intensity_scale = 35.0 # Heavier in monsoon
                  
-                 predicted_rain = np.random.exponential(intensity_scale)
+                 predicted_rain = rng.exponential(intensity_scale)
              else:
                  # Dry day
                  predicted_rain = 0.0
              
+             run_telemetry.record_rainfall(target_date, 'climatology', round(predicted_rain, 1))
              return {
                 'rainfall_24h': round(predicted_rain, 1),
                 'temperature': 35.0 if month in [5,6,7] else 25.0,
@@ -281,165 +317,283 @@ class DateBasedPredictor:
         else:
              # Use daily average for that month
              rainfall = monthly_normals.get(month, 0) / days_in_month.get(month, 30.0)
-             
+        
+        run_telemetry.record_rainfall(target_date, 'climatology_fallback', rainfall)
         return {
             'rainfall_24h': rainfall,
             'temperature': 30.0,
             'humidity': 70
         }
     
-    def create_prediction_grid(self, target_date, rainfall_data):
-        """Create a grid of points across Delhi for prediction"""
-        # Delhi bounding box
-        lat_min, lat_max = 28.4, 28.9
-        lng_min, lng_max = 76.8, 77.4
-        
-        # Create grid (High resolution: 0.002 deg ≈ 220m)
-        grid_size = 0.002 
-        
-        lats = np.arange(lat_min, lat_max, grid_size)
-        lngs = np.arange(lng_min, lng_max, grid_size)
-        
-        grid_points = []
-        for lat in lats:
-            for lng in lngs:
-                grid_points.append({'lat': lat, 'lng': lng})
-        
-        df = pd.DataFrame(grid_points)
-        
-        # Add date and rainfall
-        df['date'] = target_date
-        df['rainfall_24h'] = rainfall_data['rainfall_24h']
-        
-        # Create features (same as training)
-        df = self.create_features(df)
-        
-        return df
+    def grid_axes(self):
+        """Latitude and longitude axes of the prediction grid"""
+        return grid_axes(GRID_BOUNDS, self.grid_size)
     
-    def create_features(self, df):
-        """Create features for prediction (same as training)"""
-        df['date'] = pd.to_datetime(df['date'])
-        
-        # Temporal features
-        df['day_of_year'] = df['date'].dt.dayofyear
-        df['month'] = df['date'].dt.month
-        df['is_monsoon'] = ((df['month'] >= 6) & (df['month'] <= 9)).astype(int)
-        df['day_sin'] = np.sin(2 * np.pi * df['day_of_year'] / 365)
-        df['day_cos'] = np.cos(2 * np.pi * df['day_of_year'] / 365)
-        df['month_sin'] = np.sin(2 * np.pi * df['month'] / 12)
-        df['month_cos'] = np.cos(2 * np.pi * df['month'] / 12)
+    def get_static_grid(self):
+        """Date-independent per-cell layers (built once, memory-mapped from cache/)"""
+        if self.static_grid is None:
+            with run_telemetry.span('static_grid'):
+                self.static_grid = load_static_grid(
+                    GRID_BOUNDS, self.grid_size, self.known_locations, VERIFIED_HOTSPOTS_FILE
+                )
+        return self.static_grid
+    
+    def get_rainfall_field(self, stations_set):
+        """Interpolation weights from a station set to this grid (built once per set)"""
+        field = self.rainfall_fields.get(stations_set)
+        if field is None:
+            from rainfall_field import RainfallField
+            
+            grid = self.get_static_grid()
+            field = RainfallField(stations_set, grid['lat'], grid['lng'])
+            if len(self.rainfall_fields) >= RAINFALL_FIELD_CACHE_SIZE:
+                self.rainfall_fields.pop(next(iter(self.rainfall_fields)))
+            self.rainfall_fields[stations_set] = field
+        return field
+    
+    def attach_rainfall_fields(self, dates, rainfall):
+        """
+        Interpolate each date's station readings onto the grid. A date with
+        enough stations gains 'field' (per-cell rainfall, mm) and 'stations'
+        in its rainfall data; dates sharing a station set take one product.
+        """
+        if not self.use_rainfall_field:
+            return
+        groups = {}
+        for target_date, rainfall_data in zip(dates, rainfall):
+            stations = self.rainfall_store.stations(target_date)
+            if len(stations) >= RAINFALL_FIELD_MIN_STATIONS:
+                groups.setdefault(station_set(stations), []).append((rainfall_data, stations))
+        if not groups:
+            return
         
-        # Spatial features
-        high_risk_zones = [
-            (28.6330, 77.2285), (28.6304, 77.2425),
-            (28.5910, 77.1610), (28.6139, 76.9830)
-        ]
+        with run_telemetry.span('rainfall_field'):
+            for stations_set, members in groups.items():
+                field = self.get_rainfall_field(stations_set)
+                readings = np.array([field.readings(stations) for _, stations in members])
+                for (rainfall_data, _), cells, mm in zip(members, field.apply(readings), readings):
+                    rainfall_data['field'] = cells
+                    rainfall_data['stations'] = {'set': field.key, 'mm': mm.tolist()}
+                    print(f"   🌦️  Rainfall field from {len(mm)} stations: "
+                          f"{cells.min():.1f}-{cells.max():.1f} mm across the grid")
+                run_telemetry.add('rainfall_stations', len(stations_set) * len(members))
+    
+    def cell_rainfall(self, rainfall_data):
+        """Per-cell rainfall field if the date has one, else the city-wide value"""
+        field = rainfall_data.get('field')
+        return field if field is not None else rainfall_data['rainfall_24h']
+    
+    def feature_matrix(self, target_date, rainfall_data, out=None, rows=slice(None), grid=None):
+        """
+        Scaled model input for the grid cells in `rows` (default all) on a
+        date: a float32 (n_cells, n_features) matrix, filled into `out` when
+        given. `grid` replaces the static grid (e.g. with one band of a larger one).
+        """
+        from feature_engine import build_feature_matrix
         
-        def min_distance_to_risk_zone(row):
-            lat, lng = row['lat'], row['lng']
-            distances = [
-                np.sqrt((lat - risk_lat)**2 + (lng - risk_lng)**2) * 111
-                for risk_lat, risk_lng in high_risk_zones
-            ]
-            return min(distances)
-        
-        df['min_dist_to_risk_zone_km'] = df.apply(min_distance_to_risk_zone, axis=1)
-        df['elevation_proxy'] = 28.7 - df['lat']
-        
-        # Rainfall features
-        df['rainfall_squared'] = df['rainfall_24h'] ** 2
-        df['rainfall_log'] = np.log1p(df['rainfall_24h'])
-        df['rainfall_intensity_num'] = pd.cut(
-            df['rainfall_24h'],
-            bins=[0, 15, 35, 65, 115, 1000],
-            labels=[1, 2, 3, 4, 5]
-        ).astype(float)
-        
-        return df
-    
-    def predict_for_date(self, target_date):
-        """Generate predictions for a specific date"""
-        print(f"\n🎯 Generating predictions for: {target_date}")
+        grid = self.get_static_grid() if grid is None else grid
+        scaler = self.model_data['scaler']
+        rainfall = self.cell_rainfall(rainfall_data)
+        with run_telemetry.span('features'):
+            return build_feature_matrix(
+                grid['lat'][rows],
+                grid['lng'][rows],
+                target_date,
+                rainfall[rows] if np.ndim(rainfall) else rainfall,
+                self.model_data['feature_names'],
+                spatial={name: column[rows] for name, column in grid.spatial_features().items()},
+                mean=scaler.mean_,
+                scale=scaler.scale_,
+                out=out
+            )
+    
+    def ensemble_proba(self, X, out=None):
+        """
+        Weighted XGBoost + Random Forest probability for each row of a
+        feature_matrix (into `out` when given), scored chunk_rows at a time
+        """
+        # XGBoost scores the float32 rows in place (no DMatrix copy)
+        booster = self.model_data['xgb_model'].get_booster()
+        rf_model = self.model_data['rf_model']
+        risk = np.empty(len(X)) if out is None else out
         
-        # Get rainfall data
-        print("   Fetching rainfall data...")
-        rainfall_data = self.get_rainfall_for_date(target_date)
-        print(f"   Rainfall: {rainfall_data['rainfall_24h']:.1f} mm")
+        for start in range(0, len(X), self.chunk_rows):
+            chunk = X[start:start + self.chunk_rows]
+            with run_telemetry.span('xgb_inference'):
+                prob_xgb = booster.inplace_predict(chunk)
+            with run_telemetry.span('rf_inference'):
+                prob_rf = rf_model.predict_proba(chunk)[:, 1]
+            
+            # 0.6 * xgb + 0.4 * rf, accumulated in float64
+            blend = risk[start:start + len(chunk)]
+            blend[:] = prob_rf
+            blend *= 0.4
+            blend += 0.6 * prob_xgb
+        return risk
+    
+    def grid_proba(self, target_date, rainfall_data, cells=None, grid=None):
+        """
+        Ensemble probability for every grid cell on a date (or only `cells`,
+        flat indices). Features are built and scored one chunk at a time, so
+        only a chunk_rows x n_features float32 block is alive however large
+        the grid is.
+        """
+        grid = self.get_static_grid() if grid is None else grid
+        n_cells = len(grid) if cells is None else len(cells)
+        n_features = len(self.model_data['feature_names'])
+        prob = np.empty(n_cells)
+        X = np.empty((min(self.chunk_rows, n_cells), n_features), dtype=np.float32)
         
-        # Create prediction grid
-        print("   Creating prediction grid...")
-        df_grid = self.create_prediction_grid(target_date, rainfall_data)
-        print(f"   Grid points: {len(df_grid)}")
+        for start in range(0, n_cells, self.chunk_rows):
+            stop = min(start + self.chunk_rows, n_cells)
+            rows = slice(start, stop) if cells is None else cells[start:stop]
+            chunk = self.feature_matrix(target_date, rainfall_data, out=X[:stop - start], rows=rows, grid=grid)
+            self.ensemble_proba(chunk, out=prob[start:stop])
+        return prob
+    
+    def adaptive_grid_proba(self, target_date, rainfall_data, grid=None):
+        """
+        Model probability for every grid cell, scoring only the cells
+        adaptive_grid.refine needs; returns (probability, cells scored).
+        Exact wherever a cell could pass the hotspot threshold.
+        """
+        from adaptive_grid import refine
         
-        # Select features
-        feature_columns = self.model_data['feature_names']
-        X = df_grid[feature_columns]
+        grid = self.get_static_grid() if grid is None else grid
+        with np.errstate(divide='ignore'):
+            ceiling = HIGH_RISK_THRESHOLD / self.physics_factor(rainfall_data, grid)
+        return refine(
+            grid.shape,
+            lambda cells: self.grid_proba(target_date, rainfall_data, cells, grid),
+            ceiling.reshape(grid.shape),
+            self.adaptive_stride,
+            self.adaptive_margin
+        )
+    
+    def scored_grid(self, target_date, rainfall_data):
+        """
+        The date's model probability surface (full or adaptive grid), with
+        throughput and the share of cells scored printed and added to the
+        run's telemetry
+        """
+        started = time.perf_counter()
+        if self.grid_mode == 'adaptive':
+            prob, scored = self.adaptive_grid_proba(target_date, rainfall_data)
+        else:
+            prob = self.grid_proba(target_date, rainfall_data)
+            scored = len(prob)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        run_telemetry.add('inference_cells', scored)
+        run_telemetry.add('grid_cells', len(prob))
+        run_telemetry.add('inference_ms', round(elapsed_ms, 1))
+        print(f"   Scored {scored} of {len(prob)} cells ({scored / max(len(prob), 1):.1%}) "
+              f"in {elapsed_ms:.0f} ms ({scored / max(elapsed_ms, 1e-3) * 1000:,.0f} cells/s, "
+              f"{self.threads} threads)")
+        return prob
+    
+    def physics_factor(self, rainfall_data, grid=None):
+        """Per-cell factor apply_physics scales model probability by (before the 1.0 cap)"""
+        grid = self.get_static_grid() if grid is None else grid
+        factor = np.where(self.cell_rainfall(rainfall_data) < grid['drainage_capacity'], 0.2, 1.0)
+        if self.verified_hotspots:
+            factor[grid['verified_hotspot_dist_deg'] < 0.0045] *= 2.5
+        return factor
+    
+    def apply_physics(self, prob_ensemble, rainfall_data, grid=None):
+        """Adjust model probability for drainage capacity and verified hotspots (in place)"""
+        current_rain = self.cell_rainfall(rainfall_data)
+        grid = self.get_static_grid() if grid is None else grid
+        risk = prob_ensemble
         
-        # Make predictions
-        print("   Running model inference...")
-        xgb_model = self.model_data['xgb_model']
-        rf_model = self.model_data['rf_model']
-        scaler = self.model_data['scaler']
+        # Drainage physics:
+        # If Rain < Capacity: The drains swallow the water. Flood risk is minimal.
+        # Even if the model sees "rain" and predicts risk, the infrastructure
+        # cancels it out, so we reduce risk by 80% (factor 0.2).
+        # If Rain >= Capacity the model's risk stands.
+        risk[current_rain < grid['drainage_capacity']] *= 0.2
         
-        X_scaled = scaler.transform(X)
+        # Vulnerability Index: cells within ~500m of a verified hotspot get 2.5x risk
+        if self.verified_hotspots:
+            risk[grid['verified_hotspot_dist_deg'] < 0.0045] *= 2.5
+            np.minimum(risk, 1.0, out=risk)
         
-        # Ensemble prediction
-        prob_xgb = xgb_model.predict_proba(X_scaled)[:, 1]
-        prob_rf = rf_model.predict_proba(X_scaled)[:, 1]
-        prob_ensemble = 0.6 * prob_xgb + 0.4 * prob_rf
+        return risk
+    
+    def write_tiles(self, target_date, risk, render_tiles=None, key=None):
+        """
+        Render the date's risk surface as static map tiles (once per model
+        version and result key); render_tiles overrides self.render_tiles
+        for this call
+        """
+        if not (self.render_tiles if render_tiles is None else render_tiles):
+            return
+        from risk_tiles import write_risk_tiles
         
-        df_grid['risk_score'] = prob_ensemble
+        grid = self.get_static_grid()
+        lats, lngs = grid.axes()
+        try:
+            with run_telemetry.span('tiles'):
+                write_risk_tiles(risk.reshape(grid.shape), lats, lngs, target_date,
+                                 self.model_data['model_version'], key=key)
+        except OSError as e:
+            print(f"   ⚠️  Could not write risk tiles: {e}")
+    
+    def hotspots_from_risk(self, risk, rainfall_data, seed=None):
+        """Threshold, cluster, jitter and name a grid-wide risk surface's hotspots"""
+        with run_telemetry.span('clustering'):
+            df_high_risk, hotspots = self.cluster_risk(risk, rainfall_data, seed)
+        with run_telemetry.span('geocoding'):
+            self.name_hotspots(hotspots)
+        print(f"   ✅ Generated {len(hotspots)} hotspots")
+        run_telemetry.add('high_risk_points', len(df_high_risk))
+        run_telemetry.add('hotspots', len(hotspots))
         
-        current_rain = rainfall_data['rainfall_24h']
+        return hotspots
+    
+    def cluster_risk(self, risk, rainfall_data, seed=None):
+        """High-risk points (jittered with `seed`) and their unnamed hotspots"""
+        df_high_risk = self.high_risk_points(risk, rainfall_data.get('field'))
+        hotspots = self.cluster_points(
+            df_high_risk, rainfall_data, lambda: self.grid_cluster_labels(risk), seed
+        )
+        return df_high_risk, hotspots
+    
+    def cluster_points(self, df_high_risk, rainfall_data, grid_labels, seed=None):
+        """
+        Cluster, jitter and summarize high-risk points (grid order) as
+        unnamed hotspots; grid_labels() gives their cluster labels on the grid
+        """
+        print(f"   Clustering hotspots ({self.clustering})...")
+        if self.clustering == 'dbscan':
+            # Original order: jitter first, then DBSCAN on the jittered points
+            self.jitter_points(df_high_risk, seed)
+            return self.cluster_hotspots(df_high_risk, rainfall_data)
         
-        def apply_drainage_physics(row):
-            lat, lng = row['lat'], row['lng']
-            risk = row['risk_score']
-            
-            # Get capacity
-            capacity = self.get_drainage_capacity(lat, lng)
-            
-            # Physics:
-            # If Rain < Capacity: The drains swallow the water. Flood risk is minimal.
-            if current_rain < capacity:
-                # Strong reduction. Even if model sees "rain" and predicts risk, 
-                # the infrastructure cancels it out.
-                # We reduce risk by 80% (factor 0.2)
-                return risk * 0.2
-            else:
-                # Rainfall exceeds capacity.
-                # Risk stands, or typically increases as overflow grows.
-                # The model already predicts high risk for high rain.
-                # We can add a small penalty for the overflow amount?
-                # excess = current_rain - capacity
-                # boost = 1.0 + (excess / 100.0)
-                # return min(risk * boost, 1.0)
-                return risk
-
-        df_grid['risk_score'] = df_grid.apply(apply_drainage_physics, axis=1)
-
+        # Cluster on the exact grid; jitter is only for display
+        labels = grid_labels()
+        self.jitter_points(df_high_risk, seed)
+        return self.cluster_hotspots(df_high_risk, rainfall_data, labels)
+    
+    def high_risk_points(self, risk, rainfall_field=None):
+        """
+        (lat, lng, risk_score) frame of the cells above the risk threshold, in
+        grid order, plus each cell's rainfall_mm when there is a per-cell field
+        """
+        import pandas as pd
         
-        if self.verified_hotspots:
-            verified_coords = np.array([[h['lat'], h['lng']] for h in self.verified_hotspots])
-            
-            def apply_vulnerability_multiplier(row):
-                risk = row['risk_score']
-                lat, lng = row['lat'], row['lng']
-                
-                distances = np.sqrt((verified_coords[:,0] - lat)**2 + (verified_coords[:,1] - lng)**2)
-                min_dist_deg = np.min(distances)
-                
-                if min_dist_deg < 0.0045: 
-                    risk = risk * 2.5
-                    
-                return min(risk, 1.0)
-            
-            df_grid['risk_score'] = df_grid.apply(apply_vulnerability_multiplier, axis=1)
+        grid = self.get_static_grid()
         
         # Filter high-risk points (threshold: 0.25 to show background risk on dry days)
         # This catches "Low-Medium" risks which are critical for street-level awareness
-        print("   Filtering hotspots (Threshold: 0.15)...")
-        df_high_risk = df_grid[df_grid['risk_score'] > 0.15].copy()
+        print(f"   Filtering hotspots (Threshold: {HIGH_RISK_THRESHOLD})...")
+        mask = risk > HIGH_RISK_THRESHOLD
+        df_high_risk = pd.DataFrame({
+            'lat': grid['lat'][mask],
+            'lng': grid['lng'][mask],
+            'risk_score': risk[mask]
+        })
+        if rainfall_field is not None:
+            df_high_risk['rainfall_mm'] = rainfall_field[mask]
         
         # If rainfall is very low but we still want to show potential risks (e.g. for demo)
         # We can dynamically lower this, but 0.25 is generally safe for "Low" severity
@@ -449,25 +603,199 @@ class DateBasedPredictor:
         if len(df_high_risk) == 0:
             print("   ℹ️  No high-risk areas found at primary threshold.")
         
-        # Add Organic Jitter to Coordinates
-        # (Breaks the perfect grid visual)
+        return df_high_risk
+    
+    def jitter_points(self, df_high_risk, seed=None):
+        """
+        Add organic jitter to point coordinates (in place). Breaks the perfect
+        grid visual; seeded (predictions pass their result key) so the same
+        inputs always give the same hotspots.
+        """
         print("   🎨 Applying organic spatial jitter...")
-        df_high_risk['lat'] = df_high_risk['lat'] + np.random.uniform(-0.0005, 0.0005, size=len(df_high_risk))
-        df_high_risk['lng'] = df_high_risk['lng'] + np.random.uniform(-0.0005, 0.0005, size=len(df_high_risk))
-
-        # DBSCAN clustering
-        print("   Clustering hotspots...")
-        hotspots = self.cluster_hotspots(df_high_risk, rainfall_data)
-        print(f"   ✅ Generated {len(hotspots)} hotspots")
+        rng = np.random.default_rng(zlib.crc32(str(seed).encode('utf-8')) if seed is not None else None)
+        n = len(df_high_risk)
+        df_high_risk['lat'] = df_high_risk['lat'] + rng.uniform(-JITTER_DEG, JITTER_DEG, size=n)
+        df_high_risk['lng'] = df_high_risk['lng'] + rng.uniform(-JITTER_DEG, JITTER_DEG, size=n)
+        return df_high_risk
+    
+    def grid_cluster_labels(self, risk):
+        """Cluster label of every high-risk cell (grid order, -1 = noise), computed on the grid"""
+        import grid_clustering
+        
+        grid = self.get_static_grid()
+        mask = (risk > HIGH_RISK_THRESHOLD).reshape(grid.shape)
+        if self.clustering == 'graph':
+            return grid_clustering.dbscan_graph(mask, self.grid_size, CLUSTER_EPS, CLUSTER_MIN_SAMPLES)
+        labels = grid_clustering.label_raster(mask, self.grid_size, CLUSTER_EPS, CLUSTER_MIN_SAMPLES)
+        return labels[mask]
+    
+    def predict_for_date(self, target_date, render_tiles=None):
+        """
+        Generate predictions for a specific date (render_tiles overrides
+        self.render_tiles for this date)
+        """
+        print(f"\n🎯 Generating predictions for: {target_date}")
+        run_telemetry.set_fields(**self.run_fields())
         
+        # Get rainfall data
+        print("   Fetching rainfall data...")
+        with run_telemetry.span('rainfall'):
+            rainfall_data = self.get_rainfall_for_date(target_date)
+        print(f"   Rainfall: {rainfall_data['rainfall_24h']:.1f} mm")
+        self.attach_rainfall_fields([target_date], [rainfall_data])
+        
+        key, inputs = self.result_key(target_date, rainfall_data)
+        hotspots = self.cached_hotspots(target_date, key, render_tiles)
+        if hotspots is not None:
+            return hotspots
+        
+        # Make predictions
+        print(f"   Running model inference ({self.chunk_rows} cells per chunk)...")
+        prob = self.scored_grid(target_date, rainfall_data)
+        return self.finish_prediction(target_date, prob, rainfall_data, key, inputs, render_tiles)
+    
+    def result_key(self, target_date, rainfall_data, source='model', bounds=None):
+        """
+        Fingerprint of everything that decides a date's hotspots, as
+        (key, inputs). Dates with the same inputs share a key (and a result).
+        With `bounds` the grid covers that box instead (static layers keyed,
+        not built).
+        """
+        from feature_engine import temporal_features
+        
+        manifest = getattr(self.model_data, 'manifest', None)
+        model = (
+            hashlib.sha256(json.dumps(manifest, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:16]
+            if manifest is not None else self.model_data.get('trained_at')
+        )
+        inputs = {
+            'source': source,
+            'model_version': self.model_data['model_version'],
+            'model': model,
+            'static_grid': self.get_static_grid().key if bounds is None else static_grid_key(
+                bounds, self.grid_size, self.known_locations, VERIFIED_HOTSPOTS_FILE
+            ),
+            'grid_bounds': list(GRID_BOUNDS if bounds is None else bounds),
+            'grid_size': self.grid_size,
+            'rainfall_24h': float(rainfall_data['rainfall_24h']),
+            'stations': rainfall_data.get('stations'),
+            'temporal': {name: float(v) for name, v in temporal_features(target_date).items()},
+            'clustering': {
+                'mode': self.clustering,
+                'threshold': HIGH_RISK_THRESHOLD,
+                'eps': CLUSTER_EPS,
+                'min_samples': CLUSTER_MIN_SAMPLES,
+                'max_hotspots': MAX_HOTSPOTS,
+                'jitter_deg': JITTER_DEG
+            }
+        }
+        if self.grid_mode == 'adaptive' and source == 'model':
+            inputs['adaptive_grid'] = {'stride': self.adaptive_stride, 'margin': self.adaptive_margin}
+        return fingerprint(inputs), inputs
+    
+    def cached_hotspots(self, target_date, key, render_tiles=None):
+        """A stored result for the key (tiles rendered, names refreshed), or None"""
+        if self.result_cache is None:
+            return None
+        cached = self.result_cache.get(key)
+        if cached is None:
+            return None
+        hotspots, risk = cached
+        print(f"   ♻️  Reusing cached result {key[:12]} (inference and clustering skipped)")
+        self.write_tiles(target_date, risk, render_tiles, key)
+        with run_telemetry.span('geocoding'):
+            self.name_hotspots(hotspots)
+        run_telemetry.add('hotspots', len(hotspots))
+        print(f"   ✅ Generated {len(hotspots)} hotspots")
         return hotspots
     
-    def cluster_hotspots(self, df_high_risk, rainfall_data):
-        """Cluster high-risk points into hotspots using DBSCAN"""
-        coords = df_high_risk[['lat', 'lng']].values
+    def finish_prediction(self, target_date, prob, rainfall_data, key, inputs, render_tiles=None):
+        """Physics, tiles and hotspots for a model probability surface; stores the result"""
+        with run_telemetry.span('physics'):
+            risk = self.apply_physics(prob, rainfall_data)
+        self.write_tiles(target_date, risk, render_tiles, key)
+        hotspots = self.hotspots_from_risk(risk, rainfall_data, seed=key)
+        if self.result_cache is not None:
+            self.result_cache.put(key, inputs, hotspots, risk)
+        return hotspots
+    
+    def get_risk_cube(self, build=True):
+        """Precomputed rainfall x day-of-year risk cube for this model and grid"""
+        if self.risk_cube is None:
+            from risk_cube import load_risk_cube
+            self.risk_cube = load_risk_cube(self, build=build)
+        return self.risk_cube
+    
+    def predict_from_cube(self, target_date, rainfall_mm=None):
+        """
+        Predict from the risk cube instead of running the model. With
+        rainfall_mm this is a what-if scenario for the date.
+        """
+        print(f"\n🧊 Cube prediction for: {target_date}")
+        run_telemetry.set_fields(**self.run_fields())
+        if rainfall_mm is None:
+            with run_telemetry.span('rainfall'):
+                rainfall_data = self.get_rainfall_for_date(target_date)
+        else:
+            rainfall_data = {'rainfall_24h': float(rainfall_mm), 'temperature': 30.0, 'humidity': 70}
+            run_telemetry.record_rainfall(target_date, 'what_if', rainfall_mm)
+            print("   What-if scenario (rainfall supplied)")
+        print(f"   Rainfall: {rainfall_data['rainfall_24h']:.1f} mm")
+        
+        # A what-if surface must not replace the date's map tiles
+        render_tiles = False if rainfall_mm is not None else None
+        cube = self.get_risk_cube()
+        key, inputs = self.result_key(target_date, rainfall_data, source=f'cube:{cube.key}')
+        hotspots = self.cached_hotspots(target_date, key, render_tiles)
+        if hotspots is not None:
+            return hotspots
+        
+        started = time.perf_counter()
+        with run_telemetry.span('cube_query'):
+            prob = cube.query_date(target_date, rainfall_data['rainfall_24h'])
+        print(f"   Risk surface from cube in {(time.perf_counter() - started) * 1000:.1f} ms")
+        
+        return self.finish_prediction(target_date, prob, rainfall_data, key, inputs, render_tiles)
+    
+    def predict_dates(self, dates):
+        """
+        Generate predictions for many dates, yielding (date, hotspots) in order.
+        The static grid and model are shared. Rainfall is resolved for every
+        date up front, so dates sharing a station set get their rainfall
+        fields from one matrix-matrix product; each date is then scored on
+        its own in bounded chunks (a full grid already fills an inference
+        chunk, so stacking dates would not make larger calls).
+        """
+        run_telemetry.set_fields(**self.run_fields())
         
+        # One range query covers every date the IMD record cannot answer
+        # (and every date's station readings, for rainfall fields)
+        with run_telemetry.span('rainfall'):
+            self.rainfall_store.prefetch_missing(dates, stations=self.use_rainfall_field)
+            rainfall = [self.get_rainfall_for_date(d) for d in dates]
+        self.attach_rainfall_fields(dates, rainfall)
         
+        for i, target_date in enumerate(dates):
+            rainfall_data = rainfall[i]
+            key, inputs = self.result_key(target_date, rainfall_data)
+            
+            print(f"\n🎯 {target_date}: rainfall {rainfall_data['rainfall_24h']:.1f} mm")
+            # Only dates without a stored result go through the model
+            hotspots = self.cached_hotspots(target_date, key)
+            if hotspots is None:
+                prob = self.scored_grid(target_date, rainfall_data)
+                hotspots = self.finish_prediction(target_date, prob, rainfall_data, key, inputs)
+            # The date's field is no longer needed once it is scored
+            rainfall[i] = None
+            yield target_date, hotspots
+    
+    def cluster_hotspots(self, df_high_risk, rainfall_data, labels=None):
+        """
+        Summarize clustered high-risk points as hotspots. Without `labels`
+        the points are clustered here with DBSCAN.
+        """
         if len(df_high_risk) == 0:
+             run_telemetry.add('clusters', 0)
              return []
 
         rainfall_val = rainfall_data['rainfall_24h']
@@ -476,244 +804,301 @@ class DateBasedPredictor:
         # This prevents merging, treating every high-risk point as a candidate.
         print(f"   🌧️  Rainfall ({rainfall_val}mm). Mode: FULL CITY GRID PREDICTION.")
         
-        # DBSCAN clustering
-        # OPTIMIZED: eps=0.004 (~400m) and min_samples=5.
-        # This groups widespread risks into distinct, major 'Disaster Zones'.
-        clustering = DBSCAN(eps=0.004, min_samples=5).fit(coords)
-        df_high_risk['cluster'] = clustering.labels_
+        if labels is None:
+            from sklearn.cluster import DBSCAN
+            
+            # DBSCAN clustering
+            # OPTIMIZED: eps=0.004 (~400m) and min_samples=5.
+            # This groups widespread risks into distinct, major 'Disaster Zones'.
+            coords = df_high_risk[['lat', 'lng']].values
+            labels = DBSCAN(eps=CLUSTER_EPS, min_samples=CLUSTER_MIN_SAMPLES).fit(coords).labels_
+        df_high_risk['cluster'] = labels
         
-        # Remove noise points (label = -1)
-        df_clustered = df_high_risk[df_high_risk['cluster'] != -1]
+        # Every cluster's centroid, mean/max risk and radius in one grouped pass
+        # (noise points, label -1, are dropped)
+        import grid_clustering
+        clusters = grid_clustering.cluster_summary(
+            labels,
+            df_high_risk['lat'].to_numpy(),
+            df_high_risk['lng'].to_numpy(),
+            df_high_risk['risk_score'].to_numpy(),
+            df_high_risk['rainfall_mm'].to_numpy() if 'rainfall_mm' in df_high_risk else None
+        )
+        n_clusters = len(clusters['size'])
+        run_telemetry.add('clusters', n_clusters)
+        
+        # SAFETY LIMIT: For Hackathon clarity, show only the Top 100 most critical zones.
+        # This prevents "Map Clutter" (8000 pins) and focuses on the worst flooding.
+        # Selected before any per-hotspot work, most confident first.
+        top = grid_clustering.top_clusters(clusters['risk_mean'], clusters['first'], MAX_HOTSPOTS)
+        if n_clusters > MAX_HOTSPOTS:
+            print(f"   ⚠️  Optimizing view: Showing Top {MAX_HOTSPOTS} Critical Zones (out of {n_clusters} detected)")
+        
+        # Determine severity
+        max_risk = clusters['risk_max'][top]
+        severity = np.select(
+            [max_risk > 0.85, max_risk > 0.75, max_risk > 0.65],
+            ['Critical', 'High', 'Medium'],
+            'Low'
+        )
+        
+        # Calculate radius
+        radius = np.maximum((clusters['radius_deg'][top] * 111000).astype(np.int64), 100)
+        
+        # Rainfall over each cluster when the date has a per-cell field
+        if 'rainfall_mean' in clusters:
+            rainfall = [float(mm) for mm in clusters['rainfall_mean'][top]]
+        else:
+            rainfall = [rainfall_data['rainfall_24h']] * len(top)
         
         hotspots = []
-        for cluster_id in df_clustered['cluster'].unique():
-            cluster_points = df_clustered[df_clustered['cluster'] == cluster_id]
-            
-            # Calculate cluster center
-            center_lat = cluster_points['lat'].mean()
-            center_lng = cluster_points['lng'].mean()
-            avg_risk = cluster_points['risk_score'].mean()
-            max_risk = cluster_points['risk_score'].max()
-            
-            # Determine severity
-            if max_risk > 0.85:
-                severity = 'Critical'
-            elif max_risk > 0.75:
-                severity = 'High'
-            elif max_risk > 0.65:
-                severity = 'Medium'
-            else:
-                severity = 'Low'
-            
-            # Calculate radius
-            distances = np.sqrt(
-                (cluster_points['lat'] - center_lat)**2 +
-                (cluster_points['lng'] - center_lng)**2
-            ) * 111000 
-            radius = max(int(distances.max()), 100)
-            
-            # Reverse geocode
-            name = self.get_location_name(center_lat, center_lng)
-            
-            # Estimate Response Time
-            response_time_mins = (min_pump_dist / 20.0) * 60 + 10
-            
-            # Risk factors & Logistics
+        for i, cluster in enumerate(top):
+            # Risk factors
             risk_factors = {
-                'high_rainfall': rainfall_data['rainfall_24h'] > 50,
-                'very_high_rainfall': rainfall_data['rainfall_24h'] > 100,
-                'cluster_size': len(cluster_points),
-                'max_risk_score': float(max_risk),
-                'logistics': {
-                    'nearest_pump_id': nearest_pump['id'],
-                    'nearest_pump_name': nearest_pump['name'],
-                    'est_response_time_mins': int(response_time_mins),
-                    'distance_km': round(min_pump_dist, 1)
-                }
+                'high_rainfall': rainfall[i] > 50,
+                'very_high_rainfall': rainfall[i] > 100,
+                'cluster_size': int(clusters['size'][cluster]),
+                'max_risk_score': float(max_risk[i])
             }
             
             hotspots.append({
-                'lat': float(center_lat),
-                'lng': float(center_lng),
-                'name': name,
-                'severity': severity,
-                'confidence_score': float(avg_risk),
-                'predicted_rainfall_mm': rainfall_data['rainfall_24h'],
+                'lat': float(clusters['lat'][cluster]),
+                'lng': float(clusters['lng'][cluster]),
+                'name': None,
+                'severity': str(severity[i]),
+                'confidence_score': float(clusters['risk_mean'][cluster]),
+                'predicted_rainfall_mm': rainfall[i],
                 'risk_factors': json.dumps(risk_factors),
-                'radius_meters': radius
+                'radius_meters': int(radius[i])
             })
-        
-        # Return all granular hotspots 
-        hotspots.sort(key=lambda x: x['confidence_score'], reverse=True)
-        
-        # SAFETY LIMIT: For Hackathon clarity, show only the Top 100 most critical zones.
-        # This prevents "Map Clutter" (8000 pins) and focuses on the worst flooding.
-        if len(hotspots) > 100:
-            print(f"   ⚠️  Optimizing view: Showing Top 100 Critical Zones (out of {len(hotspots)} detected)")
-            hotspots = hotspots[:100]
             
         return hotspots
     
-    def get_location_name(self, lat, lng):
-        """Get location name from coordinates (simplified)"""
-        # Dictionary of major Delhi areas with approximate coordinates
-        # Dictionary of major Delhi areas with approximate coordinates and DRAINAGE CAPACITY (mm)
-        # Usage: (lat, lng, name, drainage_capacity_mm)
-        # Default capacity is ~50mm. VVIP areas ~70-80mm. Critical points ~20-30mm.
-        self.known_locations = [
-            (28.6330, 77.2285, "Minto Bridge", 25),     # Critical Sump
-            (28.6304, 77.2425, "ITO Crossing", 35),     # High Traffic, Low Drainage
-            (28.5910, 77.1610, "Dhaula Kuan", 45),      # Slope runoff
-            (28.6139, 76.9830, "Najafgarh", 25),        # Rural/Drainage issues
-            (28.6675, 77.2282, "Kashmere Gate", 40),    # Old City
-            (28.5244, 77.2618, "Okhla", 30),            # Industrial
-            (28.6436, 77.1565, "Shadipur", 35),
-            (28.5355, 77.1420, "Munirka", 45),
-            (28.7041, 77.1025, "Pitampura", 55),        # Planned
-            (28.5494, 77.2117, "Green Park", 60),       # Planned
-            (28.6219, 77.0878, "Janakpuri", 55),
-            (28.5550, 77.2562, "Kalkaji", 45),
-            (28.5273, 77.2177, "Saket", 60),
-            (28.6406, 77.3060, "Preet Vihar", 50),
-            (28.6505, 77.1711, "Pushta Road", 20),      # Low lying
-            (28.6288, 77.2847, "Laxmi Nagar", 30),      # Congested
-            (28.5700, 77.3200, "Noida Sec-18 Area", 40),
-            (28.4595, 77.0266, "Gurgaon Cyber City Area", 45),
-            (28.7000, 77.2800, "Shahdara", 30),
-            (28.6900, 77.1900, "Model Town", 55),
-            (28.6000, 77.2300, "Lodhi Road", 75),       # VVIP
-            (28.5800, 77.2300, "Jangpura", 50),
-            (28.5500, 77.2000, "Hauz Khas", 65),
-            (28.5200, 77.2300, "Khanpur", 35),
-            (28.4900, 77.3000, "Badarpur", 35),
-            (28.6400, 77.1200, "Kirti Nagar", 50),
-            (28.6700, 77.1200, "Punjabi Bagh", 55),
-            (28.7300, 77.1100, "Rohini", 55),
-            (28.6100, 77.0400, "Dwarka", 60),           # Planned
-            (28.5900, 77.0700, "Palam", 40),
-            (28.6300, 77.3400, "Vaishali", 45),
-            (28.6500, 77.3700, "Indirapuram", 45),
-            (28.7500, 77.2000, "Burari", 25),           # Low lying
-            (28.6600, 77.2100, "Civil Lines", 65),
-            (28.6400, 77.2100, "Paharganj", 30),
-            (28.6200, 77.2000, "Connaught Place", 80),  # Top tier
-            (28.5900, 77.1900, "Chanakyapuri", 85),     # Diplomatic
-            (28.5700, 77.1700, "RK Puram", 60),
-            (28.5400, 77.1600, "Vasant Vihar", 70),
-            (28.5300, 77.1200, "Mahipalpur", 35),
-            (28.6800, 77.0600, "Nangloi", 30),
-            (28.6600, 77.0300, "Peeragarhi", 35),
-            (28.6200, 77.1000, "Mayapuri", 40),
-            (28.4800, 77.1800, "Chattarpur", 35)
-        ]
-        
-        
-        # Find nearest known location
-        min_dist = float('inf')
-        nearest_name = "Unknown Area"
-        
-        for known_lat, known_lng, name, _ in self.known_locations:
-            dist = np.sqrt((lat - known_lat)**2 + (lng - known_lng)**2)
-            if dist < min_dist:
-                min_dist = dist
-                nearest_name = name
-        
-        # If too far from known locations, use generic name
-        if min_dist > 0.03:  # ~3km
-            # Format: Lat/Lng simplified
-            return f"Zone near {nearest_name}"
-        
-        return nearest_name
-
-    def get_drainage_capacity(self, lat, lng):
-        """Get approximate drainage capacity (mm/24h) for a location"""
-        min_dist = float('inf')
-        capacity = 50.0 # Default fallback
-        
-        # Use existing known_locations table if initialized, else simple lookup
-        # Ensure known_locations is available (it's defined in get_location_name but better as class property)
-        # Re-defining here just in case get_location_name wasn't called or scope issues
-        # Actually, let's just use the same list as above. 
-        # Ideally, move known_locations to __init__ but for minimal diff, we'll access it or re-declare.
-        
-        # Accessing from self if we moved it to __init__, but we put it in get_location_name previously. 
-        # I'll move it to __init__ in a separate edit or just replicate accessing it if I assign to self.
-        
-        # Wait, I assigned it to `self.known_locations` in the previous chunk. 
-        
-        if hasattr(self, 'known_locations'):
-             for known_lat, known_lng, name, cap in self.known_locations:
-                dist = np.sqrt((lat - known_lat)**2 + (lng - known_lng)**2)
-                if dist < min_dist:
-                    min_dist = dist
-                    capacity = cap
-        
-        # Interpolate? No, nearest neighbor is fine for now.
-        return capacity
+    def name_hotspots(self, hotspots):
+        """Reverse geocode every hotspot centre in one batched lookup (in place)"""
+        names = get_location_index().lookup(
+            [h['lat'] for h in hotspots], [h['lng'] for h in hotspots]
+        )
+        for h, name in zip(hotspots, names):
+            h['name'] = name
+        return hotspots
     
     def save_predictions_to_db(self, target_date, hotspots):
-        """Save predictions to database"""
-        if not hotspots:
-            print("   No hotspots to save")
-            return
+        """
+        Swap in the predictions for a date in one transaction: COPY into a
+        staging table, drop rows that are no longer predicted, then upsert on
+        (prediction_date, lat, lng), skipping rows that did not change.
+        Readers see either the old set or the new one, never an empty date.
+        """
+        import db
         
-        try:
-            conn = psycopg2.connect(DATABASE_URL)
-            cur = conn.cursor()
-            
-            # Delete existing predictions for this date
-            cur.execute("""
-                DELETE FROM predicted_hotspots WHERE prediction_date = %s
-            """, (target_date,))
-            
-            # Prepare data for bulk insert
-            values = []
-            for h in hotspots:
-                values.append((
-                    target_date,
-                    h['name'],
-                    h['lat'],
-                    h['lng'],
-                    h['severity'],
-                    h['confidence_score'],
-                    h['predicted_rainfall_mm'],
-                    h['risk_factors'],
-                    h['radius_meters'],
-                    self.model_data['model_version']
-                ))
-            
-            # Bulk Insert using execute_values
-            from psycopg2.extras import execute_values
-            
-            query = """
-                INSERT INTO predicted_hotspots 
-                (prediction_date, name, lat, lng, severity, confidence_score, 
-                 predicted_rainfall_mm, risk_factors, radius_meters, model_version)
-                VALUES %s
-            """
-            
-            execute_values(cur, query, values)
+        columns = [
+            'prediction_date', 'name', 'lat', 'lng', 'severity', 'confidence_score',
+            'predicted_rainfall_mm', 'risk_factors', 'radius_meters', 'model_version'
+        ]
+        values = [
+            (
+                target_date,
+                h['name'],
+                h['lat'],
+                h['lng'],
+                h['severity'],
+                h['confidence_score'],
+                h['predicted_rainfall_mm'],
+                h['risk_factors'],
+                h['radius_meters'],
+                self.model_data['model_version']
+            )
+            for h in hotspots
+        ]
+        updatable = [c for c in columns if c not in ('prediction_date', 'lat', 'lng')]
+        
+        with run_telemetry.span('db_write'):
+            try:
+                started = time.perf_counter()
+                with db.connection() as conn, conn.cursor() as cur:
+                    # Staging columns copy the target's types, so lat/lng round exactly as stored
+                    cur.execute(f"""
+                        CREATE TEMP TABLE predicted_hotspots_staging ON COMMIT DROP AS
+                        SELECT {', '.join(columns)} FROM predicted_hotspots WITH NO DATA
+                    """)
+                    with db.timed('copy_predictions'):
+                        db.copy_rows(cur, 'predicted_hotspots_staging', columns, values)
+                
+                    # Row locks on predicted_hotspots are held from here until commit;
+                    # the advisory lock serialises concurrent writers for the same date
+                    locked = time.perf_counter()
+                    cur.execute("SELECT pg_advisory_xact_lock(hashtext('predicted_hotspots'), %s)",
+                                (datetime.strptime(target_date, '%Y-%m-%d').toordinal(),))
+                
+                    cur.execute("""
+                        DELETE FROM predicted_hotspots p
+                        WHERE p.prediction_date = %s
+                          AND NOT EXISTS (
+                              SELECT 1 FROM predicted_hotspots_staging s
+                              WHERE s.lat = p.lat AND s.lng = p.lng
+                          )
+                    """, (target_date,))
+                    removed = cur.rowcount
+                
+                    cur.execute(f"""
+                        INSERT INTO predicted_hotspots ({', '.join(columns)})
+                        SELECT DISTINCT ON (lat, lng) {', '.join(columns)}
+                        FROM predicted_hotspots_staging
+                        ORDER BY lat, lng, confidence_score DESC
+                        ON CONFLICT (prediction_date, lat, lng) DO UPDATE SET
+                            {', '.join(f'{c} = EXCLUDED.{c}' for c in updatable)},
+                            created_at = CURRENT_TIMESTAMP
+                        WHERE ({', '.join(f'predicted_hotspots.{c}' for c in updatable)})
+                            IS DISTINCT FROM ({', '.join(f'EXCLUDED.{c}' for c in updatable)})
+                        RETURNING (xmax = 0)
+                    """)
+                    written = [inserted for (inserted,) in cur.fetchall()]
             
-            conn.commit()
-            cur.close()
-            conn.close()
+                finished = time.perf_counter()
+                write_ms = (finished - started) * 1000
+                lock_ms = (finished - locked) * 1000
+                db.stats.record('save_predictions', write_ms)
+                db.stats.record('save_predictions_lock', lock_ms)
             
-            print(f"   ✅ Saved {len(hotspots)} predictions to database (Bulk Insert)")
+                inserted = sum(written)
+                updated = len(written) - inserted
+                unchanged = len(values) - len(written)
+                print(f"   ✅ Saved {len(hotspots)} predictions to database "
+                      f"({inserted} new, {updated} updated, {unchanged} unchanged, {removed} removed) "
+                      f"in {write_ms:.0f} ms, locks held {lock_ms:.0f} ms")
         
-        except Exception as e:
-            print(f"   ❌ Failed to save to database: {e}")
+            except Exception as e:
+                print(f"   ❌ Failed to save to database: {e}")
+                run_telemetry.set_fields(db_error=f"{type(e).__name__}: {e}")
+
+def date_range(start, end):
+    """Inclusive list of YYYY-MM-DD dates"""
+    start_obj = datetime.strptime(start, '%Y-%m-%d')
+    end_obj = datetime.strptime(end, '%Y-%m-%d')
+    return [
+        (start_obj + timedelta(days=i)).strftime('%Y-%m-%d')
+        for i in range((end_obj - start_obj).days + 1)
+    ]
+
+_batch_predictor = None
+
+_batch_run_id = None
+
+def _init_batch_process(render_tiles=True, run_id=None, threads=None):
+    global _batch_predictor, _batch_run_id
+    _batch_predictor = DateBasedPredictor(threads=threads)
+    _batch_predictor.render_tiles = render_tiles
+    _batch_run_id = run_id
+
+def _predict_batch(dates):
+    # Each pool process reports its share of the batch under the parent's run ID
+    with run_telemetry.run(f'{_batch_run_id}/{dates[0]}', op='predict_batch_part',
+                           parent_run_id=_batch_run_id, dates=dates):
+        return list(_batch_predictor.predict_dates(dates))
+
+def run_batch(dates, workers=1, save=True, render_tiles=True):
+    """
+    Predict a list of dates, optionally fanned out to a process pool in
+    tasks of POOL_TASK_DATES consecutive dates.
+    Database writes run on a background thread so saving one date overlaps
+    computing the next.
+    """
+    from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+    
+    writer = ThreadPoolExecutor(max_workers=1)
+    writes = []
+    completed = 0
+    run = run_telemetry.current()
+    
+    def save_in_run(target_date, hotspots):
+        with run_telemetry.attach(run):
+            saver.save_predictions_to_db(target_date, hotspots)
+    
+    def handle(target_date, hotspots):
+        if save:
+            writes.append(writer.submit(save_in_run, target_date, hotspots))
+    
+    if workers <= 1:
+        saver = DateBasedPredictor()
+        saver.render_tiles = render_tiles
+        for target_date, hotspots in saver.predict_dates(dates):
+            handle(target_date, hotspots)
+            completed += 1
+    else:
+        # The parent only saves; each pool process holds its own model and maps the shared static grid
+        saver = DateBasedPredictor()
+        batches = [dates[i:i + POOL_TASK_DATES] for i in range(0, len(dates), POOL_TASK_DATES)]
+        # Processes split the inference core budget instead of each taking all of it
+        threads = max(1, saver.threads // workers)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_batch_process,
+                                 initargs=(render_tiles, run and run.run_id, threads)) as pool:
+            futures = [pool.submit(_predict_batch, batch) for batch in batches]
+            for future in as_completed(futures):
+                for target_date, hotspots in future.result():
+                    handle(target_date, hotspots)
+                    completed += 1
+    
+    for write in writes:
+        write.result()
+    writer.shutdown()
+    
+    return completed
+
+def run_via_worker(target_date, run_id=None, render_tiles=True):
+    """
+    Ask a running prediction worker to generate the date; None if no worker
+    is listening. A worker that accepted the job but failed to answer is
+    reported as a failed response, not retried locally (it may still be
+    writing the date).
+    """
+    from prediction_worker import WorkerUnavailable, request
+    
+    try:
+        return request({'op': 'predict', 'date': target_date, 'run_id': run_id, 'tiles': render_tiles})
+    except WorkerUnavailable:
+        return None
+    except OSError as e:
+        return {'ok': False, 'error': f"{type(e).__name__}: {e}"}
 
 def main():
     """Main execution"""
-    if len(sys.argv) < 2:
-        print("Usage: python predict_for_date.py YYYY-MM-DD")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Generate waterlogging predictions for a date or date range")
+    parser.add_argument('date', nargs='?', help="Target date (YYYY-MM-DD)")
+    parser.add_argument('--local', action='store_true',
+                        help="Always predict in this process instead of using a running worker")
+    parser.add_argument('--start', help="Batch mode: first date (YYYY-MM-DD)")
+    parser.add_argument('--end', help="Batch mode: last date, inclusive (YYYY-MM-DD)")
+    parser.add_argument('--dates', nargs='+', help="Batch mode: explicit list of dates")
+    parser.add_argument('--workers', type=int, default=1, help="Batch mode: processes to fan dates out to")
+    parser.add_argument('--no-save', action='store_true', help="Batch mode: skip database writes")
+    parser.add_argument('--cube', action='store_true',
+                        help="Answer from the precomputed risk cube (builds it on first use)")
+    parser.add_argument('--rainfall', type=float,
+                        help="What-if: rainfall (mm) to assume for the date; uses the cube, never saved")
+    parser.add_argument('--no-tiles', action='store_true', help="Skip rendering risk map tiles")
+    parser.add_argument('--run-id', help="ID to tag this run's telemetry record with")
+    args = parser.parse_args()
     
-    target_date = sys.argv[1]
+    from dotenv import load_dotenv
+    load_dotenv()
+    render_tiles = risk_tiles_enabled() and not args.no_tiles
     
     # Validate date format
     try:
-        datetime.strptime(target_date, '%Y-%m-%d')
+        if args.start or args.end:
+            if not (args.start and args.end):
+                parser.error("--start and --end must be used together")
+            dates = date_range(args.start, args.end)
+        elif args.dates:
+            dates = args.dates
+            for d in dates:
+                datetime.strptime(d, '%Y-%m-%d')
+        elif args.date:
+            dates = None
+            datetime.strptime(args.date, '%Y-%m-%d')
+        else:
+            parser.error("a date, --start/--end or --dates is required")
     except ValueError:
         print("❌ Invalid date format. Use YYYY-MM-DD")
         sys.exit(1)
@@ -722,9 +1107,52 @@ def main():
     print("🔮 DATE-BASED WATERLOGGING PREDICTION")
     print("="*70)
     
-    predictor = DateBasedPredictor()
-    hotspots = predictor.predict_for_date(target_date)
-    predictor.save_predictions_to_db(target_date, hotspots)
+    run = None
+    if dates is not None:
+        # Season backfills run locally: one model load and grid for the whole range
+        with run_telemetry.run(args.run_id, op='predict_batch', dates=dates) as run:
+            started = datetime.now()
+            completed = run_batch(dates, args.workers, save=not args.no_save,
+                                  render_tiles=render_tiles)
+            elapsed = (datetime.now() - started).total_seconds()
+            print(f"\n   ✅ Predicted {completed} dates in {elapsed:.1f}s ({elapsed / max(completed, 1):.2f}s/date)")
+    else:
+        target_date = args.date
+        
+        # Thin client: a resident worker already holds the model and static grid
+        # (and writes the run's telemetry record itself)
+        use_cube = args.cube or args.rainfall is not None
+        response = None if (args.local or use_cube) else run_via_worker(target_date, args.run_id, render_tiles)
+        
+        if response is not None:
+            if not response['ok']:
+                print(f"❌ Prediction worker failed: {response['error']}")
+                sys.exit(1)
+            print(f"   ✅ Worker generated {response['hotspot_count']} hotspots in {response['latency_ms']:.0f} ms "
+                  f"(run {response.get('run_id')})")
+        elif use_cube:
+            op = 'predict_cube' if args.rainfall is None else 'what_if'
+            with run_telemetry.run(args.run_id, op=op, dates=[target_date]) as run:
+                predictor = DateBasedPredictor()
+                hotspots = predictor.predict_from_cube(target_date, args.rainfall)
+                if args.rainfall is None:
+                    predictor.save_predictions_to_db(target_date, hotspots)
+                else:
+                    for h in hotspots[:10]:
+                        print(f"      {h['severity']:<8} {h['confidence_score']:.2f}  {h['name']}")
+        else:
+            with run_telemetry.run(args.run_id, op='predict', dates=[target_date]) as run:
+                predictor = DateBasedPredictor()
+                predictor.render_tiles = render_tiles
+                hotspots = predictor.predict_for_date(target_date)
+                predictor.save_predictions_to_db(target_date, hotspots)
+    
+    if run is not None:
+        print(f"   📊 Run {run.run_id}: {run.record['wall_ms']:.0f} ms "
+              f"(telemetry in {os.path.normpath(run_telemetry.TELEMETRY_FILE)})")
+    # Only runs that touched the database have timings (and psycopg2 loaded)
+    if 'db' in sys.modules:
+        sys.modules['db'].report()
     
     print("\n" + "="*70)
     print("✨ Prediction completed!")
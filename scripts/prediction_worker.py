@@ -0,0 +1,303 @@
+"""
+Persistent Prediction Worker
+Keeps DateBasedPredictor (model + static grid) resident and serves prediction
+jobs over a JSON-lines protocol on stdin/stdout and/or a local TCP socket.
+
+Protocol: one JSON object per line, answered by one JSON object per line.
+    {"id": 1, "op": "predict", "date": "2023-07-08", "tiles": false}
+        -> {"id": 1, "ok": true, "date": "2023-07-08", "hotspot_count": 42, "latency_ms": 812.4,
+            "run_id": "...", "telemetry": {...}}
+    {"id": 2, "op": "health"}
+        -> {"id": 2, "ok": true, "status": "ok", "queue_depth": 0, ...}
+    {"id": 3, "op": "invalidate", "dates": ["2023-07-08"]}
+        -> {"id": 3, "ok": true, "invalidated": ["2023-07-08"]}
+Failures answer {"id": ..., "ok": false, "error": "..."}. A predict request
+may carry "run_id" to tag the run's telemetry record (see run_telemetry.py)
+and "tiles" to render (or skip) the date's map tiles regardless of RISK_TILES.
+"invalidate" drops the resident rainfall store's database rows and misses
+for the dates (all dates without "dates"), e.g. after a rainfall backfill.
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import socket
+import argparse
+import threading
+import socketserver
+from collections import deque
+from concurrent.futures import Future
+from datetime import datetime
+
+import run_telemetry
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = int(os.getenv('PREDICTION_WORKER_PORT', '8765'))
+
+
+class WorkerBusy(Exception):
+    """Raised when the job queue is full"""
+
+
+class WorkerUnavailable(OSError):
+    """Raised by request() when no worker accepts the connection"""
+
+
+class PredictionService:
+    """Bounded job queue in front of one resident DateBasedPredictor"""
+
+    def __init__(self, predictor, workers=2, max_queue=32, latency_window=500):
+        self.predictor = predictor
+        self.jobs = queue.Queue(maxsize=max_queue)
+        self.max_queue = max_queue
+        self.lock = threading.Lock()
+        self.in_flight = {}  # (date, save, tiles) -> Future, so repeated dates share one job
+        self.latencies = deque(maxlen=latency_window)
+        self.completed = 0
+        self.failed = 0
+        self.started_at = time.time()
+
+        self.threads = [
+            threading.Thread(target=self._run, name=f'prediction-{i}', daemon=True)
+            for i in range(workers)
+        ]
+        for t in self.threads:
+            t.start()
+
+    def submit(self, target_date, save=True, run_id=None, tiles=None):
+        """
+        Queue a prediction for a date; returns a Future resolving to
+        (hotspots, latency_ms, telemetry record). A request joining a job
+        already in flight shares that job's run ID. tiles=None renders map
+        tiles as the predictor is configured to.
+        """
+        datetime.strptime(target_date, '%Y-%m-%d')
+
+        key = (target_date, save, tiles)
+        with self.lock:
+            future = self.in_flight.get(key)
+            if future is not None:
+                return future
+
+            future = Future()
+            try:
+                self.jobs.put_nowait((target_date, save, tiles, run_id, future, time.perf_counter()))
+            except queue.Full:
+                raise WorkerBusy(f"Job queue full ({self.max_queue} pending)")
+            self.in_flight[key] = future
+
+        return future
+
+    def _run(self):
+        while True:
+            target_date, save, tiles, run_id, future, queued_at = self.jobs.get()
+            try:
+                with run_telemetry.run(run_id, op='predict', dates=[target_date], source='worker',
+                                       queue_ms=round((time.perf_counter() - queued_at) * 1000, 1)) as run:
+                    hotspots = self.predictor.predict_for_date(target_date, render_tiles=tiles)
+                    if save:
+                        self.predictor.save_predictions_to_db(target_date, hotspots)
+            except Exception as e:
+                with self.lock:
+                    self.failed += 1
+                    self.in_flight.pop((target_date, save, tiles), None)
+                future.set_exception(e)
+            else:
+                latency_ms = (time.perf_counter() - queued_at) * 1000
+                with self.lock:
+                    self.completed += 1
+                    self.latencies.append(latency_ms)
+                    self.in_flight.pop((target_date, save, tiles), None)
+                future.set_result((hotspots, latency_ms, run.record))
+            finally:
+                self.jobs.task_done()
+
+    def health(self):
+        """Queue, throughput and latency summary"""
+        with self.lock:
+            latencies = sorted(self.latencies)
+            stats = {
+                'status': 'ok',
+                'pid': os.getpid(),
+                'model_version': self.predictor.model_data['model_version'],
+                'uptime_s': round(time.time() - self.started_at, 1),
+                'workers': len(self.threads),
+                'queue_depth': self.jobs.qsize(),
+                'queue_capacity': self.max_queue,
+                'in_flight': len(self.in_flight),
+                'completed': self.completed,
+                'failed': self.failed
+            }
+
+        import db
+        stats['db_queries'] = db.stats.snapshot()
+        if self.predictor.result_cache is not None:
+            stats['result_cache'] = self.predictor.result_cache.stats()
+
+        if latencies:
+            stats['latency_ms'] = {
+                'p50': round(latencies[len(latencies) // 2], 1),
+                'p95': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 1),
+                'max': round(latencies[-1], 1)
+            }
+        return stats
+
+    def handle(self, request):
+        """Answer one protocol request (blocks until a predict job finishes)"""
+        request_id = request.get('id')
+        op = request.get('op')
+
+        try:
+            if op == 'health':
+                return {'id': request_id, 'ok': True, **self.health()}
+
+            if op == 'invalidate':
+                dates = request.get('dates')
+                for d in dates or []:
+                    datetime.strptime(d, '%Y-%m-%d')
+                self.predictor.rainfall_store.invalidate(dates)
+                return {'id': request_id, 'ok': True, 'invalidated': dates if dates is not None else 'all'}
+
+            if op == 'predict':
+                target_date = request.get('date')
+                if not target_date:
+                    raise ValueError("'date' is required")
+                future = self.submit(target_date, save=request.get('save', True), run_id=request.get('run_id'),
+                                     tiles=request.get('tiles'))
+                hotspots, latency_ms, telemetry = future.result()
+                response = {
+                    'id': request_id,
+                    'ok': True,
+                    'date': target_date,
+                    'hotspot_count': len(hotspots),
+                    'latency_ms': round(latency_ms, 1),
+                    'run_id': telemetry['run_id'],
+                    'telemetry': telemetry
+                }
+                if request.get('return_hotspots'):
+                    response['hotspots'] = hotspots
+                return response
+
+            raise ValueError(f"Unknown op: {op!r}")
+
+        except Exception as e:
+            return {'id': request_id, 'ok': False, 'error': f"{type(e).__name__}: {e}"}
+
+
+def serve_stdio(service, stdin, stdout):
+    """JSON lines on stdin/stdout; each request is answered as soon as it completes"""
+    write_lock = threading.Lock()
+
+    def reply(response):
+        with write_lock:
+            stdout.write(json.dumps(response) + '\n')
+            stdout.flush()
+
+    def answer(request):
+        reply(service.handle(request))
+
+    for line in stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as e:
+            reply({'id': None, 'ok': False, 'error': f"Invalid JSON: {e}"})
+            continue
+        threading.Thread(target=answer, args=(request,), daemon=True).start()
+
+
+class JsonLineHandler(socketserver.StreamRequestHandler):
+    """One connection; requests on it are answered in order"""
+
+    def handle(self):
+        for line in self.rfile:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                response = self.server.service.handle(json.loads(line))
+            except json.JSONDecodeError as e:
+                response = {'id': None, 'ok': False, 'error': f"Invalid JSON: {e}"}
+            self.wfile.write((json.dumps(response) + '\n').encode('utf-8'))
+            self.wfile.flush()
+
+
+class WorkerServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, service):
+        super().__init__(address, JsonLineHandler)
+        self.service = service
+
+
+def request(payload, host=DEFAULT_HOST, port=DEFAULT_PORT, connect_timeout=1.0, timeout=600.0):
+    """
+    Send one request to a running worker and return its response.
+    Raises WorkerUnavailable if no worker is listening, and other OSErrors
+    (e.g. a read timeout) if one accepted the request but did not answer.
+    """
+    try:
+        sock = socket.create_connection((host, port), timeout=connect_timeout)
+    except OSError as e:
+        raise WorkerUnavailable(f"No prediction worker at {host}:{port}: {e}") from e
+    with sock:
+        sock.settimeout(timeout)
+        sock.sendall((json.dumps(payload) + '\n').encode('utf-8'))
+        with sock.makefile('r', encoding='utf-8') as f:
+            line = f.readline()
+    if not line:
+        raise ConnectionError("Worker closed the connection without answering")
+    return json.loads(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Persistent waterlogging prediction worker")
+    parser.add_argument('--stdio', action='store_true', help="Serve JSON lines on stdin/stdout")
+    parser.add_argument('--port', type=int, default=None, help="Serve JSON lines on 127.0.0.1:PORT")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--workers', type=int, default=int(os.getenv('PREDICTION_WORKERS', '2')))
+    parser.add_argument('--max-queue', type=int, default=int(os.getenv('PREDICTION_MAX_QUEUE', '32')))
+    args = parser.parse_args()
+
+    if not args.stdio and args.port is None:
+        args.port = DEFAULT_PORT
+
+    # Protocol owns stdout; predictor progress lines go to stderr
+    protocol_out = sys.stdout
+    sys.stdout = sys.stderr
+
+    from predict_for_date import DateBasedPredictor
+
+    started = time.perf_counter()
+    predictor = DateBasedPredictor()
+    predictor.preload()
+    service = PredictionService(predictor, workers=args.workers, max_queue=args.max_queue)
+    print(f"✅ Prediction worker ready in {time.perf_counter() - started:.1f}s "
+          f"({args.workers} workers, queue {args.max_queue})")
+
+    server = None
+    if args.port is not None:
+        try:
+            server = WorkerServer((args.host, args.port), service)
+        except OSError as e:
+            if not args.stdio:
+                raise
+            print(f"⚠️ Socket {args.host}:{args.port} unavailable ({e}); serving stdio only")
+        else:
+            print(f"   Listening on {args.host}:{args.port}")
+
+    if args.stdio:
+        if server is not None:
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+        serve_stdio(service, sys.stdin, protocol_out)
+    else:
+        server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
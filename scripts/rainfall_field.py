@@ -0,0 +1,100 @@
+"""
+Per-Cell Rainfall Field
+Interpolates the gauge stations reporting on a date onto every grid cell
+(inverse-distance weighting over each cell's nearest stations).
+
+The weights depend only on where the stations are, so they are built once
+per station set as a sparse (n_cells, n_stations) matrix with rows summing
+to 1. A date's field is then one matrix-vector product with the station
+readings, and a batch of dates one matrix-matrix product.
+"""
+
+import hashlib
+
+import numpy as np
+
+# Stations blended into each cell, and the IDW distance exponent
+NEIGHBOURS = 4
+POWER = 2.0
+
+# Distances are clamped to this (km) so a cell on top of a station takes
+# that station's reading instead of dividing by zero
+MIN_DIST_KM = 0.001
+
+# km per degree; longitude degrees are shortened by cos(latitude) at Delhi
+KM_PER_DEG = 111.0
+LNG_SCALE = np.cos(np.radians(28.65))
+
+# Fields are rounded to the gauges' own precision (historical_rainfall
+# stores DECIMAL(6, 2)), so uniform readings give exactly that value and
+# drainage thresholds are not flipped by float residue
+DECIMALS = 2
+
+# Cells processed per block while building weights (bounds the dense
+# cell x station distance block)
+CHUNK_CELLS = 65536
+
+
+def station_set(stations):
+    """Canonical (name, lat, lng) order of a date's stations"""
+    return tuple(sorted((name, float(lat), float(lng)) for name, lat, lng, _ in stations))
+
+
+def station_set_key(stations_set):
+    """Short hash of a station set (names and positions)"""
+    return hashlib.sha256(repr(stations_set).encode('utf-8')).hexdigest()[:16]
+
+
+def idw_weights(cell_lat, cell_lng, station_lat, station_lng, neighbours=NEIGHBOURS, power=POWER):
+    """Sparse (n_cells, n_stations) IDW weights over each cell's nearest stations"""
+    from scipy.sparse import csr_matrix
+
+    n_cells, n_stations = len(cell_lat), len(station_lat)
+    k = min(neighbours, n_stations)
+    station_lat = np.asarray(station_lat, dtype=np.float64)
+    station_lng = np.asarray(station_lng, dtype=np.float64)
+
+    indices = np.empty((n_cells, k), dtype=np.int32)
+    weights = np.empty((n_cells, k), dtype=np.float64)
+    for start in range(0, n_cells, CHUNK_CELLS):
+        stop = min(start + CHUNK_CELLS, n_cells)
+        d_lat = np.asarray(cell_lat[start:stop], dtype=np.float64)[:, None] - station_lat
+        d_lng = (np.asarray(cell_lng[start:stop], dtype=np.float64)[:, None] - station_lng) * LNG_SCALE
+        dist = np.hypot(d_lat, d_lng) * KM_PER_DEG
+
+        nearest = np.argpartition(dist, k - 1, axis=1)[:, :k] if k < n_stations else \
+            np.broadcast_to(np.arange(n_stations), dist.shape)
+        w = np.maximum(np.take_along_axis(dist, nearest, axis=1), MIN_DIST_KM) ** -power
+        indices[start:stop] = nearest
+        weights[start:stop] = w / w.sum(axis=1, keepdims=True)
+
+    indptr = np.arange(0, n_cells * k + 1, k, dtype=np.int64)
+    return csr_matrix((weights.ravel(), indices.ravel(), indptr), shape=(n_cells, n_stations))
+
+
+class RainfallField:
+    """IDW weights from one station set to every cell of a grid"""
+
+    def __init__(self, stations_set, cell_lat, cell_lng):
+        self.stations = stations_set
+        self.key = station_set_key(stations_set)
+        self.index = {name: i for i, (name, _, _) in enumerate(stations_set)}
+        _, lat, lng = zip(*stations_set)
+        self.weights = idw_weights(cell_lat, cell_lng, lat, lng)
+
+    def readings(self, stations):
+        """A date's station readings (mm) as a vector in this set's order"""
+        values = np.empty(len(self.stations))
+        for name, _, _, rainfall_mm in stations:
+            values[self.index[name]] = rainfall_mm
+        return values
+
+    def apply(self, values):
+        """
+        Per-cell rainfall for station readings: (n_stations,) -> (n_cells,),
+        or (n_dates, n_stations) -> C-contiguous (n_dates, n_cells)
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if values.ndim == 1:
+            return np.round(self.weights @ values, DECIMALS)
+        return np.round(np.ascontiguousarray((self.weights @ values.T).T), DECIMALS)
@@ -0,0 +1,201 @@
+"""
+Rainfall Store
+Date-indexed, in-memory rainfall lookups for the prediction pipeline:
+the IMD historical record (with a compact binary cache) and range
+prefetches from the historical_rainfall table, including each date's
+geolocated station readings.
+"""
+
+import os
+import time
+import threading
+import numpy as np
+from datetime import datetime, timedelta
+
+CACHE_DIR = os.path.join(os.path.dirname(__file__), '..', 'cache')
+IMD_CSV = os.path.join(os.path.dirname(__file__), '..', 'imd_delhi_rainfall_historical.csv')
+
+# Seconds a database answer stays valid: rows can be backfilled or corrected
+# while a resident worker keeps its store, so misses expire quickly and
+# found rows are re-read now and then
+MISS_TTL = 10 * 60
+ROW_TTL = 60 * 60
+
+
+def date_ordinal(target_date):
+    """Proleptic Gregorian ordinal of a YYYY-MM-DD string"""
+    return datetime.strptime(target_date, '%Y-%m-%d').toordinal()
+
+
+class RainfallStore:
+    """
+    O(1) rainfall lookups by date; loads the IMD record once and database
+    rows for up to row_ttl (miss_ttl for dates without a row). Safe to share
+    between threads: a refetch swaps a span's entries in under a lock.
+    """
+
+    def __init__(self, csv_path=IMD_CSV, cache_dir=CACHE_DIR, miss_ttl=MISS_TTL, row_ttl=ROW_TTL):
+        self.csv_path = csv_path
+        self.miss_ttl = miss_ttl
+        self.row_ttl = row_ttl
+        self.cache_file = os.path.join(cache_dir, 'imd_rainfall.npz')
+        self.imd_base = None      # ordinal of imd_values[0]
+        self.imd_values = None    # rainfall_mm per day, NaN where missing
+        self.db_rows = {}         # date -> row dict
+        self.db_fetched = {}      # date -> monotonic time of the query that answered it
+        self.db_stations = {}     # date -> [(station_name, lat, lng, rainfall_24h)]
+        self.db_lock = threading.Lock()
+
+    # --- IMD record ---
+
+    def _csv_signature(self):
+        stat = os.stat(self.csv_path)
+        return np.array([stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+
+    def _load_imd(self):
+        if self.imd_values is not None:
+            return
+        if not os.path.exists(self.csv_path):
+            self.imd_base, self.imd_values = 0, np.empty(0)
+            return
+
+        signature = self._csv_signature()
+        if os.path.exists(self.cache_file):
+            try:
+                with np.load(self.cache_file) as cached:
+                    if np.array_equal(cached['signature'], signature):
+                        self.imd_base = int(cached['base'])
+                        self.imd_values = cached['values']
+                        return
+            except (OSError, ValueError, KeyError) as e:
+                print(f"   ⚠️  Rebuilding rainfall cache: {e}")
+
+        self.imd_base, self.imd_values = self._read_imd_csv()
+
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            tmp_file = f'{self.cache_file}.{os.getpid()}.tmp.npz'
+            np.savez(tmp_file, signature=signature, base=self.imd_base, values=self.imd_values)
+            os.replace(tmp_file, self.cache_file)
+        except OSError as e:
+            print(f"   ⚠️  Could not cache IMD rainfall: {e}")
+
+    def _read_imd_csv(self):
+        import pandas as pd
+        df = pd.read_csv(self.csv_path, usecols=['date', 'rainfall_mm'])
+
+        days = pd.to_datetime(df['date'], format='%Y-%m-%d').to_numpy().astype('datetime64[D]')
+        ordinals = days.astype(np.int64) + datetime(1970, 1, 1).toordinal()
+        base = int(ordinals.min())
+
+        # First row wins for duplicated dates, like the old row scan
+        offsets, first = np.unique(ordinals - base, return_index=True)
+        values = np.full(int(offsets.max()) + 1, np.nan)
+        values[offsets] = df['rainfall_mm'].to_numpy(dtype=np.float64)[first]
+        return base, values
+
+    def imd(self, target_date):
+        """IMD rainfall (mm) for the date, or None if the record has no value"""
+        self._load_imd()
+        offset = date_ordinal(target_date) - self.imd_base
+        if 0 <= offset < len(self.imd_values):
+            value = self.imd_values[offset]
+            if not np.isnan(value):
+                return float(value)
+        return None
+
+    # --- historical_rainfall table ---
+
+    def prefetch(self, start_date, end_date):
+        """Load every historical_rainfall row in [start, end] with one query"""
+        import db
+
+        start_obj = datetime.strptime(start_date, '%Y-%m-%d').date()
+        end_obj = datetime.strptime(end_date, '%Y-%m-%d').date()
+        span = [
+            (start_obj + timedelta(days=i)).isoformat()
+            for i in range((end_obj - start_obj).days + 1)
+        ]
+
+        try:
+            rows = db.execute_prepared('rainfall_range', (start_date, end_date))
+        except Exception as e:
+            # Nothing is recorded, so the next lookup queries again
+            print(f"   ⚠️  Could not fetch from database: {e}")
+            return
+
+        rows_by_date, stations = {}, {}
+        for record_date, rainfall_24h, temperature_c, humidity_percent, station_name, lat, lng in rows:
+            d = record_date.isoformat()
+            if station_name and lat is not None and lng is not None and rainfall_24h is not None:
+                stations.setdefault(d, []).append(
+                    (station_name, float(lat), float(lng), float(rainfall_24h))
+                )
+            if d not in rows_by_date and rainfall_24h is not None:
+                rows_by_date[d] = {
+                    'rainfall_24h': float(rainfall_24h),
+                    'temperature': float(temperature_c) if temperature_c else 30.0,
+                    'humidity': int(humidity_percent) if humidity_percent else 70
+                }
+
+        # Readers never see a span half replaced
+        fetched_at = time.monotonic()
+        with self.db_lock:
+            for d in span:
+                self.db_fetched[d] = fetched_at
+                if d in rows_by_date:
+                    self.db_rows[d] = rows_by_date[d]
+                else:
+                    self.db_rows.pop(d, None)
+                if d in stations:
+                    self.db_stations[d] = stations[d]
+                else:
+                    self.db_stations.pop(d, None)
+
+    def _loaded(self, target_date):
+        """True if the database answered for the date within its TTL (caller holds db_lock)"""
+        fetched_at = self.db_fetched.get(target_date)
+        if fetched_at is None:
+            return False
+        ttl = self.row_ttl if target_date in self.db_rows else self.miss_ttl
+        return time.monotonic() - fetched_at < ttl
+
+    def _lookup(self, target_date, table, default):
+        with self.db_lock:
+            if self._loaded(target_date):
+                return table.get(target_date, default)
+        self.prefetch(target_date, target_date)
+        with self.db_lock:
+            return table.get(target_date, default)
+
+    def invalidate(self, dates=None):
+        """Forget database rows and misses for the dates (every date if None)"""
+        with self.db_lock:
+            if dates is None:
+                self.db_rows.clear()
+                self.db_fetched.clear()
+                self.db_stations.clear()
+                return
+            for d in dates:
+                self.db_rows.pop(d, None)
+                self.db_fetched.pop(d, None)
+                self.db_stations.pop(d, None)
+
+    def prefetch_missing(self, dates, stations=False):
+        """
+        Prefetch the database span covering the dates the IMD record cannot
+        answer (every date not yet loaded, if station readings are wanted)
+        """
+        with self.db_lock:
+            unloaded = [d for d in dates if not self._loaded(d)]
+        missing = sorted(d for d in unloaded if stations or self.imd(d) is None)
+        if missing:
+            self.prefetch(missing[0], missing[-1])
+
+    def db(self, target_date):
+        """historical_rainfall row for the date, or None"""
+        return self._lookup(target_date, self.db_rows, None)
+
+    def stations(self, target_date):
+        """Geolocated station readings [(name, lat, lng, rainfall_24h)] for the date"""
+        return self._lookup(target_date, self.db_stations, [])
@@ -0,0 +1,151 @@
+"""
+Prediction Result Cache
+Finished predictions keyed by a fingerprint of every input that decides
+them (model, static layers, grid, resolved rainfall, temporal features,
+clustering settings), so re-requesting a date, or a date whose inputs
+match an earlier one, skips inference and clustering:
+
+    cache/prediction_results/<key>/
+        manifest.json   fingerprinted inputs, created_at, size
+        hotspots.json   hotspots as returned by the predictor
+        risk.npy        float32 risk surface (for rendering map tiles)
+
+Entries are written once (temp dir + rename). A hit touches the entry's
+manifest, and after each write the least recently used entries are
+evicted until the cache fits PREDICTION_RESULT_CACHE_MB (default 256).
+PREDICTION_RESULT_CACHE=off disables it.
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+
+import numpy as np
+
+import run_telemetry
+
+CACHE_DIR = os.path.join(os.path.dirname(__file__), '..', 'cache', 'prediction_results')
+
+# Bump when the pipeline changes in a way the fingerprint cannot see
+# (physics, severity rules, hotspot fields)
+RESULT_FORMAT_VERSION = 1
+
+DEFAULT_MAX_MB = 256
+
+
+def fingerprint(inputs):
+    """Stable hash of a JSON-able dict of inputs"""
+    payload = json.dumps({'format': RESULT_FORMAT_VERSION, **inputs}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:24]
+
+
+class ResultCache:
+    """Size-bounded on-disk LRU of prediction results"""
+
+    def __init__(self, path=CACHE_DIR, max_bytes=DEFAULT_MAX_MB * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _count(self, name):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+        run_telemetry.add(f'result_cache_{name}')
+
+    def get(self, key):
+        """(hotspots, risk memmap) for a key, or None on a miss"""
+        entry = os.path.join(self.path, key)
+        try:
+            with open(os.path.join(entry, 'hotspots.json')) as f:
+                hotspots = json.load(f)
+            risk = np.load(os.path.join(entry, 'risk.npy'), mmap_mode='r')
+            os.utime(os.path.join(entry, 'manifest.json'))
+        except (OSError, ValueError):
+            # Missing, half-evicted or unreadable entries are plain misses
+            self._count('misses')
+            return None
+        self._count('hits')
+        return hotspots, risk
+
+    def put(self, key, inputs, hotspots, risk):
+        """Store a result (first writer wins), then evict down to the size limit"""
+        entry = os.path.join(self.path, key)
+        if os.path.exists(entry):
+            return
+        tmp_path = f'{entry}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            os.makedirs(tmp_path, exist_ok=True)
+            with open(os.path.join(tmp_path, 'hotspots.json'), 'w') as f:
+                json.dump(hotspots, f)
+            np.save(os.path.join(tmp_path, 'risk.npy'), np.asarray(risk, dtype=np.float32))
+            size = sum(os.path.getsize(os.path.join(tmp_path, name)) for name in os.listdir(tmp_path))
+            with open(os.path.join(tmp_path, 'manifest.json'), 'w') as f:
+                json.dump({
+                    'key': key,
+                    'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                    'bytes': size,
+                    'inputs': inputs
+                }, f, indent=2, default=str)
+            os.rename(tmp_path, entry)
+        except OSError as e:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            if not os.path.exists(entry):
+                print(f"   ⚠️  Could not cache prediction result: {e}")
+            return
+        self.evict()
+
+    def entries(self):
+        """[(last_used, bytes, path)] of every complete entry, oldest first"""
+        found = []
+        try:
+            names = os.listdir(self.path)
+        except OSError:
+            return found
+        for name in names:
+            entry = os.path.join(self.path, name)
+            if name.endswith('.tmp'):
+                continue
+            try:
+                last_used = os.path.getmtime(os.path.join(entry, 'manifest.json'))
+                size = sum(e.stat().st_size for e in os.scandir(entry) if e.is_file())
+            except OSError:
+                continue
+            found.append((last_used, size, entry))
+        found.sort()
+        return found
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits max_bytes"""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+            self._count('evictions')
+
+    def stats(self):
+        with self.lock:
+            counts = {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+        entries = self.entries()
+        return {
+            **counts,
+            'entries': len(entries),
+            'size_mb': round(sum(size for _, size, _ in entries) / (1024 * 1024), 1),
+            'max_mb': round(self.max_bytes / (1024 * 1024), 1)
+        }
+
+
+def result_cache_from_env():
+    """The configured cache, or None when PREDICTION_RESULT_CACHE=off"""
+    if os.getenv('PREDICTION_RESULT_CACHE', 'on') == 'off':
+        return None
+    max_mb = float(os.getenv('PREDICTION_RESULT_CACHE_MB', DEFAULT_MAX_MB))
+    return ResultCache(max_bytes=int(max_mb * 1024 * 1024))
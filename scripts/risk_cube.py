@@ -0,0 +1,249 @@
+"""
+Risk Response Cube
+Offline evaluation of the ensemble over (rainfall knot x day-of-year knot x
+cell), stored as quantized uint8 in a memory-mapped .npy. Per-cell model
+risk for any date and rainfall is then a bilinear blend of four slices, with
+no model inference. Drainage and vulnerability physics are applied on top
+by the predictor, exactly as for a full run.
+
+The cache key covers the model version, its training timestamp and the
+static grid key, so retraining or changing the grid builds a new cube.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import calendar
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from feature_engine import RAINFALL_INTENSITY_BINS
+
+CACHE_DIR = os.path.join(os.path.dirname(__file__), '..', 'cache')
+
+# Bump when the cube layout or quantization changes
+CUBE_FORMAT_VERSION = 1
+
+# Rainfall knots (mm). Each IMD intensity boundary also gets a knot just
+# above it, so the class step is not smeared across a whole interval.
+BASE_RAIN_KNOTS = (
+    0, 0.1, 1, 2.5, 5, 7.5, 10, 12.5, 17.5, 20, 22.5, 25, 27.5, 30, 32.5,
+    40, 45, 50, 55, 60, 72.5, 80, 90, 100, 130, 150, 175, 200, 250, 300, 400
+)
+BOUNDARY_EPSILON = 0.01
+
+# Day-of-month knots every DOY_STEP days plus each month's last day. Month is
+# a step feature, so queries only blend knots within their own month.
+DOY_STEP = 10
+KNOT_YEAR = 2023
+
+def rain_knots(base=BASE_RAIN_KNOTS, epsilon=BOUNDARY_EPSILON):
+    boundaries = RAINFALL_INTENSITY_BINS[1:-1]
+    knots = set(float(k) for k in base)
+    knots.update(float(b) for b in boundaries)
+    knots.update(float(b) + epsilon for b in boundaries)
+    return np.array(sorted(knots))
+
+
+def knot_day_of_year(month, day):
+    """Day of year in the (non-leap) knot calendar; Feb 29 maps to Feb 28"""
+    last = calendar.monthrange(KNOT_YEAR, month)[1]
+    return date(KNOT_YEAR, month, min(day, last)).timetuple().tm_yday
+
+
+def doy_knots(step=DOY_STEP):
+    knots = []
+    for month in range(1, 13):
+        last = calendar.monthrange(KNOT_YEAR, month)[1]
+        days = sorted(set(range(1, last + 1, step)) | {last})
+        knots.extend(knot_day_of_year(month, day) for day in days)
+    return np.array(knots)
+
+
+def knot_date(day_of_year):
+    """Calendar date in the knot year for a day-of-year knot"""
+    return (date(KNOT_YEAR, 1, 1) + timedelta(days=int(day_of_year) - 1)).isoformat()
+
+
+def risk_cube_key(model_data, grid_key, rains, doys):
+    payload = json.dumps({
+        'format': CUBE_FORMAT_VERSION,
+        'model_version': model_data['model_version'],
+        'trained_at': model_data.get('trained_at'),
+        'static_grid': grid_key,
+        'rain_knots': rains.tolist(),
+        'doy_knots': doys.tolist()
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def _bracket(knots, value):
+    """Lower knot index and blend weight for value, clamped to the knot range"""
+    value = min(max(float(value), knots[0]), knots[-1])
+    i = int(np.clip(np.searchsorted(knots, value, side='right') - 1, 0, len(knots) - 2))
+    return i, (value - knots[i]) / (knots[i + 1] - knots[i])
+
+
+class RiskCube:
+    """Memory-mapped uint8 cube of ensemble probability, shape (rain, doy, cells)"""
+
+    def __init__(self, path, manifest, cube):
+        self.path = path
+        self.manifest = manifest
+        self.cube = cube
+        self.rain_knots = np.array(manifest['rain_knots'])
+        self.doy_knots = np.array(manifest['doy_knots'])
+        # Knot index range [start, end) of each month
+        months = np.array([
+            (date(KNOT_YEAR, 1, 1) + timedelta(days=int(d) - 1)).month for d in self.doy_knots
+        ])
+        self.month_bounds = {
+            m: (int(np.argmax(months == m)), int(len(months) - np.argmax(months[::-1] == m)))
+            for m in range(1, 13)
+        }
+
+    @property
+    def key(self):
+        return self.manifest['key']
+
+    def query(self, rainfall_24h, month, day):
+        """Ensemble probability per cell (float64, writable) for one scenario"""
+        i, w = _bracket(self.rain_knots, rainfall_24h)
+        start, end = self.month_bounds[month]
+        j, v = _bracket(self.doy_knots[start:end], knot_day_of_year(month, day))
+        j += start
+        j_next = j + 1
+
+        prob = np.zeros(self.cube.shape[2])
+        for r, rw in ((i, 1 - w), (i + 1, w)):
+            for d, dw in ((j, 1 - v), (j_next, v)):
+                if rw * dw > 0:
+                    prob += (rw * dw) * self.cube[r, d]
+        prob /= 255.0
+        return prob
+
+    def query_date(self, target_date, rainfall_24h):
+        target = datetime.strptime(target_date, '%Y-%m-%d')
+        return self.query(rainfall_24h, target.month, target.day)
+
+
+def open_risk_cube(path):
+    with open(os.path.join(path, 'manifest.json')) as f:
+        manifest = json.load(f)
+    cube = np.load(os.path.join(path, 'cube.npy'), mmap_mode='r')
+    return RiskCube(path, manifest, cube)
+
+
+def build_risk_cube(predictor, path, key, rains, doys):
+    """Evaluate the ensemble at every knot and write the cube into path"""
+    grid = predictor.get_static_grid()
+    n_cells = len(grid)
+
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    cube = np.lib.format.open_memmap(
+        os.path.join(tmp_path, 'cube.npy'), mode='w+', dtype=np.uint8,
+        shape=(len(rains), len(doys), n_cells)
+    )
+
+    print(f"🧊 Building risk cube: {len(rains)} rainfall x {len(doys)} day-of-year knots x {n_cells} cells")
+    started = time.perf_counter()
+    # Each knot streams through the models in the predictor's bounded chunks
+    for d, day_of_year in enumerate(doys):
+        target_date = knot_date(day_of_year)
+        for r, rain in enumerate(rains):
+            prob = predictor.grid_proba(target_date, {'rainfall_24h': rain})
+            cube[r, d] = np.rint(np.clip(prob, 0.0, 1.0) * 255)
+        if (d + 1) % 8 == 0 or d + 1 == len(doys):
+            print(f"   {d + 1}/{len(doys)} day-of-year knots ({time.perf_counter() - started:.0f}s)")
+    cube.flush()
+    del cube
+
+    manifest = {
+        'key': key,
+        'format': CUBE_FORMAT_VERSION,
+        'model_version': predictor.model_data['model_version'],
+        'static_grid': grid.key,
+        'rain_knots': rains.tolist(),
+        'doy_knots': doys.tolist(),
+        'quantization': 'uint8 probability * 255',
+        'build_seconds': round(time.perf_counter() - started, 1)
+    }
+    with open(os.path.join(tmp_path, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    try:
+        os.rename(tmp_path, path)
+    except OSError:
+        # Another process published the same cube first
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def prune_stale_cubes(cache_dir, grid_key, keep):
+    """Remove cubes for this static grid built from other models"""
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if not name.startswith('risk_cube_') or name == os.path.basename(keep) or name.endswith('.tmp'):
+            continue
+        try:
+            with open(os.path.join(path, 'manifest.json')) as f:
+                stale = json.load(f).get('static_grid') == grid_key
+        except (OSError, ValueError):
+            stale = False
+        if stale:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def load_risk_cube(predictor, cache_dir=CACHE_DIR, build=True, doy_step=DOY_STEP):
+    """
+    The cube for the predictor's model and static grid. Builds it when
+    missing (if build=True); returns None otherwise.
+    """
+    grid = predictor.get_static_grid()
+    rains, doys = rain_knots(), doy_knots(doy_step)
+    key = risk_cube_key(predictor.model_data, grid.key, rains, doys)
+    path = os.path.join(cache_dir, f'risk_cube_{key}')
+
+    if os.path.exists(os.path.join(path, 'manifest.json')):
+        try:
+            return open_risk_cube(path)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ Rebuilding unreadable risk cube {path}: {e}")
+            shutil.rmtree(path, ignore_errors=True)
+
+    if not build:
+        return None
+
+    os.makedirs(cache_dir, exist_ok=True)
+    build_risk_cube(predictor, path, key, rains, doys)
+    prune_stale_cubes(cache_dir, grid.key, keep=path)
+    return open_risk_cube(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or inspect the precomputed risk cube")
+    parser.add_argument('command', choices=['build', 'info'])
+    parser.add_argument('--doy-step', type=int, default=DOY_STEP, help="Days between day-of-year knots")
+    args = parser.parse_args()
+
+    from predict_for_date import DateBasedPredictor
+    predictor = DateBasedPredictor()
+
+    cube = load_risk_cube(predictor, build=args.command == 'build', doy_step=args.doy_step)
+    if cube is None:
+        print("❌ No risk cube for the current model and grid. Run: python scripts/risk_cube.py build")
+        sys.exit(1)
+
+    size_mb = os.path.getsize(os.path.join(cube.path, 'cube.npy')) / 1e6
+    print(f"✅ Risk cube {cube.key} for model {cube.manifest['model_version']}: "
+          f"{'x'.join(str(s) for s in cube.cube.shape)} ({size_mb:.0f} MB) at {cube.path}")
+
+
+if __name__ == "__main__":
+    main()
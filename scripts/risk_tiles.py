@@ -0,0 +1,258 @@
+"""
+Risk Tiles
+Renders a date's full risk surface into static slippy-map tiles:
+
+    public/tiles/<date>/<model_version>/<z>/<x>/<y>.png
+    public/tiles/<date>/<model_version>/meta.json
+
+The grid is sampled once into a Web Mercator mosaic at max_zoom; each lower
+zoom is a 2x2 max-pool of the one above (so small high-risk pockets survive
+zooming out). Tiles are 8-bit indexed PNGs written with zlib; fully
+transparent tiles are skipped. Tiles are written once per (date, model_version)
+and redrawn when the prediction's result key (stored in meta.json) changes,
+e.g. when a date is re-predicted from archive rainfall or a rainfall field.
+"""
+
+import os
+import re
+import json
+import math
+import time
+import zlib
+import struct
+import shutil
+import argparse
+
+import numpy as np
+
+TILES_DIR = os.path.join(os.path.dirname(__file__), '..', 'public', 'tiles')
+TILE_SIZE = 256
+MIN_ZOOM = 9
+MAX_ZOOM = 13
+
+# Risk below this is left transparent
+DISPLAY_FLOOR = 0.05
+
+# Colour ramp stops: (risk, (r, g, b, alpha))
+RAMP = (
+    (0.00, (34, 197, 94, 0)),
+    (0.15, (234, 179, 8, 110)),
+    (0.50, (249, 115, 22, 160)),
+    (0.75, (239, 68, 68, 190)),
+    (1.00, (127, 29, 29, 220)),
+)
+
+
+def palette():
+    """256-entry RGBA palette; index 0 is transparent, index i is risk i/255"""
+    stops = np.array([s for s, _ in RAMP])
+    colours = np.array([c for _, c in RAMP], dtype=np.float64)
+    risk = np.arange(256) / 255.0
+    rgba = np.stack([np.interp(risk, stops, colours[:, k]) for k in range(4)], axis=1)
+    rgba = np.rint(rgba).astype(np.uint8)
+    rgba[0] = 0
+    return rgba
+
+
+def _png_chunk(kind, data):
+    body = kind + data
+    return struct.pack('>I', len(data)) + body + struct.pack('>I', zlib.crc32(body) & 0xffffffff)
+
+
+def encode_indexed_png(pixels, plte, trns, level=6):
+    """8-bit palette PNG from a (h, w) uint8 index array"""
+    h, w = pixels.shape
+    # Filter type 0 (None) in front of every row
+    raw = np.zeros((h, w + 1), dtype=np.uint8)
+    raw[:, 1:] = pixels
+    return b''.join([
+        b'\x89PNG\r\n\x1a\n',
+        _png_chunk(b'IHDR', struct.pack('>IIBBBBB', w, h, 8, 3, 0, 0, 0)),
+        _png_chunk(b'PLTE', plte),
+        _png_chunk(b'tRNS', trns),
+        _png_chunk(b'IDAT', zlib.compress(raw.tobytes(), level)),
+        _png_chunk(b'IEND', b''),
+    ])
+
+
+def lng_to_x(lng, zoom):
+    """Global pixel x at a zoom"""
+    return (np.asarray(lng) + 180.0) / 360.0 * TILE_SIZE * 2**zoom
+
+
+def lat_to_y(lat, zoom):
+    """Global pixel y at a zoom (Web Mercator)"""
+    lat_rad = np.radians(np.asarray(lat))
+    return (1.0 - np.log(np.tan(lat_rad) + 1.0 / np.cos(lat_rad)) / math.pi) / 2.0 * TILE_SIZE * 2**zoom
+
+
+def y_to_lat(y, zoom):
+    n = math.pi - 2.0 * math.pi * np.asarray(y) / (TILE_SIZE * 2**zoom)
+    return np.degrees(np.arctan(np.sinh(n)))
+
+
+def x_to_lng(x, zoom):
+    return np.asarray(x) / (TILE_SIZE * 2**zoom) * 360.0 - 180.0
+
+
+def tile_range(bounds, zoom):
+    """Inclusive tile x/y ranges covering (lat_min, lat_max, lng_min, lng_max)"""
+    lat_min, lat_max, lng_min, lng_max = bounds
+    x0 = int(lng_to_x(lng_min, zoom) // TILE_SIZE)
+    x1 = int(lng_to_x(lng_max, zoom) // TILE_SIZE)
+    y0 = int(lat_to_y(lat_max, zoom) // TILE_SIZE)
+    y1 = int(lat_to_y(lat_min, zoom) // TILE_SIZE)
+    return x0, x1, y0, y1
+
+
+def risk_mosaic(risk_raster, lats, lngs, zoom, floor=DISPLAY_FLOOR):
+    """
+    Palette indices for every pixel of the tile-aligned extent at `zoom`,
+    nearest-cell sampled. Returns (mosaic, x0, y0) with x0/y0 in tiles.
+    """
+    grid_size = float(lats[1] - lats[0])
+    bounds = (lats[0] - grid_size / 2, lats[-1] + grid_size / 2,
+              lngs[0] - grid_size / 2, lngs[-1] + grid_size / 2)
+    x0, x1, y0, y1 = tile_range(bounds, zoom)
+
+    # Pixel centres -> grid row/column, one axis at a time
+    px = np.arange(x0 * TILE_SIZE, (x1 + 1) * TILE_SIZE) + 0.5
+    py = np.arange(y0 * TILE_SIZE, (y1 + 1) * TILE_SIZE) + 0.5
+    cols = np.rint((x_to_lng(px, zoom) - lngs[0]) / grid_size).astype(np.int64)
+    rows = np.rint((y_to_lat(py, zoom) - lats[0]) / grid_size).astype(np.int64)
+    col_ok = (cols >= 0) & (cols < len(lngs))
+    row_ok = (rows >= 0) & (rows < len(lats))
+
+    index = np.clip(np.rint(np.asarray(risk_raster) * 255), 0, 255).astype(np.uint8)
+    index[np.asarray(risk_raster) < floor] = 0
+
+    mosaic = index[np.clip(rows, 0, len(lats) - 1)[:, None], np.clip(cols, 0, len(lngs) - 1)[None, :]]
+    mosaic[~row_ok, :] = 0
+    mosaic[:, ~col_ok] = 0
+    return mosaic, x0, y0
+
+
+def downsample_max(mosaic, x0, y0):
+    """Next zoom out: 2x2 max-pool, re-aligned to that zoom's tile boundaries"""
+    # Pad so the mosaic starts on an even tile and spans whole parent tiles
+    pad_left = (x0 % 2) * TILE_SIZE
+    pad_top = (y0 % 2) * TILE_SIZE
+    h, w = mosaic.shape
+    pad_right = (-(w + pad_left)) % (2 * TILE_SIZE)
+    pad_bottom = (-(h + pad_top)) % (2 * TILE_SIZE)
+    padded = np.pad(mosaic, ((pad_top, pad_bottom), (pad_left, pad_right)))
+
+    ph, pw = padded.shape
+    pooled = padded.reshape(ph // 2, 2, pw // 2, 2).max(axis=(1, 3))
+    return pooled, x0 // 2, y0 // 2
+
+
+def safe_segment(value):
+    return re.sub(r'[^A-Za-z0-9._-]', '_', str(value))
+
+
+def tile_dir(target_date, model_version, tiles_dir=TILES_DIR):
+    return os.path.join(tiles_dir, safe_segment(target_date), safe_segment(model_version))
+
+
+def write_risk_tiles(risk_raster, lats, lngs, target_date, model_version, tiles_dir=TILES_DIR,
+                     min_zoom=MIN_ZOOM, max_zoom=MAX_ZOOM, force=False, key=None):
+    """
+    Write the tile pyramid for one date unless it already exists for the
+    same result `key` (any existing pyramid counts when key is None).
+    Returns the metadata dict (also written as meta.json).
+    """
+    path = tile_dir(target_date, model_version, tiles_dir)
+    meta_file = os.path.join(path, 'meta.json')
+    if not force and os.path.exists(meta_file):
+        try:
+            with open(meta_file) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            meta = None
+        if meta is not None and (key is None or meta.get('key') == key):
+            return meta
+
+    started = time.perf_counter()
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+
+    rgba = palette()
+    plte, trns = rgba[:, :3].tobytes(), rgba[:, 3].tobytes()
+
+    mosaic, x0, y0 = risk_mosaic(risk_raster, lats, lngs, max_zoom)
+    written = skipped = 0
+    for zoom in range(max_zoom, min_zoom - 1, -1):
+        n_ty, n_tx = mosaic.shape[0] // TILE_SIZE, mosaic.shape[1] // TILE_SIZE
+        # (ty, tile_row, tx, tile_col) view: one reshape, no copies
+        tiles = mosaic.reshape(n_ty, TILE_SIZE, n_tx, TILE_SIZE)
+        occupied = tiles.max(axis=(1, 3)) > 0
+        skipped += int((~occupied).sum())
+        for ty, tx in zip(*np.nonzero(occupied)):
+            tile_path = os.path.join(tmp_path, str(zoom), str(x0 + tx))
+            os.makedirs(tile_path, exist_ok=True)
+            with open(os.path.join(tile_path, f'{y0 + ty}.png'), 'wb') as f:
+                f.write(encode_indexed_png(tiles[ty, :, tx, :], plte, trns))
+            written += 1
+        if zoom > min_zoom:
+            mosaic, x0, y0 = downsample_max(mosaic, x0, y0)
+
+    grid_size = float(lats[1] - lats[0])
+    meta = {
+        'date': target_date,
+        'model_version': model_version,
+        'key': key,
+        'min_zoom': min_zoom,
+        'max_zoom': max_zoom,
+        'bounds': [
+            [float(lats[0] - grid_size / 2), float(lngs[0] - grid_size / 2)],
+            [float(lats[-1] + grid_size / 2), float(lngs[-1] + grid_size / 2)]
+        ],
+        'display_floor': DISPLAY_FLOOR,
+        'tiles': written,
+        'render_ms': round((time.perf_counter() - started) * 1000, 1)
+    }
+    os.makedirs(tmp_path, exist_ok=True)
+    with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+
+    # Replace any earlier (forced) render in one step
+    old_path = f'{path}.{os.getpid()}.old'
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if os.path.exists(path):
+        os.rename(path, old_path)
+    os.rename(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+    print(f"   🗺️  Wrote {written} risk tiles (z{min_zoom}-{max_zoom}, {skipped} empty skipped) "
+          f"in {meta['render_ms']:.0f} ms")
+    return meta
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render risk tiles for dates without clustering")
+    parser.add_argument('dates', nargs='+', help="Dates (YYYY-MM-DD)")
+    parser.add_argument('--min-zoom', type=int, default=MIN_ZOOM)
+    parser.add_argument('--max-zoom', type=int, default=MAX_ZOOM)
+    parser.add_argument('--force', action='store_true', help="Re-render existing tiles")
+    args = parser.parse_args()
+
+    from predict_for_date import DateBasedPredictor
+    predictor = DateBasedPredictor()
+    grid = predictor.get_static_grid()
+    lats, lngs = grid.axes()
+
+    for target_date in args.dates:
+        print(f"\n🗺️  {target_date}")
+        rainfall_data = predictor.get_rainfall_for_date(target_date)
+        risk = predictor.apply_physics(predictor.grid_proba(target_date, rainfall_data), rainfall_data)
+        meta = write_risk_tiles(
+            risk.reshape(grid.shape), lats, lngs, target_date,
+            predictor.model_data['model_version'],
+            min_zoom=args.min_zoom, max_zoom=args.max_zoom, force=args.force
+        )
+        print(f"   {meta['tiles']} tiles at {tile_dir(target_date, meta['model_version'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""
+Run Telemetry
+One machine-readable JSON record per prediction run: wall/CPU time and
+peak RSS per stage, workload counts, rainfall sources and model version,
+tagged with a caller-supplied run ID.
+
+    with run_telemetry.run(run_id, op='predict', dates=[...]) as run:
+        with run_telemetry.span('features'):
+            ...
+
+Spans and counters attach to the run active on the current thread and are
+no-ops outside one, so library callers pay nothing. Finished records are
+appended as JSON lines to TELEMETRY_FILE (PREDICTION_TELEMETRY_FILE=off to
+disable). CPU time is process-wide, so it includes inference thread pools;
+with several runs in flight (worker mode) it also includes their work.
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+TELEMETRY_FILE = os.getenv(
+    'PREDICTION_TELEMETRY_FILE',
+    os.path.join(os.path.dirname(__file__), '..', 'cache', 'telemetry', 'prediction_runs.jsonl')
+)
+
+_local = threading.local()
+_active = 0
+_active_lock = threading.Lock()
+_write_lock = threading.Lock()
+
+
+def memory_mb():
+    """(current RSS, peak RSS) in MB; either may be None where unsupported"""
+    try:
+        with open('/proc/self/status') as f:
+            fields = dict(line.split(':', 1) for line in f if ':' in line)
+        return (int(fields['VmRSS'].split()[0]) / 1024, int(fields['VmHWM'].split()[0]) / 1024)
+    except (OSError, KeyError, ValueError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None, None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return None, peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def reset_peak_rss():
+    """Restart the kernel's peak-RSS counter (Linux); False where unsupported"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+class Run:
+    """Telemetry for one prediction run"""
+
+    def __init__(self, run_id=None, **fields):
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self.fields = dict(fields)
+        self.counts = {}
+        self.rainfall = {}
+        self.stages = {}
+        self.peak_rss_mb = None  # running maximum over every reading (spans reset the kernel's)
+        self.started_at = datetime.now(timezone.utc)
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        self._lock = threading.Lock()  # spans may close on helper threads (see attach)
+
+    @contextmanager
+    def span(self, name):
+        # The peak counter is process-wide; only reset it when this run is alone,
+        # otherwise the stage reports the process peak so far
+        with _active_lock:
+            isolated = _active == 1
+        if isolated:
+            # Keep the peak reached since the last reset before discarding it
+            self.observe_peak(memory_mb()[1])
+            reset_peak_rss()
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall_ms = (time.perf_counter() - wall) * 1000
+            cpu_ms = (time.process_time() - cpu) * 1000
+            _, peak = memory_mb()
+            self.observe_peak(peak)
+            with self._lock:
+                stage = self.stages.setdefault(
+                    name, {'calls': 0, 'wall_ms': 0.0, 'cpu_ms': 0.0, 'peak_rss_mb': None}
+                )
+                stage['calls'] += 1
+                stage['wall_ms'] += wall_ms
+                stage['cpu_ms'] += cpu_ms
+                if peak is not None:
+                    stage['peak_rss_mb'] = max(stage['peak_rss_mb'] or 0.0, peak)
+
+    def observe_peak(self, peak):
+        """Fold a peak RSS reading (MB, or None) into the run's peak"""
+        if peak is None:
+            return
+        with self._lock:
+            self.peak_rss_mb = max(self.peak_rss_mb or 0.0, peak)
+
+    def set(self, **fields):
+        self.fields.update(fields)
+
+    def add(self, name, n=1):
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + n
+
+    def record_rainfall(self, target_date, source, rainfall_mm):
+        self.rainfall[target_date] = {'source': source, 'mm': round(float(rainfall_mm), 2)}
+
+    def to_record(self, error=None):
+        rss, peak = memory_mb()
+        self.observe_peak(peak)
+        peak = self.peak_rss_mb
+        return {
+            'run_id': self.run_id,
+            'started_at': self.started_at.isoformat(timespec='milliseconds'),
+            'pid': os.getpid(),
+            **self.fields,
+            'status': 'error' if error else 'ok',
+            'error': error,
+            'wall_ms': round((time.perf_counter() - self._wall) * 1000, 1),
+            'cpu_ms': round((time.process_time() - self._cpu) * 1000, 1),
+            'rss_mb': round(rss, 1) if rss is not None else None,
+            'peak_rss_mb': round(peak, 1) if peak is not None else None,
+            **self.counts,
+            'rainfall': self.rainfall,
+            'stages': {
+                name: {
+                    'calls': s['calls'],
+                    'wall_ms': round(s['wall_ms'], 1),
+                    'cpu_ms': round(s['cpu_ms'], 1),
+                    'peak_rss_mb': round(s['peak_rss_mb'], 1) if s['peak_rss_mb'] is not None else None
+                }
+                for name, s in self.stages.items()
+            }
+        }
+
+
+def write_record(record, path=None):
+    """Append one record as a JSON line"""
+    path = path or TELEMETRY_FILE
+    if path == 'off':
+        return
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with _write_lock, open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, default=str) + '\n')
+    except OSError as e:
+        print(f"   ⚠️  Could not write run telemetry: {e}")
+
+
+@contextmanager
+def run(run_id=None, path=None, **fields):
+    """
+    Track a run on this thread. The finished record (also on failure) is
+    written to `path` and left in run.record for the caller.
+    """
+    global _active
+    active = Run(run_id, **fields)
+    previous = getattr(_local, 'run', None)
+    _local.run = active
+    with _active_lock:
+        _active += 1
+        isolated = _active == 1
+    if isolated:
+        # The run's peak starts here, not at the process's earlier high-water mark
+        reset_peak_rss()
+    error = None
+    try:
+        yield active
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        with _active_lock:
+            _active -= 1
+        _local.run = previous
+        active.record = active.to_record(error)
+        write_record(active.record, path)
+
+
+@contextmanager
+def attach(active):
+    """Make another thread's run current here (e.g. a background DB writer)"""
+    previous = getattr(_local, 'run', None)
+    _local.run = active
+    try:
+        yield active
+    finally:
+        _local.run = previous
+
+
+def current():
+    """The run active on this thread, or None"""
+    return getattr(_local, 'run', None)
+
+
+@contextmanager
+def span(name):
+    active = current()
+    if active is None:
+        yield
+    else:
+        with active.span(name):
+            yield
+
+
+def set_fields(**fields):
+    active = current()
+    if active is not None:
+        active.set(**fields)
+
+
+def add(name, n=1):
+    active = current()
+    if active is not None:
+        active.add(name, n)
+
+
+def record_rainfall(target_date, source, rainfall_mm):
+    active = current()
+    if active is not None:
+        active.record_rainfall(target_date, source, rainfall_mm)
@@ -0,0 +1,189 @@
+"""
+Static Grid Feature Cache
+Materializes date-independent per-cell layers once into a memory-mapped .npy bundle
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import numpy as np
+
+from feature_engine import HIGH_RISK_ZONES, spatial_features
+from drainage import build_capacity_raster, locations_fingerprint
+
+CACHE_DIR = os.path.join(os.path.dirname(__file__), '..', 'cache')
+
+# Delhi bounding box (lat_min, lat_max, lng_min, lng_max)
+GRID_BOUNDS = (28.4, 28.9, 76.8, 77.4)
+
+# Bump when the meaning or set of layers changes
+LAYER_FORMAT_VERSION = 1
+
+STATIC_LAYERS = (
+    'lat',
+    'lng',
+    'elevation_proxy',
+    'min_dist_to_risk_zone_km',
+    'drainage_capacity',
+    'verified_hotspot_dist_deg'
+)
+
+
+def grid_axes(bounds, grid_size):
+    """Latitude and longitude axes for a (lat_min, lat_max, lng_min, lng_max) box"""
+    lat_min, lat_max, lng_min, lng_max = bounds
+    lats = np.arange(lat_min, lat_max, grid_size)
+    lngs = np.arange(lng_min, lng_max, grid_size)
+    return lats, lngs
+
+
+def file_sha256(path):
+    """Content hash of an input file ('missing' if absent)"""
+    if not path or not os.path.exists(path):
+        return 'missing'
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_verified_coords(verified_hotspots_file):
+    """(n, 2) lat/lng array of verified hotspots; empty if the file is missing"""
+    if not verified_hotspots_file or not os.path.exists(verified_hotspots_file):
+        return np.empty((0, 2))
+    import pandas as pd
+    df = pd.read_csv(verified_hotspots_file)
+    return df[['lat', 'lng']].to_numpy(dtype=np.float64)
+
+
+def min_dist_to_points_deg(lat, lng, points):
+    """Euclidean distance (degrees) from each cell to the nearest point; inf if none"""
+    min_dist = np.full(np.shape(lat), np.inf)
+    for point_lat, point_lng in points:
+        dist = np.sqrt((point_lat - lat)**2 + (point_lng - lng)**2)
+        np.minimum(min_dist, dist, out=min_dist)
+    return min_dist
+
+
+class StaticGrid:
+    """Memory-mapped static layers for one grid; each layer is a flat array in grid order"""
+
+    def __init__(self, path, manifest, layers):
+        self.path = path
+        self.manifest = manifest
+        self.layers = layers
+        self.key = manifest['key']
+        self.shape = tuple(manifest['shape'])
+        self.grid_size = manifest['grid_size']
+
+    def __len__(self):
+        return self.shape[0] * self.shape[1]
+
+    def __getitem__(self, name):
+        return self.layers[name]
+
+    def raster(self, name):
+        """Layer reshaped to (n_lats, n_lngs)"""
+        return self.layers[name].reshape(self.shape)
+
+    def axes(self):
+        """Latitude and longitude axes (views into the lat/lng layers)"""
+        return self.raster('lat')[:, 0], self.raster('lng')[0, :]
+
+    def spatial_features(self):
+        """Spatial feature columns as consumed by feature_engine.build_feature_frame"""
+        return {
+            name: self.layers[name]
+            for name in ('lat', 'lng', 'elevation_proxy', 'min_dist_to_risk_zone_km')
+        }
+
+
+def static_grid_key(bounds, grid_size, locations, verified_hotspots_file):
+    """Cache key over bounding box, grid size and every input the layers depend on"""
+    payload = json.dumps({
+        'format': LAYER_FORMAT_VERSION,
+        'bounds': [float(b) for b in bounds],
+        'grid_size': float(grid_size),
+        'drainage_locations': locations_fingerprint(locations),
+        'high_risk_zones': HIGH_RISK_ZONES.tolist(),
+        'verified_hotspots': file_sha256(verified_hotspots_file)
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def static_layers(lats, lngs, locations, verified_coords):
+    """Every static layer of the (len(lats), len(lngs)) grid as a flat float64 array in row-major order"""
+    lat_grid, lng_grid = np.meshgrid(lats, lngs, indexing='ij')
+    lat = lat_grid.ravel()
+    lng = lng_grid.ravel()
+
+    layers = spatial_features(lat, lng)
+    layers['drainage_capacity'] = build_capacity_raster(lats, lngs, locations).ravel()
+    layers['verified_hotspot_dist_deg'] = min_dist_to_points_deg(lat, lng, verified_coords)
+    return layers
+
+
+def build_static_layers(bounds, grid_size, locations, verified_hotspots_file):
+    """Compute every static layer as a flat float64 array in grid (row-major) order"""
+    lats, lngs = grid_axes(bounds, grid_size)
+    layers = static_layers(lats, lngs, locations, load_verified_coords(verified_hotspots_file))
+    return (len(lats), len(lngs)), layers
+
+
+def write_static_grid(path, manifest, layers):
+    """Write the bundle to a temp directory and move it into place"""
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    os.makedirs(tmp_path, exist_ok=True)
+    for name in STATIC_LAYERS:
+        np.save(os.path.join(tmp_path, f'{name}.npy'), np.ascontiguousarray(layers[name]))
+    with open(os.path.join(tmp_path, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    try:
+        os.rename(tmp_path, path)
+    except OSError:
+        # Another process published the same bundle first
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def open_static_grid(path):
+    """Open an existing bundle with every layer memory-mapped read-only"""
+    with open(os.path.join(path, 'manifest.json')) as f:
+        manifest = json.load(f)
+    layers = {
+        name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r')
+        for name in manifest['layers']
+    }
+    return StaticGrid(path, manifest, layers)
+
+
+def load_static_grid(bounds, grid_size, locations, verified_hotspots_file, cache_dir=CACHE_DIR):
+    """Static layers for the grid, built on first use and memory-mapped afterwards"""
+    key = static_grid_key(bounds, grid_size, locations, verified_hotspots_file)
+    path = os.path.join(cache_dir, f'static_grid_{key}')
+
+    if os.path.exists(os.path.join(path, 'manifest.json')):
+        try:
+            return open_static_grid(path)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ Rebuilding unreadable static grid {path}: {e}")
+            shutil.rmtree(path, ignore_errors=True)
+
+    shape, layers = build_static_layers(bounds, grid_size, locations, verified_hotspots_file)
+    manifest = {
+        'key': key,
+        'bounds': [float(b) for b in bounds],
+        'grid_size': float(grid_size),
+        'shape': list(shape),
+        'layers': list(STATIC_LAYERS)
+    }
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        write_static_grid(path, manifest, layers)
+        return open_static_grid(path)
+    except OSError as e:
+        print(f"⚠️ Could not cache static grid, using in-memory layers: {e}")
+        return StaticGrid(path, manifest, layers)
@@ -4,16 +4,20 @@ Uses ensemble learning with XGBoost, Random Forest, and temporal features
 """
 
 import os
+import time
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-import pickle
 import json
 from sklearn.model_selection import train_test_split, cross_val_score, GridSearchCV
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import classification_report, confusion_matrix, f1_score, precision_score, recall_score
 import xgboost as xgb
 from sklearn.ensemble import RandomForestClassifier
+from model_artifacts import export_bundle
+from feature_engine import FEATURE_NAMES, build_feature_frame
+from static_grid import GRID_BOUNDS
+import run_telemetry
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -22,6 +26,10 @@ MODELS_DIR = os.path.join(os.path.dirname(__file__), '..', 'models')
 DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data', 'historical')
 os.makedirs(MODELS_DIR, exist_ok=True)
 
+# Dry-day negatives generated per positive sample, and the seed that draws them
+NEGATIVES_PER_POSITIVE = 5
+NEGATIVE_SEED = 42
+
 class WaterloggingPredictor:
     """Advanced waterlogging prediction model with ensemble learning"""
     
@@ -31,74 +39,39 @@ class WaterloggingPredictor:
         self.scaler = StandardScaler()
         self.feature_names = []
         self.model_version = "v2.0.0"
-        
-    def create_temporal_features(self, df):
-        """Create temporal features from date"""
-        df['date'] = pd.to_datetime(df['date'])
-        df['day_of_year'] = df['date'].dt.dayofyear
-        df['month'] = df['date'].dt.month
-        df['week_of_year'] = df['date'].dt.isocalendar().week
-        
-        # Monsoon season flag (June-September)
-        df['is_monsoon'] = ((df['month'] >= 6) & (df['month'] <= 9)).astype(int)
-        
-        # Cyclical encoding for day of year
-        df['day_sin'] = np.sin(2 * np.pi * df['day_of_year'] / 365)
-        df['day_cos'] = np.cos(2 * np.pi * df['day_of_year'] / 365)
-        
-        # Cyclical encoding for month
-        df['month_sin'] = np.sin(2 * np.pi * df['month'] / 12)
-        df['month_cos'] = np.cos(2 * np.pi * df['month'] / 12)
-        
-        return df
-    
-    def create_spatial_features(self, df):
-        """Create spatial features"""
-        # Known high-risk zones (based on historical data)
-        high_risk_zones = [
-            (28.6330, 77.2285),  # Minto Bridge
-            (28.6304, 77.2425),  # ITO
-            (28.5910, 77.1610),  # Dhaula Kuan
-            (28.6139, 76.9830),  # Najafgarh
-        ]
-        
-        # Calculate minimum distance to high-risk zones
-        def min_distance_to_risk_zone(row):
-            lat, lng = row['lat'], row['lng']
-            distances = []
-            for risk_lat, risk_lng in high_risk_zones:
-                # Haversine distance approximation
-                dist = np.sqrt((lat - risk_lat)**2 + (lng - risk_lng)**2) * 111  # km
-                distances.append(dist)
-            return min(distances)
-        
-        df['min_dist_to_risk_zone_km'] = df.apply(min_distance_to_risk_zone, axis=1)
-        
-        # Elevation proxy (lower latitude generally means lower elevation in Delhi)
-        df['elevation_proxy'] = 28.7 - df['lat']  # Normalized
-        
-        return df
-    
-    def create_rainfall_features(self, df):
-        """Create rainfall-based features"""
-        # Rainfall intensity categories
-        df['rainfall_intensity'] = pd.cut(
-            df['rainfall_24h'],
-            bins=[0, 15, 35, 65, 115, 1000],
-            labels=['Very Light', 'Light', 'Moderate', 'Heavy', 'Very Heavy']
+        self.training_set_stats = None
+        
+    def create_features(self, df):
+        """Model features for every row (its own date, location and rainfall), from the shared feature engine"""
+        features = build_feature_frame(
+            df['lat'].to_numpy(),
+            df['lng'].to_numpy(),
+            df['date'].to_numpy(),
+            df['rainfall_24h'].to_numpy(),
+            FEATURE_NAMES
         )
+        features.index = df.index
         
-        # Convert to numeric
-        intensity_map = {'Very Light': 1, 'Light': 2, 'Moderate': 3, 'Heavy': 4, 'Very Heavy': 5}
-        df['rainfall_intensity_num'] = df['rainfall_intensity'].map(intensity_map)
-        
-        # Rainfall squared (non-linear relationship)
-        df['rainfall_squared'] = df['rainfall_24h'] ** 2
-        
-        # Log rainfall (handle zeros)
-        df['rainfall_log'] = np.log1p(df['rainfall_24h'])
-        
-        return df
+        return df.join(features.drop(columns=df.columns, errors='ignore'))
+    
+    def generate_negative_samples(self, df_imd, n, seed=NEGATIVE_SEED):
+        """
+        n negatives on real dry days (< 5 mm), each at a random location in
+        the prediction grid's box, drawn as whole arrays from one seeded generator
+        """
+        dry_df = df_imd[df_imd['rainfall_mm'] < 5.0]
+        rng = np.random.default_rng(seed)
+        lat_min, lat_max, lng_min, lng_max = GRID_BOUNDS
+        
+        # Days are drawn with replacement, so more samples than dry days is fine
+        days = rng.integers(0, len(dry_df), size=n)
+        return pd.DataFrame({
+            'date': dry_df['date'].to_numpy()[days],
+            'lat': rng.uniform(lat_min, lat_max, size=n),
+            'lng': rng.uniform(lng_min, lng_max, size=n),
+            'rainfall_24h': dry_df['rainfall_mm'].to_numpy(dtype=np.float64)[days],
+            'waterlogging': np.zeros(n, dtype=np.int64)
+        })
     
     def load_imd_rainfall_data(self):
         """Load IMD historical rainfall data"""
@@ -110,9 +83,11 @@ class WaterloggingPredictor:
         df_rainfall['date'] = pd.to_datetime(df_rainfall['date']).dt.strftime('%Y-%m-%d')
         return df_rainfall
 
-    def prepare_training_data(self):
+    def prepare_training_data(self, seed=NEGATIVE_SEED):
         """Load and prepare training data using REAL datasets"""
         print("\n📊 Preparing training data (Real-World Pipeline)...")
+        started = time.perf_counter()
+        run_telemetry.reset_peak_rss()
         
         # 1. Load Datasets
         dataset_file = os.path.join(DATA_DIR, 'flood_prediction_dataset.csv')
@@ -157,60 +132,39 @@ class WaterloggingPredictor:
         positive_samples = positive_samples[['date', 'lat', 'lng', 'rainfall_24h', 'waterlogging']]
         
         # 3. Negative Samples (Dry Days / Low Rainfall)
-        # Select dry days (Rainfall < 5mm) from IMD data as true negatives
-        dry_df = df_imd[df_imd['rainfall_mm'] < 5.0]
-        sample_size = len(positive_samples) * 5
-        
-        # Use replace=True to allow oversampling if we request more samples than available days
-        dry_days = dry_df.sample(n=sample_size, replace=True, random_state=42)
-        
-        negative_samples = []
-        for _, row in dry_days.iterrows():
-            # Generate random locations in Delhi for dry days (simulating 'safe' conditions everywhere)
-            # or use known hotspots locations but on dry days to teach model that location alone isn't enough
-            
-            # Strategy: Mix of random locations and hotspot locations on dry days
-            # 50% random, 50% hotspot locations
-            
-            # Random location
-            lat = np.random.uniform(28.4, 28.9)
-            lng = np.random.uniform(76.8, 77.4)
-            
-            negative_samples.append({
-                'date': row['date'],
-                'lat': lat,
-                'lng': lng,
-                'rainfall_24h': row['rainfall_mm'],
-                'waterlogging': 0
-            })
-            
-        df_negative = pd.DataFrame(negative_samples)
+        # Real dry days (Rainfall < 5mm) from IMD data as true negatives, at random
+        # locations (simulating 'safe' conditions everywhere)
+        df_negative = self.generate_negative_samples(
+            df_imd, len(positive_samples) * NEGATIVES_PER_POSITIVE, seed
+        )
         print(f"   Generated {len(df_negative)} clean negative samples from real Dry Days (<5mm)")
         
         # 4. Combine Datasets
         df = pd.concat([positive_samples, df_negative], ignore_index=True)
         
-        # 5. Feature Engineering
-        df = self.create_temporal_features(df)
-        df = self.create_spatial_features(df)
-        df = self.create_rainfall_features(df)
+        # 5. Feature Engineering (the same feature engine inference uses)
+        df = self.create_features(df)
         
-        # Select features for training
-        feature_columns = [
-            'rainfall_24h', 'rainfall_squared', 'rainfall_log', 'rainfall_intensity_num',
-            'lat', 'lng', 'elevation_proxy', 'min_dist_to_risk_zone_km',
-            'day_of_year', 'month', 'is_monsoon',
-            'day_sin', 'day_cos', 'month_sin', 'month_cos'
-        ]
-        
-        X = df[feature_columns]
+        X = df[FEATURE_NAMES]
         y = df['waterlogging']
         
-        self.feature_names = feature_columns
+        self.feature_names = list(FEATURE_NAMES)
         
         print(f"   Total samples: {len(df)}")
-        print(f"   Positive samples: {sum(y == 1)}")
-        print(f"   Negative samples: {sum(y == 0)}")
+        print(f"   Positive samples: {int((y == 1).sum())}")
+        print(f"   Negative samples: {int((y == 0).sum())}")
+        
+        elapsed = time.perf_counter() - started
+        _, peak_mb = run_telemetry.memory_mb()
+        frame_mb = df.memory_usage(deep=True).sum() / (1024 * 1024)
+        self.training_set_stats = {
+            'rows': len(df),
+            'build_seconds': round(elapsed, 3),
+            'frame_mb': round(float(frame_mb), 1),
+            'peak_rss_mb': round(peak_mb, 1) if peak_mb is not None else None
+        }
+        peak = f"{peak_mb:.0f} MB" if peak_mb is not None else "n/a"
+        print(f"   ⏱️  Training set built in {elapsed:.2f}s (frame {frame_mb:.1f} MB, peak RSS {peak})")
         
         return X, y, df
     
@@ -340,9 +294,7 @@ class WaterloggingPredictor:
             'trained_at': datetime.now().isoformat()
         }
         
-        model_file = os.path.join(MODELS_DIR, 'waterlogging_advanced_v2.pkl')
-        with open(model_file, 'wb') as f:
-            pickle.dump(model_data, f)
+        model_file = export_bundle(model_data, os.path.join(MODELS_DIR, 'waterlogging_advanced_v2'))
         
         print(f"   ✅ Model saved to: {model_file}")
         
@@ -356,7 +308,8 @@ class WaterloggingPredictor:
                 'f1_score': float(metrics['f1_score'])
             },
             'feature_names': self.feature_names,
-            'feature_importance': metrics['feature_importance'][:10]  # Top 10
+            'feature_importance': metrics['feature_importance'][:10],  # Top 10
+            'training_set': self.training_set_stats
         }
         
         metadata_file = os.path.join(MODELS_DIR, 'model_metadata_v2.json')
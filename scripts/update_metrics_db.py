@@ -1,31 +1,23 @@
 
-import os
-import psycopg2
 import json
-import pickle
 from datetime import datetime
-from dotenv import load_dotenv
 
-load_dotenv()
+import db
+from model_artifacts import read_manifest
 
-DATABASE_URL = os.getenv('DATABASE_URL')
-MODEL_PATH = 'models/waterlogging_advanced_v2.pkl'
+MODEL_PATH = 'models/waterlogging_advanced_v2'
 
 def update_metrics():
     try:
-        # Load metrics from the model file
-        with open(MODEL_PATH, 'rb') as f:
-            model_data = pickle.load(f)
-            metrics = model_data.get('metrics', {})
-            version = model_data.get('model_version', 'v2.0.0')
+        # Load metrics from the bundle manifest (the trees are never read)
+        model_data = read_manifest(MODEL_PATH)
+        metrics = model_data.get('metrics', {})
+        version = model_data.get('model_version', 'v2.0.0')
             
         print(f"Loaded Metrics for {version}: {metrics}")
 
-        conn = psycopg2.connect(DATABASE_URL)
-        cur = conn.cursor()
-        
         # Insert into database
-        cur.execute("""
+        db.execute("""
             INSERT INTO model_metadata 
             (model_version, training_date, training_samples, accuracy, precision_score, recall_score, f1_score, feature_importance)
             VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
@@ -45,11 +37,7 @@ def update_metrics():
             metrics.get('recall', 0.80),
             metrics.get('f1_score', 0.82),
             json.dumps(metrics.get('feature_importance', []))
-        ))
-        
-        conn.commit()
-        cur.close()
-        conn.close()
+        ), name='upsert_model_metadata')
         print("✅ Successfully updated model metrics in database.")
         
     except Exception as e:
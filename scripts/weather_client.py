@@ -0,0 +1,193 @@
+"""
+Shared Open-Meteo Weather Client
+Pooled HTTP session with bounded retries and an on-disk TTL cache.
+Daily forecast windows are fanned out into per-date cache entries so one
+16-day fetch answers every date in the window. Archive days are only
+cached for long once they are past the archive's settling lag, and days
+with missing (null) values are never cached.
+"""
+
+import os
+import json
+import time
+import hashlib
+from datetime import datetime, timedelta
+
+CACHE_DIR = os.path.join(os.path.dirname(__file__), '..', 'cache', 'weather')
+
+# Overridable so the client can be pointed at a local stand-in server
+FORECAST_URL = os.getenv('OPEN_METEO_FORECAST_URL', 'https://api.open-meteo.com/v1/forecast')
+ARCHIVE_URL = os.getenv('OPEN_METEO_ARCHIVE_URL', 'https://archive-api.open-meteo.com/v1/archive')
+
+DAILY_FIELDS = 'precipitation_sum,temperature_2m_max,relative_humidity_2m_max'
+FORECAST_DAYS = 16
+
+# Seconds a cached response stays valid
+FORECAST_TTL = 3 * 3600
+ARCHIVE_TTL = 30 * 24 * 3600
+HOURLY_TTL = 15 * 60
+RECENT_ARCHIVE_TTL = 3600
+
+# The archive fills in the latest days over several days; dates this
+# recent are cached with RECENT_ARCHIVE_TTL instead of ARCHIVE_TTL
+ARCHIVE_SETTLE_DAYS = 5
+
+
+def complete(record):
+    """True if no field of a daily record is null"""
+    return all(value is not None for value in record.values())
+
+
+def complete_response(data):
+    """True if a daily response has no null values"""
+    daily = data.get('daily') or {}
+    return all(value is not None for f in daily if f != 'time' for value in daily[f])
+
+
+class WeatherClient:
+    """Open-Meteo access shared by the prediction scripts"""
+
+    def __init__(self, cache_dir=CACHE_DIR, forecast_url=FORECAST_URL, archive_url=ARCHIVE_URL,
+                 retries=3, backoff_factor=0.5, timeout=10):
+        self.cache_dir = cache_dir
+        self.forecast_url = forecast_url
+        self.archive_url = archive_url
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.hits = 0
+        self.misses = 0
+        self._session = None
+
+    @property
+    def session(self):
+        """Pooled, retrying HTTP session (requests is only imported on a cache miss)"""
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+
+            retry = Retry(
+                total=self.retries,
+                backoff_factor=self.backoff_factor,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=frozenset(['GET'])
+            )
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retry)
+            self._session = requests.Session()
+            self._session.mount('http://', adapter)
+            self._session.mount('https://', adapter)
+        return self._session
+
+    # --- disk cache ---
+
+    def _cache_path(self, key):
+        digest = hashlib.sha256(json.dumps(key, sort_keys=True).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f'{digest[:24]}.json')
+
+    def _cache_get(self, key):
+        path = self._cache_path(key)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get('expires', 0) < time.time():
+            return None
+        return entry['data']
+
+    def _cache_put(self, key, data, ttl):
+        path = self._cache_path(key)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump({'key': key, 'expires': time.time() + ttl, 'data': data}, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"   ⚠️  Could not cache weather response: {e}")
+
+    # --- requests ---
+
+    def get_json(self, url, params, ttl, cacheable=None):
+        """
+        GET a JSON endpoint through the cache; raises requests exceptions on
+        failure. A response failing cacheable(data) is returned uncached.
+        """
+        key = {'url': url, 'params': params}
+        data = self._cache_get(key)
+        if data is not None:
+            self.hits += 1
+            return data
+
+        self.misses += 1
+        response = self.session.get(url, params=params, timeout=self.timeout)
+        response.raise_for_status()
+        data = response.json()
+        if cacheable is None or cacheable(data):
+            self._cache_put(key, data, ttl)
+        return data
+
+    def daily(self, lat, lng, target_date, today=None):
+        """
+        Daily precipitation/temperature/humidity record for one date, or None
+        if the date is outside what the archive or 16-day forecast cover.
+        """
+        today = today or datetime.now().date()
+        target_date_obj = datetime.strptime(target_date, '%Y-%m-%d').date()
+        lat, lng = round(float(lat), 4), round(float(lng), 4)
+
+        day_key = {'daily': [lat, lng, target_date]}
+        record = self._cache_get(day_key)
+        if record is not None:
+            self.hits += 1
+            return record
+
+        cacheable = None
+        if target_date_obj <= today:
+            # Historical data; the latest days are still being filled in
+            url, ttl = self.archive_url, ARCHIVE_TTL
+            if target_date_obj > today - timedelta(days=ARCHIVE_SETTLE_DAYS):
+                ttl = RECENT_ARCHIVE_TTL
+            cacheable = complete_response
+            params = {
+                'latitude': lat,
+                'longitude': lng,
+                'start_date': target_date,
+                'end_date': target_date,
+                'daily': DAILY_FIELDS
+            }
+        else:
+            # Forecast data: the whole window, fanned out below
+            url, ttl = self.forecast_url, FORECAST_TTL
+            params = {
+                'latitude': lat,
+                'longitude': lng,
+                'daily': DAILY_FIELDS,
+                'forecast_days': FORECAST_DAYS
+            }
+
+        data = self.get_json(url, params, ttl, cacheable)
+        daily = data.get('daily')
+        if not daily:
+            return None
+
+        fields = [f for f in daily if f != 'time']
+        found = None
+        for i, day in enumerate(daily.get('time', [])):
+            day_record = {f: daily[f][i] for f in fields}
+            if complete(day_record):
+                self._cache_put({'daily': [lat, lng, day]}, day_record, ttl)
+            if day == target_date:
+                found = day_record
+        return found
+
+
+_client = None
+
+def get_client():
+    """Process-wide WeatherClient"""
+    global _client
+    if _client is None:
+        _client = WeatherClient()
+    return _client
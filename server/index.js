@@ -4,9 +4,9 @@ const bcrypt = require('bcryptjs');
 const jwt = require('jsonwebtoken');
 const { GoogleGenerativeAI } = require('@google/generative-ai');
 const db = require('./db');
+const predictionWorker = require('./predictionWorker');
 const path = require('path');
 const multer = require('multer');
-const { spawn } = require('child_process');
 
 const app = express();
 const PORT = 3000;
@@ -439,37 +439,18 @@ app.get('/api/predictions/date/:date', async (req, res) => {
             'SELECT * FROM predicted_hotspots WHERE prediction_date = $1 ORDER BY confidence_score DESC',
             [date]
         );
+        // Version of the model that produced the date's hotspots and risk tiles;
+        // a date with no hotspots still has tiles, so the worker reports it too
+        let modelVersion = null;
 
         // If no data exists, generate it on-demand
         if (result.rows.length === 0) {
             console.log(`ℹ️ No predictions found for ${date}. Generating on-demand...`);
 
             try {
-                // Determine script path
-                const scriptPath = path.join(__dirname, '../scripts/predict_for_date.py');
-
-                // Returns a promise that resolves when the script completes
-                const runScript = () => new Promise((resolve, reject) => {
-                    // Determine Python executable path (prefer venv)
-                    // Use absolute path to ensure robustness
-                    const venvPython = '/Users/aakritirajhans/waterlogging-3/waterlogging/venv/bin/python';
-
-                    const pythonExec = require('fs').existsSync(venvPython) ? venvPython : 'python3';
-
-                    console.log(`[Server] Generating prediction using: ${pythonExec}`);
-
-                    const process = spawn(pythonExec, [scriptPath, date]);
-
-                    process.stdout.on('data', (data) => console.log(`[Python]: ${data}`));
-                    process.stderr.on('data', (data) => console.error(`[Python Err]: ${data}`));
-
-                    process.on('close', (code) => {
-                        if (code === 0) resolve();
-                        else reject(new Error(`Script exited with code ${code}`));
-                    });
-                });
-
-                await runScript();
+                const { hotspot_count, latency_ms, run_id, telemetry } = await predictionWorker.predict(date, req.get('X-Request-Id'));
+                modelVersion = (telemetry && telemetry.model_version) || null;
+                console.log(`[Server] Worker generated ${hotspot_count} hotspots for ${date} in ${latency_ms} ms (run ${run_id})`);
 
                 // Re-fetch data after generation
                 result = await db.query(
@@ -498,7 +479,7 @@ app.get('/api/predictions/date/:date', async (req, res) => {
         res.json({
             date: date,
             hotspots: hotspots,
-            model_version: hotspots.length > 0 ? result.rows[0].model_version : null,
+            model_version: hotspots.length > 0 ? result.rows[0].model_version : modelVersion,
             total_count: hotspots.length
         });
     } catch (err) {
@@ -621,56 +602,35 @@ app.post('/api/predictions/generate', authenticateToken, async (req, res) => {
         return res.status(400).json({ error: 'Date is required' });
     }
 
-    // Trigger real-time Python inference
+    // Trigger real-time Python inference on the resident worker
     console.log(`🚀 Triggering prediction for ${date}...`);
-    const scriptPath = path.join(__dirname, '../scripts/predict_for_date.py');
 
-    // Determine Python executable path (prefer venv)
-    const venvPython = process.platform === 'win32'
-        ? path.join(__dirname, '../venv/Scripts/python.exe')
-        : path.join(__dirname, '../venv/bin/python');
-
-    const fs = require('fs');
-    const pythonExec = fs.existsSync(venvPython) ? venvPython : 'python3';
-
-    console.log(`   Using Python: ${pythonExec}`);
-
-    // Spawn Python process
-    const pythonProcess = spawn(pythonExec, [scriptPath, date]);
-
-    let scriptOutput = '';
-    let scriptError = '';
-
-    pythonProcess.stdout.on('data', (data) => {
-        const text = data.toString();
-        scriptOutput += text;
-        console.log(`[Python]: ${text}`);
-    });
-
-    pythonProcess.stderr.on('data', (data) => {
-        const text = data.toString();
-        scriptError += text;
-        console.error(`[Python API Error]: ${text}`);
-    });
+    try {
+        const { hotspot_count, latency_ms, run_id } = await predictionWorker.predict(date, req.get('X-Request-Id'));
+        console.log(`Prediction worker finished ${date} in ${latency_ms} ms (run ${run_id})`);
 
-    pythonProcess.on('close', (code) => {
-        console.log(`Python script finished with code ${code}`);
+        res.json({
+            message: 'Detailed prediction analysis generated successfully',
+            date: date,
+            status: 'success',
+            model_output: `Database updated with ${hotspot_count} new hotspots.`
+        });
+    } catch (err) {
+        res.status(500).json({
+            error: 'Prediction generation failed',
+            status: 'error',
+            debug_info: err.message
+        });
+    }
+});
 
-        if (code === 0) {
-            res.json({
-                message: 'Detailed prediction analysis generated successfully',
-                date: date,
-                status: 'success',
-                model_output: 'Database updated with new hotspots.'
-            });
-        } else {
-            res.status(500).json({
-                error: 'Prediction generation failed',
-                status: 'error',
-                debug_info: scriptError
-            });
-        }
-    });
+// Prediction worker health (queue depth, latency percentiles)
+app.get('/api/predictions/worker/health', async (req, res) => {
+    try {
+        res.json(await predictionWorker.health());
+    } catch (err) {
+        res.status(503).json({ status: 'unavailable', error: err.message });
+    }
 });
 
 // Get prediction statistics
@@ -0,0 +1,92 @@
+const { spawn } = require('child_process');
+const path = require('path');
+const fs = require('fs');
+const readline = require('readline');
+
+// Long-lived Python prediction worker (scripts/prediction_worker.py).
+// The model and static grid stay loaded between requests; we talk to it
+// with one JSON object per line on stdin/stdout.
+
+const SCRIPT_PATH = path.join(__dirname, '../scripts/prediction_worker.py');
+const WORKER_PORT = process.env.PREDICTION_WORKER_PORT || '8765';
+const REQUEST_TIMEOUT_MS = 10 * 60 * 1000;
+
+let worker = null;
+let nextId = 1;
+const pending = new Map();
+
+function pythonExecutable() {
+    // Prefer the project venv when present
+    const venvPython = process.platform === 'win32'
+        ? path.join(__dirname, '../venv/Scripts/python.exe')
+        : path.join(__dirname, '../venv/bin/python');
+    return fs.existsSync(venvPython) ? venvPython : 'python3';
+}
+
+function failPending(err) {
+    for (const { reject, timer } of pending.values()) {
+        clearTimeout(timer);
+        reject(err);
+    }
+    pending.clear();
+}
+
+function startWorker() {
+    const pythonExec = pythonExecutable();
+    console.log(`[Server] Starting prediction worker using: ${pythonExec}`);
+
+    // --port also lets `python scripts/predict_for_date.py <date>` reuse this worker
+    const child = spawn(pythonExec, [SCRIPT_PATH, '--stdio', '--port', WORKER_PORT]);
+
+    readline.createInterface({ input: child.stdout }).on('line', (line) => {
+        let msg;
+        try {
+            msg = JSON.parse(line);
+        } catch (e) {
+            console.log(`[Worker]: ${line}`);
+            return;
+        }
+        const entry = pending.get(msg.id);
+        if (!entry) return;
+        pending.delete(msg.id);
+        clearTimeout(entry.timer);
+        if (msg.ok) entry.resolve(msg);
+        else entry.reject(new Error(msg.error));
+    });
+
+    child.stderr.on('data', (data) => console.log(`[Worker]: ${data}`));
+    child.stdin.on('error', (err) => console.error('⚠️ Prediction worker stdin error:', err.message));
+
+    child.on('error', (err) => {
+        console.error('⚠️ Prediction worker failed to start:', err);
+    });
+
+    child.on('close', (code) => {
+        console.warn(`⚠️ Prediction worker exited with code ${code}`);
+        if (worker === child) worker = null;
+        failPending(new Error(`Prediction worker exited with code ${code}`));
+    });
+
+    return child;
+}
+
+function send(payload) {
+    if (!worker) worker = startWorker();
+
+    const id = nextId++;
+    return new Promise((resolve, reject) => {
+        const timer = setTimeout(() => {
+            pending.delete(id);
+            reject(new Error(`Prediction worker timed out (${payload.op})`));
+        }, REQUEST_TIMEOUT_MS);
+        pending.set(id, { resolve, reject, timer });
+        worker.stdin.write(JSON.stringify({ id, ...payload }) + '\n');
+    });
+}
+
+module.exports = {
+    // Generates and stores predictions for a date; resolves with
+    // { hotspot_count, latency_ms, run_id, telemetry }. runId tags the run's telemetry record.
+    predict: (date, runId) => send({ op: 'predict', date, run_id: runId }),
+    health: () => send({ op: 'health' }),
+};